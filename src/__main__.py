@@ -1,4 +1,18 @@
+import os
 import sys
+
+# Shell completion runs on every <Tab>, answer it before importing the CLI and its network stack
+if sys.argv[1:2] == ["__complete"]:
+    from . import completion
+    sys.exit(completion.main(sys.argv[2:]))
+
+# Read-only commands are answered by a running daemon, also without importing the CLI
+from . import daemon_client
+response = daemon_client.forward_argv(sys.argv[1:], os.getcwd())
+if response is not None:
+    sys.stdout.write(response.get("stdout", ""))
+    sys.exit(response.get("exit_code", 1))
+
 from .cli import RainmeasCLI
 
 def main():
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Any, Optional, List, Tuple
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import locks
+        return locks
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import locks
+        return locks
+
+# Import modules
+try:
+    locks = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+
+class CacheMissError(Exception):
+    """Raised in offline mode when the requested data is not in the local cache"""
+
+
+def default_cache_dir() -> str:
+    """Get the cache directory, honouring the RAINMEAS_CACHE_DIR override"""
+    override = os.environ.get("RAINMEAS_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "rainmeas", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "rainmeas")
+
+
+# Archive cache size cap used when neither --max-size nor RAINMEAS_CACHE_MAX_SIZE is given
+DEFAULT_MAX_SIZE = 1024 ** 3
+
+# Archives used this recently are kept by the automatic prune, another process may still be extracting them
+EVICTION_GRACE_SECONDS = 60
+
+# Counters persisted in stats.json, download totals give the observed throughput
+STAT_NAMES = ("metadata_hits", "metadata_misses", "metadata_revalidations",
+              "archive_hits", "archive_misses", "download_bytes", "download_ms")
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 1048576, 500K, 200M or 2G into bytes"""
+    value = value.strip().upper().rstrip("B")
+    multipliers = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def default_max_size() -> int:
+    """Get the archive cache size cap, honouring RAINMEAS_CACHE_MAX_SIZE"""
+    override = os.environ.get("RAINMEAS_CACHE_MAX_SIZE")
+    if override:
+        try:
+            return parse_size(override)
+        except ValueError:
+            pass
+    return DEFAULT_MAX_SIZE
+
+
+def _url_key(url: str) -> str:
+    """Get a filesystem safe key for a URL"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class Cache:
+    """Local on-disk cache of registry metadata and package archives
+
+    Metadata files are stored under metadata/ keyed by the hash of their URL,
+    archives under archives/<name>/ keyed by version and download URL.
+
+    Archive use is tracked by appending "<time> <size> <path>" lines to
+    access.log, so finding the least recently used archives never needs a
+    directory walk. Hit/miss counters are kept in memory and merged into
+    stats.json by flush_stats().
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or default_cache_dir()
+        self.metadata_dir = os.path.join(self.root, "metadata")
+        self.archives_dir = os.path.join(self.root, "archives")
+        self.snapshots_dir = os.path.join(self.root, "snapshots")
+        self.locks_dir = os.path.join(self.root, "locks")
+        self.access_log_path = os.path.join(self.root, "access.log")
+        self.stats_path = os.path.join(self.root, "stats.json")
+        self.counters: Dict[str, int] = {name: 0 for name in STAT_NAMES}
+
+    def record(self, counter: str, amount: int = 1) -> None:
+        """Count a cache hit, miss or revalidation, or downloaded bytes, for this run"""
+        self.counters[counter] += amount
+
+    def record_download(self, size: int, seconds: float) -> None:
+        """Record a completed download for throughput estimates"""
+        self.record("download_bytes", size)
+        # Rounded up so that very fast downloads still count towards the estimate
+        self.record("download_ms", max(1, int(seconds * 1000)))
+
+    def throughput(self) -> Optional[float]:
+        """Get the observed download throughput in bytes per second, None without history"""
+        stats = self.load_stats()
+        if stats["download_ms"] <= 0 or stats["download_bytes"] <= 0:
+            return None
+        return stats["download_bytes"] * 1000.0 / stats["download_ms"]
+
+    def metadata_path(self, url: str) -> str:
+        """Get the cache path for a metadata URL"""
+        return os.path.join(self.metadata_dir, _url_key(url) + ".json")
+
+    def get_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        """Load cached metadata for a URL, or None if it is not cached"""
+        path = self.metadata_path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_metadata(self, url: str, data: Dict[str, Any], etag: Optional[str] = None) -> None:
+        """Store metadata for a URL, with the ETag to revalidate it later"""
+        os.makedirs(self.metadata_dir, exist_ok=True)
+        self._write_atomic(self.metadata_path(url), json.dumps(data).encode("utf-8"))
+        etag_path = self._etag_path(url)
+        if etag:
+            self._write_atomic(etag_path, etag.encode("utf-8"))
+        elif os.path.exists(etag_path):
+            os.unlink(etag_path)
+        missing_path = self._missing_path(url)
+        if os.path.exists(missing_path):
+            os.unlink(missing_path)
+
+    def lock(self, name: str, timeout: Optional[float] = None) -> "locks.FileLock":
+        """Get a lock shared by every process using this cache"""
+        return locks.FileLock(os.path.join(self.locks_dir, f"{name}.lock"), timeout)
+
+    def entry_lock(self, path: str, timeout: Optional[float] = None) -> "locks.FileLock":
+        """Get the lock of one cache entry, by its path"""
+        relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+        return self.lock(f"entry-{_url_key(relpath)[:32]}", timeout)
+
+    def snapshot_path(self, base_url: str) -> str:
+        """Get the path of the package model snapshot of a registry"""
+        return os.path.join(self.snapshots_dir, _url_key(base_url) + ".bin")
+
+    def _etag_path(self, url: str) -> str:
+        return os.path.join(self.metadata_dir, _url_key(url) + ".etag")
+
+    def get_etag(self, url: str) -> Optional[str]:
+        """Get the ETag of cached metadata, if the server sent one"""
+        try:
+            with open(self._etag_path(url), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _missing_path(self, url: str) -> str:
+        return os.path.join(self.metadata_dir, _url_key(url) + ".missing")
+
+    def put_missing(self, url: str) -> None:
+        """Remember that a URL answered 404"""
+        os.makedirs(self.metadata_dir, exist_ok=True)
+        with open(self._missing_path(url), 'wb'):
+            pass
+
+    def is_missing(self, url: str, ttl: float) -> bool:
+        """Check whether a URL answered 404 less than ttl seconds ago"""
+        try:
+            return time.time() - os.path.getmtime(self._missing_path(url)) < ttl
+        except OSError:
+            return False
+
+    def archive_path(self, package_name: str, version: str, url: str) -> str:
+        """Get the cache path for a package archive"""
+        return os.path.join(self.archives_dir, package_name, f"{version}-{_url_key(url)[:16]}")
+
+    def has_archive(self, package_name: str, version: str, url: str) -> bool:
+        """Check whether a package archive is cached"""
+        return os.path.isfile(self.archive_path(package_name, version, url))
+
+    def put_archive(self, package_name: str, version: str, url: str, source_path: str) -> str:
+        """Move a downloaded archive into the cache and return its cached path"""
+        path = self.archive_path(package_name, version, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            # Source is on another filesystem
+            shutil.copyfile(source_path, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            os.unlink(source_path)
+        self.touch_archive(path)
+        return path
+
+    def touch_archive(self, path: str) -> None:
+        """Record that an archive was used, for LRU eviction"""
+        try:
+            size = os.path.getsize(path)
+            relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+            os.makedirs(self.root, exist_ok=True)
+            # prune() rewrites the log, an append racing it would be lost
+            with self.lock("ledger"):
+                with open(self.access_log_path, 'a', encoding='utf-8') as f:
+                    f.write(f"{time.time():.3f} {size} {relpath}\n")
+        except OSError:
+            pass
+
+    def _read_ledger(self) -> Tuple[Dict[str, Tuple[float, int]], int]:
+        """Replay access.log into {relpath: (last used, size)} and the line count"""
+        ledger: Dict[str, Tuple[float, int]] = {}
+        lines = 0
+        try:
+            with open(self.access_log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip("\n").split(" ", 2)
+                    if len(parts) != 3:
+                        continue
+                    lines += 1
+                    try:
+                        ledger[parts[2]] = (float(parts[0]), int(parts[1]))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return ledger, lines
+
+    def _write_ledger(self, ledger: Dict[str, Tuple[float, int]]) -> None:
+        """Rewrite access.log with one line per archive"""
+        os.makedirs(self.root, exist_ok=True)
+        lines = [f"{used:.3f} {size} {relpath}\n"
+                 for relpath, (used, size) in sorted(ledger.items(), key=lambda item: item[1][0])]
+        self._write_atomic(self.access_log_path, "".join(lines).encode("utf-8"))
+
+    def _reconcile_ledger(self, ledger: Dict[str, Tuple[float, int]]) -> Dict[str, Tuple[float, int]]:
+        """Add archives missing from the ledger and drop deleted ones (walks archives/)"""
+        on_disk: Dict[str, Tuple[float, int]] = {}
+        for dirpath, _, filenames in os.walk(self.archives_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(path, self.root).replace(os.sep, "/")
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                used = ledger[relpath][0] if relpath in ledger else stat.st_mtime
+                on_disk[relpath] = (used, stat.st_size)
+        return on_disk
+
+    def prune(self, max_bytes: int, reconcile: bool = True, grace: float = 0) -> List[str]:
+        """Evict least recently used archives until they fit in max_bytes
+
+        Without reconcile only the access log is consulted, which is what the
+        automatic prune after installs uses. Archives that are being
+        downloaded, or were used in the last grace seconds, are kept.
+        Returns the evicted paths.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with self.lock("ledger"):
+            return self._prune(max_bytes, reconcile, grace)
+
+    def _prune(self, max_bytes: int, reconcile: bool, grace: float) -> List[str]:
+        ledger, lines = self._read_ledger()
+        if reconcile:
+            ledger = self._reconcile_ledger(ledger)
+        total = sum(size for _, size in ledger.values())
+        # The log is compacted once it is mostly superseded lines
+        needs_compaction = lines > 2 * len(ledger) + 100
+        if total <= max_bytes and not reconcile and not needs_compaction:
+            return []
+
+        evicted = []
+        recent = time.time() - grace
+        for relpath, (used, size) in sorted(ledger.items(), key=lambda item: item[1][0]):
+            if total <= max_bytes:
+                break
+            if grace and used > recent:
+                continue
+            path = os.path.join(self.root, *relpath.split("/"))
+            try:
+                with self.entry_lock(path, timeout=0):
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            total -= size
+            del ledger[relpath]
+            evicted.append(relpath)
+        self._write_ledger(ledger)
+        return evicted
+
+    def clear(self) -> None:
+        """Delete all cached metadata and archives, keeping the statistics"""
+        for path in (self.metadata_dir, self.archives_dir, self.snapshots_dir):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+        if os.path.exists(self.access_log_path):
+            os.unlink(self.access_log_path)
+
+    def load_stats(self) -> Dict[str, int]:
+        """Load the persisted counters, including this run's unflushed ones"""
+        stats = {name: 0 for name in STAT_NAMES}
+        try:
+            with open(self.stats_path, 'r') as f:
+                for name, value in json.load(f).items():
+                    if name in stats and isinstance(value, int):
+                        stats[name] = value
+        except (OSError, ValueError):
+            pass
+        for name, value in self.counters.items():
+            stats[name] += value
+        return stats
+
+    def flush_stats(self) -> None:
+        """Merge this run's counters into stats.json"""
+        if not any(self.counters.values()):
+            return
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            # Read and written under the lock so concurrent runs do not lose each other's counts
+            with self.lock("stats"):
+                stats = self.load_stats()
+                self._write_atomic(self.stats_path, json.dumps(stats, indent=2).encode("utf-8"))
+        except OSError:
+            return
+        self.counters = {name: 0 for name in STAT_NAMES}
+
+    def usage(self) -> Dict[str, int]:
+        """Count cached entries and bytes (walks the cache, for explicit stats only)"""
+        usage = {"metadata_entries": 0, "metadata_bytes": 0, "archive_entries": 0, "archive_bytes": 0}
+        if os.path.isdir(self.metadata_dir):
+            for entry in os.scandir(self.metadata_dir):
+                if entry.name.endswith(".json") and entry.is_file():
+                    usage["metadata_entries"] += 1
+                    usage["metadata_bytes"] += entry.stat().st_size
+        for dirpath, _, filenames in os.walk(self.archives_dir):
+            for filename in filenames:
+                try:
+                    usage["archive_bytes"] += os.path.getsize(os.path.join(dirpath, filename))
+                    usage["archive_entries"] += 1
+                except OSError:
+                    continue
+        return usage
+
+    def owns(self, path: str) -> bool:
+        """Check whether a path lives inside the cache directory"""
+        root = os.path.abspath(self.root) + os.sep
+        return os.path.abspath(path).startswith(root)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        """Write a file so that readers never see partial content"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -1,9 +1,9 @@
 import sys
 import argparse
-from typing import List
+import asyncio
+from typing import Dict, List
 import os
 import json
-import shutil
 
 # Handle PyInstaller environment
 def resource_path(relative_path):
@@ -23,32 +23,98 @@ def import_modules():
         import registry
         import installer
         import utils
-        return registry, installer, utils
+        import workspace
+        import cache
+        import mirror
+        import progress
+        import daemon
+        import throttle
+        import shards
+        import dedupe
+        import pack
+        import completion
+        return registry, installer, utils, workspace, cache, mirror, progress, daemon, throttle, shards, dedupe, pack, completion
     except ImportError:
         # Try alternative import paths for PyInstaller
         sys.path.append(resource_path('src'))
         import registry
         import installer
         import utils
-        return registry, installer, utils
+        import workspace
+        import cache
+        import mirror
+        import progress
+        import daemon
+        import throttle
+        import shards
+        import dedupe
+        import pack
+        import completion
+        return registry, installer, utils, workspace, cache, mirror, progress, daemon, throttle, shards, dedupe, pack, completion
 
 # Import modules
 try:
-    registry, installer, utils = import_modules()
+    registry, installer, utils, workspace, cache, mirror, progress, daemon, throttle, shards, dedupe, pack, completion = import_modules()
 except Exception as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
 
+# Commands after which the archive cache is pruned down to its size cap
+AUTO_PRUNE_COMMANDS = ("install", "i", "update", "fetch", "workspace")
+# Commands that change the modules directory, an interrupted batch is recovered first
+RECOVERING_COMMANDS = ("install", "i", "update", "remove", "clean", "dedupe")
+# Package names completed for the positional arguments of commands, see completion.PACKAGE_KINDS
+PACKAGE_COMPLETIONS = {"install": "packages", "i": "packages", "info": "packages",
+                       "remove": "installed", "update": "installed"}
+
 class RainmeasCLI:
-    def __init__(self):
-        # Use remote registry only
-        self.registry = registry.Registry()
+    def __init__(self, package_registry: "registry.Registry" = None, skin_root: str = None):
+        # Use remote registry, keeping a local cache for offline use
+        self.cache = cache.Cache()
+        self.registry = package_registry or registry.Registry(cache=self.cache)
         # Removed skin directory check as per user request
         # Not all modules have @Resources folder, so we initialize without checking
-        self.skin_root = os.getcwd()  # Use current directory as default
+        self.skin_root = skin_root or os.getcwd()  # Use current directory as default
         self.installer = installer.Installer(self.skin_root, self.registry)
+        # Replaced in run() once the --progress option is known
+        self.reporter = progress.ProgressReporter("none")
     
     def run(self, args: List[str]) -> int:
+        # Completion candidates for the shell scripts, answered without touching the registry
+        if args[:1] == [completion.COMPLETE_COMMAND]:
+            return completion.main(args[1:])
+        
+        # Parse arguments
+        parser = self.build_parser()
+        parsed_args = parser.parse_args(args)
+        self.registry.offline = parsed_args.offline or os.environ.get("RAINMEAS_OFFLINE") == "1"
+        if parsed_args.registry:
+            self.registry.remote_base_url = parsed_args.registry.rstrip("/")
+        
+        self.reporter = progress.ProgressReporter(parsed_args.progress)
+        self.installer.core.listener = self.reporter
+        
+        try:
+            if (parsed_args.command in RECOVERING_COMMANDS and not getattr(parsed_args, "resume", False)
+                    and not getattr(parsed_args, "dry_run", False)):
+                self._recover_interrupted()
+            exit_code = self._execute(parser, parsed_args)
+            if parsed_args.command in AUTO_PRUNE_COMMANDS and not getattr(parsed_args, "dry_run", False):
+                self._auto_prune()
+            return exit_code
+        except cache.CacheMissError as e:
+            print(f"Error: {e}")
+            return 1
+        except throttle.ThrottledError as e:
+            print(f"Error: {e}. The registry is reachable but refusing requests, try again later.")
+            return 1
+        finally:
+            self.reporter.close()
+            if self.registry.cache is not None:
+                self.registry.cache.flush_stats()
+    
+    def build_parser(self) -> argparse.ArgumentParser:
+        """Build the argument parser of all commands"""
         # Get application version
         app_version = utils.get_app_version()
         
@@ -59,6 +125,9 @@ class RainmeasCLI:
         
         # Add version argument to main parser
         parser.add_argument("-v", "--version", action="version", version=f"rainmeas {app_version}")
+        parser.add_argument("--registry", metavar="URL", help="Registry base URL, e.g. a mirror created with 'rainmeas registry sync' (also set by RAINMEAS_REGISTRY)")
+        parser.add_argument("--progress", choices=["auto", "tty", "ndjson", "none"], default="auto", help="Download progress display on stderr: live display, NDJSON events or none (default: tty when stderr is a terminal, otherwise ndjson)")
+        parser.add_argument("--offline", action="store_true", help="Use only the local cache, never the network (also enabled by RAINMEAS_OFFLINE=1)")
         
         # Add subcommands
         subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -69,10 +138,16 @@ class RainmeasCLI:
         # Install command
         install_parser = subparsers.add_parser("install", help="Install a package or all packages from rainmeas-package.json")
         install_parser.add_argument("package", nargs="?", help="Package name and optional version (e.g., nurashadeweather or nurashadeweather@1.1.0). If omitted, installs all packages from rainmeas-package.json in current directory.")
+        install_parser.add_argument("--dedupe", action="store_true", help="Hardlink identical files across modules after installing")
+        install_parser.add_argument("--dry-run", action="store_true", help="Show the packages and download size an install would need, without installing anything")
+        install_parser.add_argument("--resume", action="store_true", help="Finish an install or update that was interrupted")
         
         # Alias for install command
         i_parser = subparsers.add_parser("i", help="Install a package or all packages from rainmeas-package.json (alias for install)")
         i_parser.add_argument("package", nargs="?", help="Package name and optional version (e.g., nurashadeweather or nurashadeweather@1.1.0). If omitted, installs all packages from rainmeas-package.json in current directory.")
+        i_parser.add_argument("--dedupe", action="store_true", help="Hardlink identical files across modules after installing")
+        i_parser.add_argument("--dry-run", action="store_true", help="Show the packages and download size an install would need, without installing anything")
+        i_parser.add_argument("--resume", action="store_true", help="Finish an install or update that was interrupted")
         
         # Remove command
         remove_parser = subparsers.add_parser("remove", help="Remove a package")
@@ -81,6 +156,7 @@ class RainmeasCLI:
         # Update command
         update_parser = subparsers.add_parser("update", help="Update packages")
         update_parser.add_argument("package", nargs="?", help="Specific package to update (optional)")
+        update_parser.add_argument("--dry-run", action="store_true", help="Show the updates and download size without installing anything")
         
         # List command
         list_parser = subparsers.add_parser("list", help="List installed packages")
@@ -99,32 +175,89 @@ class RainmeasCLI:
         # Clean command
         clean_parser = subparsers.add_parser("clean", help="Clean unused modules")
         
+        # Dedupe command
+        dedupe_parser = subparsers.add_parser("dedupe", help="Hardlink identical files across installed modules to save disk space")
+        
+        # Pack command
+        pack_parser = subparsers.add_parser("pack", help="Pack the skin, modules included, into a reproducible .rmskin or zip bundle")
+        pack_parser.add_argument("output", nargs="?", help="Bundle path (default: <skin name>.rmskin in the current directory)")
+        pack_parser.add_argument("--format", choices=["rmskin", "zip"], help="Bundle format (default: zip for a .zip output, otherwise rmskin)")
+        pack_parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of files compressed in parallel (default: number of CPUs)")
+        pack_parser.add_argument("--name", help="Skin name written to RMSKIN.ini (default: skin folder name)")
+        pack_parser.add_argument("--author", default="", help="Author written to RMSKIN.ini")
+        pack_parser.add_argument("--bundle-version", default="", help="Version written to RMSKIN.ini")
+        pack_parser.add_argument("--reuse", action="store_true", help="Reuse compressed data from the cached archives of the installed module versions instead of compressing them again. Faster, but the bundle then also depends on the local cache")
+        
+        # Fetch command
+        fetch_parser = subparsers.add_parser("fetch", help="Download package metadata and archives into the local cache")
+        fetch_parser.add_argument("manifest", nargs="?", default="rainmeas-package.json", help="Manifest or lockfile with a \"packages\" map (default: rainmeas-package.json)")
+        fetch_parser.add_argument("--all", action="store_true", help="Also cache the metadata of every package in the registry, for offline search")
+        
+        # Registry command
+        registry_parser = subparsers.add_parser("registry", help="Registry maintenance commands")
+        registry_subparsers = registry_parser.add_subparsers(dest="registry_command", help="Registry commands")
+        sync_parser = registry_subparsers.add_parser("sync", help="Mirror the registry into a directory usable as a static registry")
+        sync_parser.add_argument("dest", help="Destination directory of the mirror")
+        sync_parser.add_argument("--archives", action="store_true", help="Also mirror package archives and point download URLs at them")
+        sync_parser.add_argument("--archive-base-url", metavar="URL", help="URL the mirror will be served from, used for archive download URLs (default: file:// URL of DEST)")
+        sync_parser.add_argument("-j", "--jobs", type=int, default=8, help="Number of concurrent downloads (default: 8)")
+        shard_parser = registry_subparsers.add_parser("shard", help="Convert the flat index.json of a registry directory into a sharded index")
+        shard_parser.add_argument("root", help="Registry directory containing index.json")
+        shard_parser.add_argument("--prefix-length", type=int, default=shards.DEFAULT_PREFIX_LENGTH, help=f"Hex digits of the name hash used to pick a shard, 16^N shards (default: {shards.DEFAULT_PREFIX_LENGTH})")
+        
+        # Cache command
+        cache_parser = subparsers.add_parser("cache", help="Show cache statistics, prune or clear the local cache")
+        cache_parser.add_argument("action", choices=["stats", "prune", "clear"], help="stats: entries, size and hit rates; prune: evict least recently used archives; clear: delete all cached data")
+        cache_parser.add_argument("--max-size", metavar="SIZE", help="Archive cache size cap for prune, e.g. 500M or 2G (default: RAINMEAS_CACHE_MAX_SIZE or 1G)")
+        
+        # Daemon command
+        daemon_parser = subparsers.add_parser("daemon", help="Run a background daemon that keeps registry data warm for instant search, info and list")
+        daemon_parser.add_argument("action", nargs="?", choices=["run", "stop", "status"], default="run", help="Run the daemon in the foreground (default), stop it or show its status")
+        daemon_parser.add_argument("--refresh-interval", type=float, default=daemon.REFRESH_INTERVAL, help=f"Seconds between background refreshes (default: {daemon.REFRESH_INTERVAL})")
+        
+        # Workspace command
+        workspace_parser = subparsers.add_parser("workspace", help="Install packages for many skin roots in one run")
+        workspace_parser.add_argument("roots", nargs="+", help="Skin root directories or glob patterns (e.g., \"Skins/*\"). Only directories containing rainmeas-package.json are used.")
+        
         # Version command
         version_parser = subparsers.add_parser("version", help="Show CLI version")
         
+        # Completion command
+        completion_parser = subparsers.add_parser("completion", help="Print a bash, zsh or fish completion script")
+        completion_parser.add_argument("shell", choices=sorted(completion.GENERATORS), help="Shell to generate the script for")
+        
         # Help command
         help_parser = subparsers.add_parser("help", help="Show help")
         
-        # Parse arguments
-        parsed_args = parser.parse_args(args)
-        
-        # Execute command
+        return parser
+    
+    def _execute(self, parser: argparse.ArgumentParser, parsed_args: argparse.Namespace) -> int:
+        """Execute a parsed command"""
         if parsed_args.command == "init":
             return self.init()
         elif parsed_args.command in ["install", "i"]:
+            if parsed_args.resume:
+                return self.resume()
             # Check if we're installing all packages from rainmeas-package.json
             if not parsed_args.package:
-                return self.install_all_from_config()
+                exit_code = self.install_all_from_config(parsed_args.dry_run)
             # Check if we're installing a specific package with version
             elif "@" in parsed_args.package:
                 package_name, version = parsed_args.package.split("@", 1)
-                return self.install(package_name, version)
+                exit_code = self.plan({package_name: version}) if parsed_args.dry_run else self.install(package_name, version)
             # Install a specific package with latest version
+            elif parsed_args.dry_run:
+                exit_code = self.plan({parsed_args.package: "latest"})
             else:
-                return self.install(parsed_args.package)
+                exit_code = self.install(parsed_args.package)
+            if parsed_args.dedupe and exit_code == 0 and not parsed_args.dry_run:
+                exit_code = self.dedupe()
+            return exit_code
         elif parsed_args.command == "remove":
             return self.remove(parsed_args.package)
         elif parsed_args.command == "update":
+            if parsed_args.dry_run:
+                return self.update_plan(parsed_args.package)
             if parsed_args.package:
                 return self.update_package(parsed_args.package)
             else:
@@ -139,8 +272,32 @@ class RainmeasCLI:
             return self.verify()
         elif parsed_args.command == "clean":
             return self.clean()
+        elif parsed_args.command == "dedupe":
+            return self.dedupe()
+        elif parsed_args.command == "pack":
+            return self.pack(parsed_args.output, parsed_args.format, parsed_args.jobs,
+                             {"name": parsed_args.name, "author": parsed_args.author,
+                              "version": parsed_args.bundle_version}, parsed_args.reuse)
+        elif parsed_args.command == "fetch":
+            return self.fetch(parsed_args.manifest, parsed_args.all)
+        elif parsed_args.command == "registry":
+            if parsed_args.registry_command == "sync":
+                return self.registry_sync(parsed_args.dest, parsed_args.archives,
+                                          parsed_args.archive_base_url, parsed_args.jobs)
+            if parsed_args.registry_command == "shard":
+                return self.registry_shard(parsed_args.root, parsed_args.prefix_length)
+            parser.print_help()
+            return 1
+        elif parsed_args.command == "cache":
+            return self.cache_command(parsed_args.action, parsed_args.max_size)
+        elif parsed_args.command == "daemon":
+            return self.run_daemon(parsed_args.action, parsed_args.refresh_interval)
+        elif parsed_args.command == "workspace":
+            return self.workspace_install(parsed_args.roots)
         elif parsed_args.command == "version":
             return self.version()
+        elif parsed_args.command == "completion":
+            return self.completion(parsed_args.shell)
         elif parsed_args.command == "help":
             parser.print_help()
             return 0
@@ -179,6 +336,90 @@ class RainmeasCLI:
         else:
             return 1
     
+    def plan(self, packages: Dict[str, str], incremental: bool = False) -> int:
+        """Show what installing packages would download, without installing anything"""
+        try:
+            install_plan = asyncio.run(self.installer.core.plan(packages, incremental))
+        except installer.core.ResolutionError:
+            return 1
+        
+        if not install_plan.packages:
+            print("All packages are up to date, nothing to install")
+            return 0
+        
+        print("Install plan:")
+        for package in install_plan.packages:
+            key = f"{package.name}@{package.version}"
+            size = install_plan.sizes.get(key)
+            if key in install_plan.cached:
+                detail = "cached"
+            elif size is None:
+                detail = "size unknown"
+            else:
+                detail = progress.format_bytes(size)
+            print(f"  {key} ({detail})")
+        
+        summary = (f"{len(install_plan.packages)} packages, "
+                   f"{progress.format_bytes(install_plan.total_bytes)} to download")
+        if install_plan.unknown_sizes:
+            summary += f" plus {install_plan.unknown_sizes} archives of unknown size"
+        print(summary)
+        
+        throughput = (self.registry.cache or self.cache).throughput()
+        seconds = install_plan.estimate_seconds(throughput)
+        if seconds is None:
+            print("Estimated download time: unknown (no downloads observed yet)")
+        else:
+            print(f"Estimated download time: {progress.format_eta(seconds)} "
+                  f"at {progress.format_bytes(throughput)}/s observed")
+        return 0
+    
+    def _recover_interrupted(self) -> None:
+        """Finish or undo the packages of an interrupted install before changing anything"""
+        result = self.installer.recover()
+        if result is None:
+            return
+        print(f"Recovered an interrupted {result.command}: {len(result.completed)} packages completed, "
+              f"{len(result.rolled_back)} rolled back")
+        print("Run 'rainmeas install --resume' to finish it")
+    
+    def resume(self) -> int:
+        """Finish an interrupted install or update from its journal"""
+        result = self.installer.recover()
+        if result is None:
+            print("No interrupted install to resume")
+            return 0
+        
+        print(f"Resuming interrupted {result.command}: {len(result.completed)} packages completed from the journal, "
+              f"{len(result.rolled_back)} rolled back")
+        # Packages that finished are recorded in the install state, so only the rest is installed.
+        # Only a whole manifest install may prune modules the batch does not list.
+        if self.installer.install_all_packages(result.packages, prune=result.command == "install",
+                                               command=result.command):
+            return 0
+        return 1
+    
+    def update_plan(self, package_name: str = None) -> int:
+        """Show what updating would download, without installing anything"""
+        installed_packages = self.installer.list_installed_packages()
+        if package_name and package_name not in installed_packages:
+            print(f"Package '{package_name}' is not installed")
+            return 1
+        
+        outdated = {}
+        for name in [package_name] if package_name else list(installed_packages):
+            latest_version = self.registry.get_latest_version(name)
+            if not latest_version:
+                print(f"Could not determine latest version for package '{name}'")
+                return 1
+            if latest_version != installed_packages[name]:
+                outdated[name] = latest_version
+        
+        if not outdated:
+            print("All packages are up to date")
+            return 0
+        return self.plan(outdated)
+    
     def remove(self, package_name: str) -> int:
         """Remove a package"""
         # Removed skin directory check as per user request
@@ -212,12 +453,7 @@ class RainmeasCLI:
             print(f"Package '{package_name}' is already at the latest version ({latest_version})")
             return 0
         
-        # Remove the current version
-        if not self.installer.remove_package(package_name):
-            print(f"Failed to remove current version of '{package_name}'")
-            return 1
-        
-        # Install the latest version
+        # Install the latest version, it replaces the current one only once extracted
         if self.installer.install_package(package_name, latest_version):
             print(f"Successfully updated '{package_name}' from {current_version} to {latest_version}")
             return 0
@@ -241,6 +477,7 @@ class RainmeasCLI:
         
         print("Checking for updates...")
         
+        outdated = {}
         for package_name, current_version in installed_packages.items():
             # Get the latest version from registry
             latest_version = self.registry.get_latest_version(package_name)
@@ -251,23 +488,30 @@ class RainmeasCLI:
             
             # Check if update is needed
             if current_version != latest_version:
-                print(f"Updating '{package_name}' from {current_version} to {latest_version}...")
-                
-                # Remove the current version
-                if not self.installer.remove_package(package_name):
-                    print(f"Failed to remove current version of '{package_name}'")
-                    failed_count += 1
-                    continue
+                outdated[package_name] = latest_version
+            else:
+                print(f"'{package_name}' is already up to date ({current_version})")
+        
+        # Journal the updates as one batch so an interrupted run can be resumed
+        began = self.installer.begin_batch("update", outdated) if outdated else False
+        try:
+            for package_name, latest_version in outdated.items():
+                print(f"Updating '{package_name}' from {installed_packages[package_name]} to {latest_version}...")
                 
-                # Install the latest version
+                # Install the latest version, it replaces the current one only once extracted
                 if self.installer.install_package(package_name, latest_version):
                     print(f"Successfully updated '{package_name}'")
                     updated_count += 1
                 else:
                     print(f"Failed to install updated version of '{package_name}'")
                     failed_count += 1
-            else:
-                print(f"'{package_name}' is already up to date ({current_version})")
+        except Exception:
+            # Keep the journal, 'rainmeas install --resume' finishes the update
+            if began:
+                self.installer.abort_batch()
+            raise
+        if began:
+            self.installer.end_batch()
         
         print(f"\nUpdate summary: {updated_count} updated, {failed_count} failed")
         return 0 if failed_count == 0 else 1
@@ -315,11 +559,11 @@ class RainmeasCLI:
         print(f"Homepage: {info.get('homepage', 'None')}")
         
         # Show version information
-        latest_version = self.registry.get_latest_version(package_name)
+        latest_version = self.registry.get_latest_version(package_name, info)
         if latest_version:
             print(f"Latest version: {latest_version}")
         
-        available_versions = self.registry.get_available_versions(package_name)
+        available_versions = self.registry.get_available_versions(package_name, info)
         if available_versions:
             print(f"Available versions: {', '.join(available_versions)}")
         
@@ -336,19 +580,11 @@ class RainmeasCLI:
             print("No packages installed")
             return 0
         
-        verified_count = 0
-        missing_count = 0
-        
         print("Verifying package integrity...")
         
-        for package_name, version in installed_packages.items():
-            package_dir = os.path.join(self.installer.modules_dir, package_name)
-            if os.path.exists(package_dir):
-                print(f"✓ {package_name}@{version} - OK")
-                verified_count += 1
-            else:
-                print(f"✗ {package_name}@{version} - MISSING")
-                missing_count += 1
+        results = self.installer.verify_packages()
+        verified_count = sum(1 for ok in results.values() if ok)
+        missing_count = len(results) - verified_count
         
         print(f"\nVerification summary: {verified_count} verified, {missing_count} missing")
         return 0 if missing_count == 0 else 1
@@ -375,6 +611,10 @@ class RainmeasCLI:
         for item in os.listdir(self.installer.modules_dir):
             item_path = os.path.join(self.installer.modules_dir, item)
             
+            # Skip locks, journals and the staging and backup directories of installs in progress
+            if item.startswith("."):
+                continue
+            
             # Check if it's a directory and not in installed packages
             if os.path.isdir(item_path) and item not in installed_packages:
                 # Check if this package is a dependency of an installed package
@@ -391,7 +631,7 @@ class RainmeasCLI:
                 # Only remove if it's not a dependency
                 if not is_dependency:
                     try:
-                        shutil.rmtree(item_path)
+                        self.installer.remove_module(item)
                         print(f"Removed unused module: {item}")
                         cleaned_count += 1
                     except Exception as e:
@@ -406,13 +646,249 @@ class RainmeasCLI:
         
         return 0
     
+    def dedupe(self) -> int:
+        """Hardlink identical files across the installed modules"""
+        if not os.path.exists(self.installer.modules_dir):
+            print("No modules directory found")
+            return 0
+        
+        try:
+            result = dedupe.dedupe_modules(self.installer.modules_dir)
+        except OSError as e:
+            print(f"Error deduplicating modules: {e}")
+            return 1
+        
+        print(f"Deduplicated modules: {len(result.linked)} files linked, "
+              f"{progress.format_bytes(result.bytes_saved)} saved "
+              f"({result.files} files scanned, {result.hashed} hashed)")
+        return 0
+    
+    def pack(self, output: str = None, bundle_format: str = None, jobs: int = None,
+             metadata: dict = None, reuse: bool = False) -> int:
+        """Pack the skin root into a .rmskin or zip bundle"""
+        skin_name = os.path.basename(os.path.abspath(self.skin_root))
+        output = os.path.abspath(output or f"{skin_name}.rmskin")
+        bundle_format = bundle_format or ("zip" if output.lower().endswith(".zip") else "rmskin")
+        package_cache = self.registry.cache or self.cache
+        
+        print(f"Packing {self.skin_root} into {output}...")
+        try:
+            result = pack.pack_skin(self.skin_root, output, bundle_format, jobs,
+                                    package_cache.archives_dir if reuse else None, metadata)
+        except (OSError, pack.PackError) as e:
+            print(f"Error packing skin: {e}")
+            return 1
+        
+        print(f"Packed {result.files} files, {progress.format_bytes(result.bytes)} -> "
+              f"{progress.format_bytes(result.compressed_bytes)} "
+              f"({result.reused} reused from cached module archives)")
+        return 0
+    
+    def fetch(self, manifest_path: str, fetch_all: bool = False) -> int:
+        """Pre-download metadata and archives for a manifest into the local cache"""
+        if self.registry.offline:
+            print("Error: fetch needs network access and cannot run in offline mode")
+            return 1
+        
+        # The index is needed for offline search and name lookups
+        package_names = self.registry.list_all_package_names()
+        if not package_names:
+            print("Error: could not fetch the registry index")
+            return 1
+        
+        if fetch_all:
+            print(f"Caching metadata for {len(package_names)} packages...")
+            for package_name in package_names:
+                self.registry.get_package_model(package_name)
+            # Offline lookups load this instead of parsing every metadata file
+            try:
+                self.registry.save_snapshot()
+            except OSError as e:
+                print(f"Warning: could not write the package snapshot: {e}")
+        
+        if not os.path.exists(manifest_path):
+            if fetch_all:
+                print(f"Cache directory: {self.cache.root}")
+                return 0
+            print(f"Error: {manifest_path} not found")
+            return 1
+        
+        try:
+            with open(manifest_path, 'r') as f:
+                packages = json.load(f).get("packages", {})
+        except Exception as e:
+            print(f"Error reading {manifest_path}: {e}")
+            return 1
+        
+        try:
+            plan = asyncio.run(self.installer.core.prefetch(packages))
+        except installer.core.ResolutionError:
+            return 1
+        except Exception as e:
+            print(f"Error fetching packages: {e}")
+            return 1
+        
+        print(f"Cached {len(plan)} packages in {self.cache.root}")
+        return 0
+    
+    def registry_sync(self, dest: str, include_archives: bool = False,
+                      archive_base_url: str = None, jobs: int = 8) -> int:
+        """Incrementally mirror the registry into a local directory"""
+        if self.registry.offline:
+            print("Error: registry sync needs network access and cannot run in offline mode")
+            return 1
+        
+        print(f"Syncing {self.registry.remote_base_url} to {dest}...")
+        registry_mirror = mirror.RegistryMirror(self.registry.remote_base_url, dest, include_archives,
+                                                archive_base_url, workers=max(1, jobs))
+        try:
+            result = asyncio.run(registry_mirror.sync())
+        except Exception as e:
+            print(f"Error syncing registry: {e}")
+            return 1
+        
+        for failure in result.failed:
+            print(f"  Failed: {failure}")
+        print(f"Sync summary: {len(result.updated)} updated, {len(result.unchanged)} unchanged, "
+              f"{len(result.removed)} removed, {len(result.archives_downloaded)} archives downloaded, "
+              f"{len(result.failed)} failed")
+        return 0 if result.success else 1
+    
+    def cache_command(self, action: str, max_size: str = None) -> int:
+        """Show statistics for, prune or clear the local cache"""
+        package_cache = self.registry.cache or self.cache
+        if action == "clear":
+            package_cache.clear()
+            print(f"Cleared {package_cache.root}")
+            return 0
+        
+        if action == "prune":
+            try:
+                max_bytes = cache.parse_size(max_size) if max_size else cache.default_max_size()
+            except ValueError:
+                print(f"Error: invalid size '{max_size}'")
+                return 1
+            evicted = package_cache.prune(max_bytes)
+            print(f"Pruned {len(evicted)} archives, cache limit {progress.format_bytes(max_bytes)}")
+            return 0
+        
+        usage = package_cache.usage()
+        stats = package_cache.load_stats()
+        print(f"Cache directory: {package_cache.root}")
+        print(f"Metadata: {usage['metadata_entries']} entries, {progress.format_bytes(usage['metadata_bytes'])}")
+        print(f"Archives: {usage['archive_entries']} entries, {progress.format_bytes(usage['archive_bytes'])} "
+              f"(limit {progress.format_bytes(cache.default_max_size())})")
+        for label, prefix in (("Metadata", "metadata"), ("Archives", "archive")):
+            hits = stats[f"{prefix}_hits"] + stats.get(f"{prefix}_revalidations", 0)
+            total = hits + stats[f"{prefix}_misses"]
+            rate = f"{100.0 * hits / total:.1f}%" if total else "n/a"
+            line = f"{label} hit rate: {rate} ({stats[f'{prefix}_hits']} hits, {stats[f'{prefix}_misses']} misses"
+            if prefix == "metadata":
+                line += f", {stats['metadata_revalidations']} revalidated"
+            print(line + ")")
+        return 0
+    
+    def _auto_prune(self) -> None:
+        """Keep the archive cache under its size cap after installing"""
+        if self.registry.cache is None:
+            return
+        try:
+            self.registry.cache.prune(cache.default_max_size(), reconcile=False,
+                                      grace=cache.EVICTION_GRACE_SECONDS)
+        except OSError as e:
+            print(f"Warning: could not prune the cache: {e}")
+    
+    def run_daemon(self, action: str = "run", refresh_interval: float = daemon.REFRESH_INTERVAL) -> int:
+        """Run, stop or query the background daemon"""
+        if action == "status":
+            response = daemon.send_request({"command": "ping"})
+            if response is None:
+                print("Daemon is not running")
+                return 1
+            print(f"Daemon is running (pid {response.get('pid')})")
+            return 0
+        
+        if action == "stop":
+            response = daemon.send_request({"command": "shutdown"})
+            if response is None:
+                print("Daemon is not running")
+                return 1
+            print(response.get("stdout", "").strip())
+            return 0
+        
+        if daemon.send_request({"command": "ping"}) is not None:
+            print("Daemon is already running")
+            return 1
+        
+        server = daemon.Daemon(self.registry.remote_base_url, refresh_interval)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+    
+    def registry_shard(self, root: str, prefix_length: int = shards.DEFAULT_PREFIX_LENGTH) -> int:
+        """Write a sharded index next to the flat index.json of a registry directory"""
+        if not 1 <= prefix_length <= 4:
+            print("Error: --prefix-length must be between 1 and 4")
+            return 1
+        
+        try:
+            manifest = shards.shard_registry(root, prefix_length)
+        except Exception as e:
+            print(f"Error sharding registry: {e}")
+            return 1
+        
+        print(f"Wrote {len(manifest['shards'])} shards for {manifest['package_count']} packages "
+              f"to {os.path.join(root, 'index')}")
+        return 0
+    
+    def workspace_install(self, patterns: List[str]) -> int:
+        """Install the packages of many skin roots with shared metadata and downloads"""
+        roots = workspace.expand_skin_roots(patterns)
+        if not roots:
+            print("No skin roots with rainmeas-package.json found")
+            return 1
+        
+        def print_root_event(event):
+            # Per-root begin/summary lines are replaced by the workspace summary
+            if event.kind in ("begin", "summary"):
+                return
+            name = os.path.basename(event.data.get("skin_root", ""))
+            for line in event.message.strip("\n").splitlines():
+                print(f"[{name}] {line}")
+        
+        print(f"Installing packages for {len(roots)} skin roots...")
+        reporter = progress.ProgressReporter(self.reporter.mode, message_printer=print_root_event)
+        ws = workspace.Workspace(roots, self.registry, listener=reporter)
+        try:
+            summaries = asyncio.run(ws.install())
+        finally:
+            reporter.close()
+        
+        print("\nWorkspace summary:")
+        failed_count = 0
+        for summary in summaries:
+            status = "OK" if summary.success else "FAILED"
+            print(f"  {summary.skin_root}: {status} - {summary.describe()}")
+            if not summary.success:
+                failed_count += 1
+        
+        print(f"\n{len(summaries) - failed_count} roots succeeded, {failed_count} failed")
+        return 0 if failed_count == 0 else 1
+    
     def version(self) -> int:
         """Show version"""
         app_version = utils.get_app_version()
         print(f"rainmeas {app_version}")
         return 0
     
-    def install_all_from_config(self) -> int:
+    def completion(self, shell: str) -> int:
+        """Print the completion script of a shell"""
+        sys.stdout.write(completion.generate(self.build_parser(), shell, PACKAGE_COMPLETIONS))
+        return 0
+    
+    def install_all_from_config(self, dry_run: bool = False) -> int:
         """Install all packages specified in rainmeas-package.json"""
         # Removed skin directory check as per user request
         # Not all modules have @Resources folder, so we proceed without validation
@@ -435,6 +911,10 @@ class RainmeasCLI:
             print("No packages specified in rainmeas-package.json")
             return 0
         
+        if dry_run:
+            # Planned like the incremental install below
+            return self.plan(packages, incremental=True)
+        
         # Use the installer's method that handles dependencies
         if self.installer.install_all_packages(packages):
             return 0
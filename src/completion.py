@@ -0,0 +1,398 @@
+import mmap
+import os
+import sys
+import time
+
+# This module runs on every <Tab>, so it only imports stdlib modules that load
+# instantly. The registry, cache and network stack are imported only by the
+# background refresh.
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Hidden first argument the generated scripts call rainmeas with, answered before the CLI is imported
+COMPLETE_COMMAND = "__complete"
+
+# Sorted package names of the registry, one per line, kept in the cache directory
+NAMES_FILE = "package-names.txt"
+
+# Seconds before the name index is refreshed in the background
+NAMES_MAX_AGE = 24 * 60 * 60
+
+# Marker next to the name index, touched when a background refresh starts
+REFRESH_MARKER = "package-names.refresh"
+
+# Seconds between background refreshes of a missing or empty name index, e.g. while offline
+REFRESH_RETRY_INTERVAL = 60
+
+# Most candidates printed for one prefix
+MAX_CANDIDATES = 500
+
+# Kinds of package name candidates, see main
+PACKAGE_KINDS = ("packages", "installed")
+
+
+def default_cache_dir() -> str:
+    """Same location as cache.default_cache_dir(), without importing the cache module"""
+    override = os.environ.get("RAINMEAS_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "rainmeas", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "rainmeas")
+
+
+def names_path(cache_dir: str = None) -> str:
+    """Get the path of the package name index"""
+    return os.path.join(cache_dir or default_cache_dir(), NAMES_FILE)
+
+
+def write_names(cache_dir: str, names: list) -> None:
+    """Atomically replace the package name index with a sorted copy of names"""
+    import tempfile
+    data = "".join(f"{name}\n" for name in sorted(set(names)) if name and not any(c.isspace() for c in name))
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode("utf-8"))
+        os.replace(tmp_path, names_path(cache_dir))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _line_start(data: "mmap.mmap", pos: int) -> int:
+    """Get the offset of the first line starting at or after pos"""
+    if pos == 0:
+        return 0
+    newline = data.find(b"\n", pos - 1)
+    return len(data) if newline < 0 else newline + 1
+
+
+def _line_end(data: "mmap.mmap", start: int) -> int:
+    newline = data.find(b"\n", start)
+    return len(data) if newline < 0 else newline
+
+
+def lookup(path: str, prefix: str, limit: int = MAX_CANDIDATES) -> list:
+    """Get the names of a sorted name file starting with prefix, by binary search over the file"""
+    key = prefix.encode("utf-8")
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # Smallest offset whose next line is not below the prefix
+                lo, hi = 0, len(data)
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    start = _line_start(data, mid)
+                    if start < len(data) and data[start:_line_end(data, start)] < key:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                names = []
+                start = _line_start(data, lo)
+                while start < len(data) and len(names) < limit:
+                    end = _line_end(data, start)
+                    name = data[start:end]
+                    if not name.startswith(key):
+                        break
+                    names.append(name.decode("utf-8"))
+                    start = end + 1
+                return names
+    except (OSError, ValueError):
+        return []
+
+
+def installed_names(skin_root: str) -> list:
+    """Get the names of the modules installed in a skin, from the modules directory"""
+    modules_dir = os.path.join(skin_root, "@Resources", "@rainmeas-modules")
+    try:
+        with os.scandir(modules_dir) as entries:
+            # Staging directories of installs in progress start with a dot
+            return [entry.name for entry in entries if not entry.name.startswith(".") and entry.is_dir()]
+    except OSError:
+        return []
+
+
+def refresh_in_background(path: str) -> bool:
+    """Start refreshing a missing, empty or outdated name index in a detached process"""
+    if os.environ.get("RAINMEAS_OFFLINE") == "1":
+        return False
+    now = time.time()
+    try:
+        stat = os.stat(path)
+        if stat.st_size and now - stat.st_mtime < NAMES_MAX_AGE:
+            return False
+    except OSError:
+        pass
+    # The marker, not the index, is touched first, so the keystrokes typed while the
+    # refresh runs do not start more of them, and a failed refresh is retried soon
+    marker = os.path.join(os.path.dirname(path), REFRESH_MARKER)
+    try:
+        if now - os.stat(marker).st_mtime < REFRESH_RETRY_INTERVAL:
+            return False
+    except OSError:
+        pass
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(marker, 'ab'):
+            pass
+        os.utime(marker)
+    except OSError:
+        return False
+
+    import subprocess
+    if getattr(sys, 'frozen', False):
+        command = [sys.executable, COMPLETE_COMMAND, "--refresh"]
+    else:
+        command = [sys.executable, os.path.abspath(__file__), "--refresh"]
+    kwargs = {"stdin": subprocess.DEVNULL, "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen(command, **kwargs)
+    except OSError:
+        return False
+    return True
+
+
+def refresh_names() -> int:
+    """Fetch the package names of the registry, which rewrites the name index"""
+    try:
+        import cache
+        import registry
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import cache
+        import registry
+    names = registry.Registry(cache=cache.Cache()).list_all_package_names()
+    return 0 if names else 1
+
+
+def main(args: list) -> int:
+    """Print the package names completing a prefix, for the generated shell scripts
+
+    "packages" completes registry and installed names, "installed" only the
+    modules installed in the current directory.
+    """
+    if args[:1] == ["--refresh"]:
+        return refresh_names()
+    if not args or args[0] not in PACKAGE_KINDS:
+        return 1
+    prefix = args[1] if len(args) > 1 else ""
+    # Versions after name@ are not completed
+    if "@" in prefix:
+        return 0
+    candidates = {name for name in installed_names(os.getcwd()) if name.startswith(prefix)}
+    path = names_path()
+    if args[0] == "packages":
+        candidates.update(lookup(path, prefix))
+    sys.stdout.write("".join(f"{name}\n" for name in sorted(candidates)))
+    sys.stdout.flush()
+    if args[0] == "packages":
+        refresh_in_background(path)
+    return 0
+
+
+def _options(parser) -> list:
+    """Get (flags, takes value, choices, help) of the options of a parser"""
+    return [(action.option_strings, action.nargs != 0, list(action.choices or []), action.help or "")
+            for action in parser._actions if action.option_strings]
+
+
+def _commands(parser, path: tuple = ()) -> list:
+    """Walk the argparse tree, yielding (path, parser, subcommands, positionals) per command"""
+    import argparse
+    subcommands = {}
+    positionals = []
+    for action in parser._actions:
+        if isinstance(action, argparse._SubParsersAction):
+            helps = {choice.dest: choice.help or "" for choice in action._choices_actions}
+            subcommands = {name: (subparser, helps.get(name, "")) for name, subparser in action.choices.items()}
+        elif not action.option_strings:
+            positionals.append(action)
+    commands = [(path, parser, subcommands, positionals)]
+    for name, (subparser, _) in subcommands.items():
+        commands.extend(_commands(subparser, path + (name,)))
+    return commands
+
+
+def _positional_kind(path: tuple, action, package_arguments: dict) -> str:
+    if action.choices:
+        return "choices " + " ".join(action.choices)
+    return package_arguments.get(" ".join(path), "files")
+
+
+def generate_bash(parser, package_arguments: dict) -> str:
+    """Generate a bash completion script from an argument parser"""
+    import argparse
+    prog = parser.prog
+    subcommand_cases, option_cases, value_cases, choice_cases, positional_cases = [], [], [], [], []
+    for path, command_parser, subcommands, positionals in _commands(parser):
+        key = " ".join(path)
+        options = _options(command_parser)
+        if subcommands:
+            subcommand_cases.append(f'        "{key}") echo "{" ".join(subcommands)}";;')
+        option_cases.append(f'        "{key}") echo "{" ".join(flag for flags, _, _, _ in options for flag in flags)}";;')
+        values = [flag for flags, takes_value, _, _ in options if takes_value for flag in flags]
+        if values:
+            value_cases.append(f'        "{key}") echo "{" ".join(values)}";;')
+        for flags, takes_value, choices, _ in options:
+            if takes_value and choices:
+                patterns = "|".join(f'"{key} {flag}"' for flag in flags)
+                choice_cases.append(f'        {patterns}) echo "{" ".join(choices)}";;')
+        repeated = []
+        for index, action in enumerate(positionals):
+            kind = _positional_kind(path, action, package_arguments)
+            if action.nargs in ("+", "*", argparse.REMAINDER):
+                repeated.append(f'        "{key}:"*) echo "{kind}";;')
+            else:
+                positional_cases.append(f'        "{key}:{index}") echo "{kind}";;')
+        positional_cases.extend(repeated)
+
+    def case(name: str, subject: str, cases: list) -> str:
+        return f'{name}() {{\n    case "{subject}" in\n' + "\n".join(cases) + "\n    esac\n}\n"
+
+    func = f"_{prog}"
+    return (f"# {prog} completion for bash, generated by '{prog} completion bash'\n"
+            f"# Package names are answered by '{prog} {COMPLETE_COMMAND}' from the local name index\n\n"
+            + case(f"{func}_subcommands", "$1", subcommand_cases)
+            + case(f"{func}_options", "$1", option_cases)
+            + case(f"{func}_value_options", "$1", value_cases)
+            + case(f"{func}_option_choices", "$1 $2", choice_cases)
+            + case(f"{func}_positional", "$1:$2", positional_cases)
+            + f'''
+{func}() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}" path="" word i npos=0 skip=0
+    COMPREPLY=()
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        word="${{COMP_WORDS[i]}}"
+        if ((skip)); then
+            skip=0
+            continue
+        fi
+        if [[ "$word" == -* ]]; then
+            [[ "$word" != *=* && " $({func}_value_options "$path") " == *" $word "* ]] && skip=1
+            continue
+        fi
+        if [[ $npos -eq 0 && " $({func}_subcommands "$path") " == *" $word "* ]]; then
+            path="${{path:+$path }}$word"
+        else
+            npos=$((npos + 1))
+        fi
+    done
+    if ((skip)); then
+        local choices="$({func}_option_choices "$path" "${{COMP_WORDS[COMP_CWORD-1]}}")"
+        if [[ -n "$choices" ]]; then
+            COMPREPLY=($(compgen -W "$choices" -- "$cur"))
+        else
+            COMPREPLY=($(compgen -f -- "$cur"))
+        fi
+        return
+    fi
+    if [[ "$cur" == -* ]]; then
+        COMPREPLY=($(compgen -W "$({func}_options "$path")" -- "$cur"))
+        return
+    fi
+    local subcommands="$({func}_subcommands "$path")"
+    if [[ -n "$subcommands" && $npos -eq 0 ]]; then
+        COMPREPLY=($(compgen -W "$subcommands" -- "$cur"))
+        return
+    fi
+    local kind="$({func}_positional "$path" "$npos")"
+    case "$kind" in
+        packages|installed) COMPREPLY=($({prog} {COMPLETE_COMMAND} "$kind" "$cur" 2>/dev/null));;
+        choices\\ *) COMPREPLY=($(compgen -W "${{kind#choices }}" -- "$cur"));;
+        files) COMPREPLY=($(compgen -f -- "$cur"));;
+    esac
+}}
+complete -F {func} {prog}
+''')
+
+
+def generate_zsh(parser, package_arguments: dict) -> str:
+    """Generate a zsh completion script, the bash one run through bashcompinit"""
+    prog = parser.prog
+    return (f"# {prog} completion for zsh, generated by '{prog} completion zsh'\n"
+            "(( $+functions[compdef] )) || { autoload -U +X compinit && compinit }\n"
+            "autoload -U +X bashcompinit && bashcompinit\n\n"
+            + generate_bash(parser, package_arguments))
+
+
+def _fish_quote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _fish_description(text: str) -> str:
+    # First sentence only, fish shows descriptions next to every candidate
+    return _fish_quote(text.split(". ")[0].split(" (")[0].rstrip("."))
+
+
+def generate_fish(parser, package_arguments: dict) -> str:
+    """Generate a fish completion script from an argument parser"""
+    prog = parser.prog
+    lines = [f"# {prog} completion for fish, generated by '{prog} completion fish'",
+             f"# Package names are answered by '{prog} {COMPLETE_COMMAND}' from the local name index",
+             f"complete -c {prog} -f"]
+    for path, command_parser, subcommands, positionals in _commands(parser):
+        if path:
+            condition = "; and ".join(f"__fish_seen_subcommand_from {name}" for name in path)
+        else:
+            condition = "__fish_use_subcommand"
+        if subcommands:
+            listing = condition
+            if path:
+                listing += "; and not __fish_seen_subcommand_from " + " ".join(subcommands)
+            for name, (_, help_text) in subcommands.items():
+                lines.append(f"complete -c {prog} -n {_fish_quote(listing)} -a {name} -d {_fish_description(help_text)}")
+        for flags, takes_value, choices, help_text in _options(command_parser):
+            spec = " ".join(f"-l {flag[2:]}" if flag.startswith("--") else f"-s {flag[1:]}" for flag in flags)
+            if choices:
+                spec += f" -x -a {_fish_quote(' '.join(choices))}"
+            elif takes_value:
+                spec += " -r"
+            lines.append(f"complete -c {prog} -n {_fish_quote(condition)} {spec} -d {_fish_description(help_text)}")
+        for action in positionals:
+            kind = _positional_kind(path, action, package_arguments)
+            if kind in PACKAGE_KINDS:
+                candidates = f"({prog} {COMPLETE_COMMAND} {kind} (commandline -ct))"
+                lines.append(f"complete -c {prog} -n {_fish_quote(condition)} -a {_fish_quote(candidates)}")
+            elif kind.startswith("choices "):
+                lines.append(f"complete -c {prog} -n {_fish_quote(condition)} -a {_fish_quote(kind[len('choices '):])}")
+            else:
+                lines.append(f"complete -c {prog} -n {_fish_quote(condition)} -F")
+    return "\n".join(lines) + "\n"
+
+
+# Script generators by shell name
+GENERATORS = {"bash": generate_bash, "zsh": generate_zsh, "fish": generate_fish}
+
+
+def generate(parser, shell: str, package_arguments: dict) -> str:
+    """Generate the completion script of a shell from an argument parser
+
+    package_arguments maps a command ("install", "registry sync") to the
+    kind of package names its positional arguments take, see PACKAGE_KINDS.
+    """
+    return GENERATORS[shell](parser, package_arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
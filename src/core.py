@@ -0,0 +1,1240 @@
+import asyncio
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from typing import Dict, Any, Optional, List, Set, Callable
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import registry
+        import utils
+        import cache
+        import throttle
+        import journal
+        import locks
+        return registry, utils, cache, throttle, journal, locks
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import registry
+        import utils
+        import cache
+        import throttle
+        import journal
+        import locks
+        return registry, utils, cache, throttle, journal, locks
+
+# Import modules
+try:
+    registry, utils, cache, throttle, journal, locks = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+
+class ProgressEvent:
+    """A progress notification emitted by the async core instead of printing"""
+
+    def __init__(self, kind: str, package: Optional[str] = None, version: Optional[str] = None,
+                 message: Optional[str] = None, **data: Any):
+        self.kind = kind
+        self.package = package
+        self.version = version
+        # Human readable text, used by the CLI to render the event
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the event to a JSON serializable dictionary"""
+        result = {"event": self.kind, "package": self.package, "version": self.version}
+        if self.message is not None:
+            result["message"] = self.message
+        result.update(self.data)
+        return result
+
+
+class ResolvedPackage:
+    """A package pinned to a concrete version together with its download URL"""
+
+    def __init__(self, name: str, version: str, download_url: str,
+                 dependencies: Dict[str, str], is_dependency: bool = False,
+                 archive_format: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.download_url = download_url
+        self.dependencies = dependencies
+        self.is_dependency = is_dependency
+        # Format declared by the registry ("zip", "tar.gz", "tar.xz"), None if not declared
+        self.archive_format = archive_format
+
+    def __repr__(self) -> str:
+        return f"ResolvedPackage({self.name}@{self.version})"
+
+
+class InstallResult:
+    """Outcome of installing a package and its dependencies"""
+
+    def __init__(self, package: str, version: Optional[str], success: bool,
+                 error: Optional[str] = None, installed: Optional[List[str]] = None,
+                 skipped: bool = False):
+        self.package = package
+        self.version = version
+        self.success = success
+        self.error = error
+        # name@version for every package extracted by this install
+        self.installed = installed or []
+        self.skipped = skipped
+
+    def __bool__(self) -> bool:
+        return self.success
+
+
+class InstallPlan:
+    """Packages an install would fetch, with the download size of each archive"""
+
+    def __init__(self, packages: List[ResolvedPackage]):
+        self.packages = packages
+        # Content-Length by name@version, 0 for cached archives, None when the server did not say
+        self.sizes: Dict[str, Optional[int]] = {}
+        self.cached: Set[str] = set()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for size in self.sizes.values() if size)
+
+    @property
+    def unknown_sizes(self) -> int:
+        return sum(1 for size in self.sizes.values() if size is None)
+
+    def estimate_seconds(self, throughput: Optional[float]) -> Optional[float]:
+        """Estimate the download time at a throughput in bytes per second"""
+        if not throughput:
+            return None
+        return self.total_bytes / throughput
+
+
+class RecoveryResult:
+    """Outcome of recovering an interrupted batch from its journal"""
+
+    def __init__(self, command: str, packages: Dict[str, str]):
+        self.command = command
+        self.packages = packages
+        # Packages whose install was finished from the journal
+        self.completed: List[str] = []
+        # Packages whose partial install was undone, they are still outstanding
+        self.rolled_back: List[str] = []
+
+
+class ResolutionError(Exception):
+    """Raised when a package or one of its dependencies cannot be resolved"""
+
+
+class OperationCancelled(Exception):
+    """Raised in a worker thread whose download or extraction was cancelled"""
+
+
+EventListener = Callable[[ProgressEvent], None]
+
+
+class AsyncRegistry:
+    """Asyncio facade over Registry, blocking lookups run in worker threads"""
+
+    def __init__(self, registry: registry.Registry, memoize: bool = False):
+        self.registry = registry
+        # When memoizing, each package file is fetched at most once per instance
+        # and concurrent callers share the same pending lookup
+        self.memoize = memoize
+        self._package_info: Dict[str, "asyncio.Future"] = {}
+
+    async def list_all_package_names(self) -> List[str]:
+        return await asyncio.to_thread(self.registry.list_all_package_names)
+
+    async def get_package_info(self, package_name: str) -> Optional[Dict[str, Any]]:
+        if not self.memoize:
+            return await asyncio.to_thread(self.registry.get_package_info, package_name)
+        if package_name not in self._package_info:
+            self._package_info[package_name] = asyncio.ensure_future(
+                asyncio.to_thread(self.registry.get_package_info, package_name))
+        return await asyncio.shield(self._package_info[package_name])
+
+    async def search_packages(self, query: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.registry.search_packages, query)
+
+    async def get_latest_version(self, package_name: str) -> Optional[str]:
+        return await asyncio.to_thread(self.registry.get_latest_version, package_name)
+
+
+class ArchivePool:
+    """Downloads each package@version once and shares the archive between installers
+
+    Progress events of a download go to every installer waiting for it, an
+    installer asking for an archive that is already there gets a "cached" event.
+    """
+
+    def __init__(self):
+        self._archives: Dict[str, "asyncio.Future"] = {}
+        # Installers waiting for each download in progress
+        self._waiters: Dict[str, List["AsyncInstaller"]] = {}
+        # Temporary archives the pool is responsible for deleting
+        self._temporary: Set[str] = set()
+
+    async def get(self, installer: "AsyncInstaller", package: ResolvedPackage) -> str:
+        """Return the local archive path for a package, downloading it on first use"""
+        key = f"{package.name}@{package.version}"
+        future = self._archives.get(key)
+        if future is None:
+            self._waiters[key] = [installer]
+            future = self._archives[key] = asyncio.ensure_future(self._download(key, installer, package))
+        elif not future.done():
+            self._waiters[key].append(installer)
+        elif not future.cancelled() and future.exception() is None:
+            installer._emit("cached", package.name, package.version,
+                            message=f"Using {package.name}@{package.version} downloaded earlier in this run",
+                            path=future.result())
+        return await asyncio.shield(future)
+
+    async def _download(self, key: str, installer: "AsyncInstaller", package: ResolvedPackage) -> str:
+        def emit(*args: Any, **kwargs: Any) -> None:
+            for waiter in list(self._waiters.get(key, ())):
+                waiter._emit(*args, **kwargs)
+
+        try:
+            path = await installer.download(package, emit=emit)
+        finally:
+            self._waiters.pop(key, None)
+        if not installer.owns_archive(path):
+            self._temporary.add(path)
+        return path
+
+    def cleanup(self) -> None:
+        """Delete every temporary archive downloaded through the pool"""
+        for path in self._temporary:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._temporary.clear()
+        self._archives.clear()
+        self._waiters.clear()
+
+
+class AsyncInstaller:
+    """Asyncio implementation of the install pipeline for a single skin root
+
+    Every stage (fetch metadata, resolve, download, extract, verify) is exposed
+    as a coroutine and reports progress through ProgressEvent objects passed to
+    the listener instead of printing. Several AsyncInstaller instances can run
+    concurrently in the same event loop.
+
+    With pipelining enabled, the archive of each package starts downloading as
+    soon as resolution pins its version, while the rest of the dependency
+    graph is still being resolved. Versions are never revisited once pinned,
+    so a speculative download is only thrown away when resolution fails.
+
+    With streaming enabled, packages the registry declares as tar archives
+    are extracted while they download into a staging directory next to the
+    package directory, which replaces it once the download completes.
+
+    Archives are always extracted into a staging directory that is swapped
+    with the package directory, and each stage is written to the journal of
+    the current batch first, so recover() can finish or undo an interrupted
+    install.
+    """
+
+    def __init__(self, skin_root: str, registry: registry.Registry,
+                 listener: Optional[EventListener] = None,
+                 archive_pool: Optional[ArchivePool] = None,
+                 pipeline: bool = True, stream: bool = True):
+        self.skin_root = skin_root
+        if isinstance(registry, AsyncRegistry):
+            self.registry = registry
+        else:
+            self.registry = AsyncRegistry(registry)
+        # Shared archives are owned by the pool and must not be deleted after extraction
+        self.archive_pool = archive_pool
+        self.pipeline = pipeline
+        self.stream = stream
+        # Incremental installs skip packages the install state already records, see install_all
+        self.incremental = False
+        # Write-ahead journal of the batch in progress, see begin_batch
+        self.journal: Optional[journal.Journal] = None
+        # Journal of an interrupted batch picked up by recover(), continued by a matching begin_batch
+        self._recovered: Optional[journal.Journal] = None
+        self._state: Optional[Dict[str, Dict[str, Any]]] = None
+        # Speculative archive downloads started during resolution, by name@version
+        self._speculative: Dict[str, "asyncio.Future"] = {}
+        self.modules_dir = os.path.join(skin_root, "@Resources", "@rainmeas-modules")
+        self.listener = listener
+        # Track installed packages to avoid circular dependencies
+        self._installed_packages: Set[str] = set()
+        # Track explicitly requested packages (not dependencies)
+        self._explicitly_requested_packages: Set[str] = set()
+
+    def _emit(self, kind: str, package: Optional[str] = None, version: Optional[str] = None,
+              message: Optional[str] = None, **data: Any) -> None:
+        """Send a progress event to the listener, if any"""
+        if self.listener is not None:
+            self.listener(ProgressEvent(kind, package, version, message, **data))
+
+    async def fetch_metadata(self, package_name: str) -> Optional[Dict[str, Any]]:
+        """Fetch the registry metadata for a package"""
+        return await self.registry.get_package_info(package_name)
+
+    async def resolve(self, package_name: str, version: str = "latest",
+                      is_dependency: bool = False) -> List[ResolvedPackage]:
+        """Resolve a package and its dependencies into an install plan
+
+        The plan is ordered so that dependencies come before their dependents.
+        Packages already installed in this session are left out.
+        """
+        plan: List[ResolvedPackage] = []
+        seen = set(self._installed_packages)
+        try:
+            await self._resolve_into(plan, seen, package_name, version, is_dependency)
+        except BaseException:
+            await self._discard_speculative()
+            raise
+        return plan
+
+    async def _resolve_into(self, plan: List[ResolvedPackage], seen: Set[str],
+                            package_name: str, version: str, is_dependency: bool) -> None:
+        """Recursively add a package and its dependencies to the plan"""
+        if package_name in seen:
+            self._emit("skip", package_name, message=f"Skipping {package_name} (already installed in this session)")
+            return
+        seen.add(package_name)
+
+        package_info = await self.fetch_metadata(package_name)
+        if not package_info:
+            raise ResolutionError(f"Package '{package_name}' not found in registry")
+
+        package = self.registry.registry.get_package_model(package_name, package_info)
+
+        # Resolve version
+        if version == "latest":
+            version = package.latest
+            if not version:
+                raise ResolutionError(f"Could not determine latest version for package '{package_name}'")
+
+        # Check if version exists
+        entry = package.versions.get(version)
+        if entry is None:
+            raise ResolutionError(f"Version '{version}' not found for package '{package_name}'\n"
+                                  f"Available versions: {', '.join(package.sorted_versions)}")
+
+        # Get download URL
+        if not entry.download_url:
+            raise ResolutionError(f"No download URL found for {package_name}@{version}")
+
+        dependencies = entry.dependency_map()
+        resolved = ResolvedPackage(package_name, version, entry.download_url, dependencies, is_dependency,
+                                   archive_format=entry.archive_format)
+        if self.pipeline:
+            self._speculate(resolved)
+
+        if dependencies:
+            self._emit("dependencies", package_name, version,
+                       message=f"Found dependencies for {package_name}@{version}:",
+                       dependencies=dependencies)
+            for dep_name, dep_version in dependencies.items():
+                self._emit("dependency", dep_name, dep_version,
+                           message=f"  Installing dependency: {dep_name}@{dep_version}")
+                try:
+                    await self._resolve_into(plan, seen, dep_name, dep_version, True)
+                except ResolutionError as e:
+                    self._emit("error", dep_name, dep_version, message=str(e))
+                    raise ResolutionError(f"Failed to install dependency {dep_name}@{dep_version}")
+
+        plan.append(resolved)
+
+    def _speculate(self, package: ResolvedPackage) -> None:
+        """Start downloading a pinned package before the whole graph is resolved"""
+        key = f"{package.name}@{package.version}"
+        if key not in self._speculative and not self._already_installed(package):
+            if self._can_stream(package):
+                self._speculative[key] = asyncio.ensure_future(self.stream_extract(package))
+            else:
+                self._speculative[key] = asyncio.ensure_future(self._fetch_archive(package))
+
+    async def _discard_speculative(self) -> None:
+        """Cancel speculative downloads and delete archives nobody will extract"""
+        futures = list(self._speculative.values())
+        self._speculative.clear()
+        for future in futures:
+            future.cancel()
+        # Cancelled downloads delete their own files, once their threads have stopped writing
+        await asyncio.gather(*futures, return_exceptions=True)
+        for future in futures:
+            if not future.cancelled() and future.exception() is None:
+                path = future.result()
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif self.archive_pool is None and not self.owns_archive(path) and os.path.exists(path):
+                    os.unlink(path)
+
+    def _can_stream(self, package: ResolvedPackage) -> bool:
+        """Check whether a package should be extracted while it downloads"""
+        if not self.stream or self.archive_pool is not None or package.archive_format not in TAR_FORMATS:
+            return False
+        if self.registry.registry.offline:
+            return False
+        archive_cache = self.registry.registry.cache
+        return archive_cache is None or not archive_cache.has_archive(package.name, package.version,
+                                                                        package.download_url)
+
+    async def _fetch_archive(self, package: ResolvedPackage) -> str:
+        """Get the archive of a package through the shared pool or a direct download"""
+        if self.archive_pool is not None:
+            return await self.archive_pool.get(self, package)
+        return await self.download(package)
+
+    async def download(self, package: ResolvedPackage, emit: Optional[Callable[..., None]] = None) -> str:
+        """Download a resolved package archive, returning the local file path
+
+        With a registry cache the archive is served from, or stored into, the
+        cache and the returned path is owned by it (see owns_archive).
+        Otherwise a temporary file is returned. Progress events are passed to
+        emit, which defaults to this installer's listener.
+        """
+        archive_cache = self.registry.registry.cache
+        if archive_cache is None:
+            return await self._download(package, emit or self._emit)
+        # Another process downloading the same archive finishes first, this one then hits the cache
+        entry_lock = archive_cache.entry_lock(
+            archive_cache.archive_path(package.name, package.version, package.download_url))
+        acquiring = asyncio.ensure_future(asyncio.to_thread(entry_lock.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still takes the lock, give it back once it has
+            acquiring.add_done_callback(_release_if_acquired(entry_lock))
+            raise
+        try:
+            return await self._download(package, emit or self._emit)
+        finally:
+            entry_lock.release()
+
+    async def _download(self, package: ResolvedPackage, emit: Callable[..., None]) -> str:
+        archive_cache = self.registry.registry.cache
+        if archive_cache is not None:
+            cached_path = archive_cache.archive_path(package.name, package.version, package.download_url)
+            if os.path.isfile(cached_path):
+                archive_cache.record("archive_hits")
+                archive_cache.touch_archive(cached_path)
+                emit("cached", package.name, package.version, message=f"Using cached {package.name}@{package.version}...",
+                     path=cached_path)
+                return cached_path
+            archive_cache.record("archive_misses")
+        if self.registry.registry.offline:
+            raise cache.CacheMissError(f"{package.name}@{package.version} is not in the local cache (offline mode). "
+                                       f"Run 'rainmeas fetch' while online to populate it.")
+
+        # Create a temporary file for the downloaded ZIP
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as tmp_file:
+            tmp_filename = tmp_file.name
+
+        emit("download", package.name, package.version, message=f"Downloading {package.name}@{package.version}...",
+             url=package.download_url)
+        started = time.monotonic()
+        try:
+            await _run_cancellable(_download_to_file, package.download_url, tmp_filename,
+                                   lambda done, total: emit("download_progress", package.name, package.version,
+                                                            bytes=done, total=total))
+        except BaseException:
+            if os.path.exists(tmp_filename):
+                os.unlink(tmp_filename)
+            raise
+
+        if archive_cache is not None:
+            archive_cache.record_download(os.path.getsize(tmp_filename), time.monotonic() - started)
+            try:
+                return archive_cache.put_archive(package.name, package.version, package.download_url, tmp_filename)
+            except OSError:
+                # Fall back to the temporary file if the cache is not writable
+                pass
+        return tmp_filename
+
+    async def stream_extract(self, package: ResolvedPackage) -> str:
+        """Download a tar package and extract it on the fly, returning the staging directory
+
+        The archive is copied into the cache, if any, as it streams past.
+        """
+        os.makedirs(self.modules_dir, exist_ok=True)
+        staging_dir = _make_staging_dir(self.modules_dir, package.name)
+        with tempfile.NamedTemporaryFile(suffix='.archive', delete=False) as tmp_file:
+            tmp_filename = tmp_file.name
+
+        archive_cache = self.registry.registry.cache
+        if archive_cache is not None:
+            archive_cache.record("archive_misses")
+        self._emit("download", package.name, package.version, message=f"Downloading {package.name}@{package.version}...",
+                   url=package.download_url)
+        started = time.monotonic()
+        try:
+            await _run_cancellable(_stream_archive_to_dir, package.download_url, staging_dir, tmp_filename,
+                                   lambda done, total: self._emit("download_progress", package.name, package.version,
+                                                                  bytes=done, total=total))
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            if os.path.exists(tmp_filename):
+                os.unlink(tmp_filename)
+            raise
+
+        if archive_cache is not None:
+            archive_cache.record_download(os.path.getsize(tmp_filename), time.monotonic() - started)
+            await asyncio.to_thread(_put_archive_locked, archive_cache, package, tmp_filename)
+        if os.path.exists(tmp_filename):
+            os.unlink(tmp_filename)
+        return staging_dir
+
+    async def activate(self, package: ResolvedPackage, staging_dir: str) -> str:
+        """Replace the package directory with an already extracted staging directory"""
+        self._emit("extract", package.name, package.version, message="Extracting package...")
+        package_dir = await self._swap(package, staging_dir)
+        self._emit("extracted", package.name, package.version,
+                   message="Package downloaded and extracted successfully", path=package_dir)
+        return package_dir
+
+    async def _swap(self, package: ResolvedPackage, staging_dir: str) -> str:
+        """Move a complete staging directory into place, keeping the old one until it is done"""
+        package_dir = os.path.join(self.modules_dir, package.name)
+        backup_dir = os.path.join(self.modules_dir, f".{package.name}-old-{os.getpid()}")
+
+        def swap() -> None:
+            # Other processes may be installing or removing the same package
+            with locks.package_lock(self.modules_dir, package.name):
+                self._journal(package, "extracted", staging=staging_dir, backup=backup_dir)
+                _swap_dirs(staging_dir, package_dir, backup_dir)
+                self._journal(package, "swapped")
+
+        try:
+            await asyncio.to_thread(swap)
+        finally:
+            if os.path.isdir(staging_dir):
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        return package_dir
+
+    def owns_archive(self, archive_path: str) -> bool:
+        """Check whether an archive path belongs to the cache and must be kept"""
+        archive_cache = self.registry.registry.cache
+        return archive_cache is not None and archive_cache.owns(archive_path)
+
+    async def extract(self, package: ResolvedPackage, archive_path: str, keep_archive: bool = False) -> str:
+        """Extract a downloaded archive into the modules directory and remove it"""
+        self._emit("extract", package.name, package.version, message="Extracting package...")
+        os.makedirs(self.modules_dir, exist_ok=True)
+        staging_dir = _make_staging_dir(self.modules_dir, package.name)
+        self._journal(package, "extracting", staging=staging_dir)
+        try:
+            await _run_cancellable(_extract_archive, archive_path, staging_dir,
+                                   lambda done, total: self._emit("extract_progress", package.name, package.version,
+                                                                  files=done, total=total))
+            package_dir = await self._swap(package, staging_dir)
+        except BaseException:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        finally:
+            if not keep_archive and os.path.exists(archive_path):
+                os.unlink(archive_path)
+        self._emit("extracted", package.name, package.version,
+                   message="Package downloaded and extracted successfully", path=package_dir)
+        return package_dir
+
+    def begin_batch(self, command: str, packages: Dict[str, str]) -> bool:
+        """Start journaling a batch, returns False if one is already in progress
+
+        Resuming the batch recover() picked up continues its journal, any
+        other batch replaces it.
+        """
+        if self.journal is not None:
+            return False
+        recovered, self._recovered = self._recovered, None
+        if recovered is not None and recovered.command == command and recovered.packages == dict(packages):
+            self.journal = recovered
+            return True
+        if recovered is not None:
+            recovered.close()
+        self.journal = journal.Journal(self.modules_dir, command, dict(packages))
+        self.journal.acquire()
+        self.journal.save()
+        return True
+
+    def end_batch(self) -> None:
+        """Finish the current batch and remove its journal"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def abort_batch(self) -> None:
+        """Stop journaling a batch that failed part way, keeping its journal for recover()"""
+        if self.journal is not None:
+            self.journal.release()
+            self.journal = None
+
+    def _journal(self, package: ResolvedPackage, stage: str, **fields: Any) -> None:
+        """Record a stage of a package in the journal of the current batch"""
+        if self.journal is not None:
+            self.journal.update(package.name, stage, **fields)
+
+    def recover(self) -> Optional[RecoveryResult]:
+        """Finish or undo the packages of an interrupted batch, None if there is none
+
+        Packages whose new directory was completely extracted are moved into
+        place and recorded, anything earlier is rolled back. The journal is
+        kept, holding only finished packages, until the batch is resumed.
+        """
+        interrupted = journal.Journal.load(self.modules_dir)
+        if interrupted is None:
+            return None
+        result = RecoveryResult(interrupted.command, interrupted.packages)
+        for package_name, step in list(interrupted.steps.items()):
+            stage = step.get("stage")
+            package_dir = os.path.join(self.modules_dir, package_name)
+            staging_dir = step.get("staging")
+            backup_dir = step.get("backup")
+            with locks.package_lock(self.modules_dir, package_name):
+                stage = _recover_package_dir(stage, package_dir, staging_dir, backup_dir)
+            if stage == "swapped":
+                package = ResolvedPackage(package_name, step["version"], "", step.get("dependencies", {}),
+                                          step.get("dependency", False))
+                self._record_installed(package)
+                if not package.is_dependency:
+                    self._update_config(package.name, package.version)
+                stage = "done"
+                result.completed.append(package_name)
+
+            if stage == "done":
+                interrupted.update(package_name, "done")
+                continue
+            del interrupted.steps[package_name]
+            result.rolled_back.append(package_name)
+
+        # Staging directories of speculative downloads the journal never saw. Only the
+        # interrupted process's are removed, other processes may be installing right now.
+        if interrupted.pid is not None:
+            for item in os.listdir(self.modules_dir):
+                path = os.path.join(self.modules_dir, item)
+                if (item.startswith(".") and os.path.isdir(path)
+                        and (f"-{interrupted.pid}-" in item or item.endswith(f"-old-{interrupted.pid}"))):
+                    shutil.rmtree(path, ignore_errors=True)
+        interrupted.save()
+        self._recovered = interrupted
+        return result
+
+    def install_state(self) -> Dict[str, Dict[str, Any]]:
+        """Get the recorded versions and dependencies of the installed modules"""
+        if self._state is None:
+            self._state = utils.load_install_state(self.modules_dir)
+        return self._state
+
+    def _record_installed(self, package: ResolvedPackage) -> None:
+        """Record an installed package in the install state"""
+        # Reloaded under the lock, other processes may have recorded packages since
+        with locks.state_lock(self.modules_dir):
+            state = utils.load_install_state(self.modules_dir)
+            state[package.name] = {"version": package.version, "dependencies": dict(package.dependencies)}
+            utils.save_install_state(self.modules_dir, state)
+        self._state = state
+
+    def forget_installed(self, package_name: str) -> None:
+        """Drop a removed package from the install state"""
+        with locks.state_lock(self.modules_dir):
+            state = utils.load_install_state(self.modules_dir)
+            if state.pop(package_name, None) is not None:
+                utils.save_install_state(self.modules_dir, state)
+        self._state = state
+
+    def _already_installed(self, package: ResolvedPackage) -> bool:
+        """Check whether an incremental install can keep the installed copy of a package"""
+        if not self.incremental:
+            return False
+        entry = self.install_state().get(package.name)
+        return (entry is not None and entry.get("version") == package.version
+                and os.path.isdir(os.path.join(self.modules_dir, package.name)))
+
+    def is_satisfied(self, package_name: str, version: str, _seen: Optional[Set[str]] = None) -> bool:
+        """Check from the install state alone whether a package and its dependencies are installed
+
+        "latest" is satisfied by any installed version, upgrading is left to update.
+        """
+        seen = _seen if _seen is not None else set()
+        if package_name in seen:
+            return True
+        seen.add(package_name)
+        entry = self.install_state().get(package_name)
+        if entry is None or not os.path.isdir(os.path.join(self.modules_dir, package_name)):
+            return False
+        if version not in ("latest", "@latest") and entry.get("version") != version:
+            return False
+        return all(self.is_satisfied(dep_name, dep_version, seen)
+                   for dep_name, dep_version in entry.get("dependencies", {}).items())
+
+    def remove_unlisted(self, packages: Dict[str, str]) -> List[str]:
+        """Remove recorded modules that neither the manifest nor its dependencies need"""
+        with locks.state_lock(self.modules_dir):
+            self._state = None
+            return self._remove_unlisted(packages)
+
+    def _remove_unlisted(self, packages: Dict[str, str]) -> List[str]:
+        state = self.install_state()
+        needed: Set[str] = set()
+        pending = list(packages)
+        while pending:
+            package_name = pending.pop()
+            if package_name in needed:
+                continue
+            needed.add(package_name)
+            pending.extend(state.get(package_name, {}).get("dependencies", {}))
+
+        removed = []
+        for package_name in sorted(set(state) - needed):
+            package_dir = os.path.join(self.modules_dir, package_name)
+            with locks.package_lock(self.modules_dir, package_name):
+                if os.path.isdir(package_dir):
+                    shutil.rmtree(package_dir)
+            del state[package_name]
+            removed.append(package_name)
+            self._emit("remove", package_name, message=f"Removed {package_name} (no longer needed by the manifest)")
+        if removed:
+            utils.save_install_state(self.modules_dir, state)
+        return removed
+
+    async def install_resolved(self, package: ResolvedPackage) -> bool:
+        """Download and extract a single resolved package and record it"""
+        # Mark as being installed to prevent circular dependencies
+        self._installed_packages.add(package.name)
+
+        # Add to explicitly requested packages if not a dependency
+        if not package.is_dependency:
+            self._explicitly_requested_packages.add(package.name)
+
+        if self._already_installed(package):
+            self._emit("skip", package.name, package.version,
+                       message=f"{package.name}@{package.version} is already installed")
+            return True
+
+        # Create modules directory if it doesn't exist
+        os.makedirs(self.modules_dir, exist_ok=True)
+        self._journal(package, "planned", version=package.version, dependencies=dict(package.dependencies),
+                      dependency=package.is_dependency)
+
+        self._emit("install", package.name, package.version,
+                   message=f"Installing {package.name}@{package.version}...\nDownload URL: {package.download_url}")
+        try:
+            speculative = self._speculative.pop(f"{package.name}@{package.version}", None)
+            if speculative is not None:
+                archive_path = await speculative
+            elif self._can_stream(package):
+                archive_path = await self.stream_extract(package)
+            else:
+                archive_path = await self._fetch_archive(package)
+            self._journal(package, "downloaded")
+            if os.path.isdir(archive_path):
+                await self.activate(package, archive_path)
+            else:
+                keep_archive = self.archive_pool is not None or self.owns_archive(archive_path)
+                await self.extract(package, archive_path, keep_archive=keep_archive)
+        except (cache.CacheMissError, throttle.ThrottledError):
+            raise
+        except Exception as e:
+            self._emit("error", package.name, package.version,
+                       message=f"Error downloading or extracting package: {e}")
+            return False
+
+        self._record_installed(package)
+
+        # Update rainmeas config only for explicitly requested packages, not dependencies
+        if not package.is_dependency:
+            self._update_config(package.name, package.version)
+        self._journal(package, "done")
+
+        self._emit("installed", package.name, package.version,
+                   message=f"Successfully installed {package.name}@{package.version}")
+        return True
+
+    async def install_package(self, package_name: str, version: str = "latest",
+                              is_dependency: bool = False) -> InstallResult:
+        """Install a package and its dependencies"""
+        # Another process may have changed the install state since the last package
+        self._state = None
+        if package_name in self._installed_packages:
+            self._emit("skip", package_name, message=f"Skipping {package_name} (already installed in this session)")
+            return InstallResult(package_name, None, True, skipped=True)
+
+        try:
+            plan = await self.resolve(package_name, version, is_dependency)
+        except ResolutionError as e:
+            self._emit("error", package_name, message=str(e))
+            return InstallResult(package_name, None, False, error=str(e))
+
+        result = InstallResult(package_name, plan[-1].version if plan else None, True)
+        try:
+            for item in plan:
+                if not await self.install_resolved(item):
+                    result.success = False
+                    result.error = f"Failed to install {item.name}@{item.version}"
+                    return result
+                result.installed.append(f"{item.name}@{item.version}")
+        finally:
+            # Downloads for packages that will not be installed after a failure
+            await self._discard_speculative()
+        return result
+
+    async def install_all(self, packages: Dict[str, str], prune: bool = True) -> List[InstallResult]:
+        """Install all packages from a manifest with dependency handling
+
+        The install is incremental: packages whose recorded version and
+        directory already satisfy the manifest are left alone without any
+        registry access. With prune, recorded modules the manifest no longer
+        needs are removed.
+        """
+        # Reset the installed packages tracker for this session
+        self._installed_packages.clear()
+        self._explicitly_requested_packages.clear()
+        self._state = None
+
+        # Add all packages to explicitly requested packages
+        for package_name in packages.keys():
+            self._explicitly_requested_packages.add(package_name)
+
+        changed = {name: version for name, version in packages.items() if not self.is_satisfied(name, version)}
+        if not changed:
+            removed = self.remove_unlisted(packages) if prune else []
+            self._emit("summary", message=f"All {len(packages)} packages are up to date"
+                       + (f", {len(removed)} removed" if removed else ""),
+                       succeeded=len(packages), failed=0)
+            return [InstallResult(name, self.install_state()[name]["version"], True, skipped=True)
+                    for name in packages]
+
+        self._emit("begin", message="Installing packages with dependency resolution...")
+        results = []
+        self.incremental = True
+        try:
+            for package_name, version in packages.items():
+                if package_name not in changed:
+                    version = self.install_state()[package_name]["version"]
+                    self._emit("skip", package_name, version, message=f"{package_name}@{version} is up to date")
+                    results.append(InstallResult(package_name, version, True, skipped=True))
+                    continue
+                # Handle @latest version specifier
+                if version == "@latest":
+                    version = "latest"
+                results.append(await self.install_package(package_name, version))
+        finally:
+            self.incremental = False
+
+        if prune and all(result.success for result in results):
+            self.remove_unlisted(packages)
+
+        success_count = sum(1 for r in results if r.success)
+        fail_count = len(results) - success_count
+        self._emit("summary", message=f"\nInstallation summary: {success_count} succeeded, {fail_count} failed",
+                   succeeded=success_count, failed=fail_count)
+        return results
+
+    async def prefetch(self, packages: Dict[str, str]) -> List[ResolvedPackage]:
+        """Resolve a manifest and download every archive it needs into the cache
+
+        Returns the resolved packages. Nothing is extracted into the skin root.
+        """
+        # Nothing is extracted, so tar packages are downloaded like any other archive
+        stream, self.stream = self.stream, False
+        try:
+            return await self._prefetch(packages)
+        finally:
+            self.stream = stream
+
+    async def _resolve_manifest(self, packages: Dict[str, str]) -> List[ResolvedPackage]:
+        """Resolve every package of a manifest into one plan"""
+        plan: List[ResolvedPackage] = []
+        seen: Set[str] = set()
+        for package_name, version in packages.items():
+            if version == "@latest":
+                version = "latest"
+            try:
+                await self._resolve_into(plan, seen, package_name, version, False)
+            except BaseException as e:
+                await self._discard_speculative()
+                if isinstance(e, ResolutionError):
+                    self._emit("error", package_name, message=str(e))
+                raise
+        return plan
+
+    async def plan(self, packages: Dict[str, str], incremental: bool = False) -> InstallPlan:
+        """Resolve a manifest and size its archives without writing anything
+
+        Archives that are not cached are sized with concurrent HEAD requests,
+        which go through the per-host scheduler like downloads do. An
+        incremental plan leaves out what install_all would keep installed.
+        """
+        if incremental:
+            self._state = None
+            packages = {name: version for name, version in packages.items() if not self.is_satisfied(name, version)}
+        pipeline, self.pipeline = self.pipeline, False
+        was_incremental, self.incremental = self.incremental, incremental
+        try:
+            resolved = await self._resolve_manifest(packages)
+            install_plan = InstallPlan([package for package in resolved if not self._already_installed(package)])
+        finally:
+            self.pipeline = pipeline
+            self.incremental = was_incremental
+
+        archive_cache = self.registry.registry.cache
+        pending = []
+        for package in install_plan.packages:
+            key = f"{package.name}@{package.version}"
+            if archive_cache is not None and archive_cache.has_archive(package.name, package.version,
+                                                                       package.download_url):
+                install_plan.cached.add(key)
+                install_plan.sizes[key] = 0
+            elif self.registry.registry.offline:
+                raise cache.CacheMissError(f"{key} is not in the local cache (offline mode). "
+                                           f"Run 'rainmeas fetch' while online to populate it.")
+            else:
+                pending.append(package)
+        sizes = await asyncio.gather(*[asyncio.to_thread(_fetch_content_length, package.download_url)
+                                       for package in pending])
+        for package, size in zip(pending, sizes):
+            install_plan.sizes[f"{package.name}@{package.version}"] = size
+        return install_plan
+
+    async def _prefetch(self, packages: Dict[str, str]) -> List[ResolvedPackage]:
+        plan = await self._resolve_manifest(packages)
+
+        self._emit("prefetch", message=f"Fetching {len(plan)} package archives...", count=len(plan))
+        for package in plan:
+            self._speculate(package)
+        pending = [self._speculative.pop(f"{package.name}@{package.version}") for package in plan]
+        paths = await asyncio.gather(*pending, return_exceptions=True)
+        errors = [path for path in paths if isinstance(path, BaseException)]
+        if errors:
+            for path in paths:
+                if isinstance(path, str) and not self.owns_archive(path):
+                    os.unlink(path)
+            raise errors[0]
+        for package, path in zip(plan, paths):
+            # Without a cache the archive would only be a throwaway temp file
+            if not self.owns_archive(path):
+                os.unlink(path)
+            self._emit("fetched", package.name, package.version,
+                       message=f"Fetched {package.name}@{package.version}")
+        return plan
+
+    async def verify(self) -> Dict[str, bool]:
+        """Check that every package recorded in the config exists on disk"""
+        installed_packages = utils.get_installed_packages(self.skin_root)
+        results = {}
+        for package_name, version in installed_packages.items():
+            package_dir = os.path.join(self.modules_dir, package_name)
+            ok = await asyncio.to_thread(os.path.exists, package_dir)
+            results[package_name] = ok
+            status = "OK" if ok else "MISSING"
+            mark = "✓" if ok else "✗"
+            self._emit("verify", package_name, version,
+                       message=f"{mark} {package_name}@{version} - {status}", ok=ok)
+        return results
+
+    def _update_config(self, package_name: str, version: str) -> None:
+        """Update rainmeas config with installed package"""
+        with locks.config_lock(self.modules_dir):
+            config = utils.load_rainmeas_config(self.skin_root)
+
+            if "packages" not in config:
+                config["packages"] = {}
+
+            config["packages"][package_name] = version
+
+            utils.save_rainmeas_config(self.skin_root, config)
+
+
+def get_package_dependencies(package_info: Dict[str, Any], version: str) -> Dict[str, str]:
+    """Get dependencies for a specific package version"""
+    versions = package_info.get("versions", {})
+
+    # Check if dependencies are defined at the version level
+    if version in versions and isinstance(versions[version], dict):
+        return versions[version].get("dependencies", {})
+
+    return {}
+
+
+# Size of the blocks read from the network while downloading
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+async def _run_cancellable(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking download or extraction in a thread, stopping it when the caller is cancelled
+
+    Cancelling a to_thread() call does not stop its thread, which would keep
+    writing while the caller cleans up. func gets a threading.Event as its
+    cancelled argument, checked between chunks, and the caller waits for the
+    thread to stop before the cancellation reaches it.
+    """
+    cancelled = threading.Event()
+    worker = asyncio.ensure_future(asyncio.to_thread(func, *args, cancelled=cancelled))
+    try:
+        return await asyncio.shield(worker)
+    except asyncio.CancelledError:
+        cancelled.set()
+        await asyncio.gather(worker, return_exceptions=True)
+        raise
+
+
+def _check_cancelled(cancelled: Optional[threading.Event]) -> None:
+    if cancelled is not None and cancelled.is_set():
+        raise OperationCancelled()
+
+
+def _release_if_acquired(lock: "locks.FileLock") -> Callable[["asyncio.Future"], None]:
+    """Done callback releasing a lock whose acquire() ran in a thread nobody waits for anymore"""
+    def release(future: "asyncio.Future") -> None:
+        if not future.cancelled() and future.exception() is None:
+            lock.release()
+    return release
+
+
+def _fetch_content_length(url: str) -> Optional[int]:
+    """Get the size of a URL with a HEAD request, None if the server does not say"""
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with throttle.get_scheduler().open(request) as response:
+            length = response.headers.get("Content-Length")
+    except throttle.ThrottledError:
+        raise
+    except Exception:
+        return None
+    return int(length) if length and length.isdigit() else None
+
+
+def _download_to_file(url: str, path: str, on_progress: Optional[ProgressCallback] = None,
+                      cancelled: Optional[threading.Event] = None) -> None:
+    """Download a URL to a file, reporting (bytes done, total bytes or None)"""
+    with throttle.get_scheduler().open(url) as response, open(path, 'wb') as f:
+        length = response.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        done = 0
+        if on_progress is not None:
+            on_progress(done, total)
+        while True:
+            _check_cancelled(cancelled)
+            chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.write(chunk)
+            done += len(chunk)
+            if on_progress is not None:
+                on_progress(done, total)
+
+
+# Leading bytes of the supported archive formats, plain tar is recognised by "ustar" at offset 257
+ARCHIVE_MAGIC = ((b"PK\x03\x04", "zip"), (b"PK\x05\x06", "zip"), (b"\x1f\x8b", "tar.gz"),
+                 (b"\xfd7zXZ\x00", "tar.xz"), (b"BZh", "tar.bz2"))
+# Formats that can be extracted while downloading
+TAR_FORMATS = ("tar", "tar.gz", "tgz", "tar.xz", "tar.bz2")
+# Bytes needed to detect any of the formats above
+MAGIC_SIZE = 512
+
+
+def detect_archive_format(header: bytes) -> Optional[str]:
+    """Detect an archive format from its first bytes, None if unknown"""
+    for magic, archive_format in ARCHIVE_MAGIC:
+        if header.startswith(magic):
+            return archive_format
+    if header[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+class _StreamReader:
+    """File-like view of an HTTP response for tarfile's stream mode
+
+    Replays the bytes already read for format detection and copies
+    everything read to a file, so the archive can be cached afterwards.
+    """
+
+    def __init__(self, response: Any, head: bytes, copy: Any, total: Optional[int],
+                 on_progress: Optional[ProgressCallback] = None, cancelled: Optional[threading.Event] = None):
+        self.response = response
+        self.cancelled = cancelled
+        self.head = head
+        self.copy = copy
+        self.total = total
+        self.on_progress = on_progress
+        self.done = len(head)
+        copy.write(head)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.head:
+            if size < 0 or size >= len(self.head):
+                data, self.head = self.head, b""
+            else:
+                data, self.head = self.head[:size], self.head[size:]
+            return data
+        _check_cancelled(self.cancelled)
+        data = self.response.read(size if size >= 0 else None)
+        if data:
+            self.copy.write(data)
+            self.done += len(data)
+            if self.on_progress is not None:
+                self.on_progress(self.done, self.total)
+        return data
+
+    def drain(self) -> None:
+        """Read the rest of the response, e.g. padding after the end of a tar archive"""
+        self.head = b""
+        while self.read(DOWNLOAD_CHUNK_SIZE):
+            pass
+
+
+def _stream_archive_to_dir(url: str, staging_dir: str, archive_path: str,
+                           on_progress: Optional[ProgressCallback] = None,
+                           cancelled: Optional[threading.Event] = None) -> None:
+    """Download an archive into archive_path and extract it into staging_dir
+
+    Tar archives are extracted from the response as it arrives. Anything
+    else, e.g. a zip served for a package declared as tar, is extracted
+    after the download completes.
+    """
+    with throttle.get_scheduler().open(url) as response, open(archive_path, 'wb') as f:
+        length = response.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        head = b""
+        while len(head) < MAGIC_SIZE:
+            chunk = response.read(MAGIC_SIZE - len(head))
+            if not chunk:
+                break
+            head += chunk
+        reader = _StreamReader(response, head, f, total, on_progress, cancelled)
+        if on_progress is not None:
+            on_progress(reader.done, total)
+        streamed = detect_archive_format(head) in TAR_FORMATS
+        if streamed:
+            with tarfile.open(fileobj=reader, mode="r|*") as tar:
+                _extract_tar_members(tar, tar, staging_dir, cancelled=cancelled)
+        reader.drain()
+    if not streamed:
+        _extract_archive(archive_path, staging_dir, cancelled=cancelled)
+
+
+def _extract_tar_members(tar: tarfile.TarFile, members: Any, dest: str,
+                         on_progress: Optional[ProgressCallback] = None, total: Optional[int] = None,
+                         cancelled: Optional[threading.Event] = None) -> None:
+    """Extract tar members, refusing absolute paths, parent references and links outside dest"""
+    for done, member in enumerate(members, 1):
+        _check_cancelled(cancelled)
+        if hasattr(tarfile, "data_filter"):
+            tar.extract(member, dest, filter="data")
+        elif not (os.path.isabs(member.name) or ".." in member.name.replace("\\", "/").split("/")
+                  or member.issym() or member.islnk() or member.isdev()):
+            tar.extract(member, dest)
+        if on_progress is not None:
+            on_progress(done, total)
+
+
+def _extract_archive(archive_path: str, dest: str, on_progress: Optional[ProgressCallback] = None,
+                     cancelled: Optional[threading.Event] = None) -> None:
+    """Extract a zip or tar archive, detected by its magic bytes"""
+    with open(archive_path, 'rb') as f:
+        archive_format = detect_archive_format(f.read(MAGIC_SIZE))
+
+    if archive_format in TAR_FORMATS:
+        with tarfile.open(archive_path, "r:*") as tar:
+            members = tar.getmembers()
+            _extract_tar_members(tar, members, dest, on_progress, len(members), cancelled)
+        return
+
+    # Extract ZIP file member by member so progress can be reported
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        for done, member in enumerate(members, 1):
+            _check_cancelled(cancelled)
+            zip_ref.extract(member, dest)
+            if on_progress is not None:
+                on_progress(done, len(members))
+
+
+def _put_archive_locked(archive_cache: "cache.Cache", package: ResolvedPackage, tmp_filename: str) -> None:
+    """Store a downloaded archive in the cache under its entry lock"""
+    path = archive_cache.archive_path(package.name, package.version, package.download_url)
+    try:
+        with archive_cache.entry_lock(path):
+            archive_cache.put_archive(package.name, package.version, package.download_url, tmp_filename)
+    except OSError:
+        pass
+
+
+def _recover_package_dir(stage: Optional[str], package_dir: str, staging_dir: Optional[str],
+                         backup_dir: Optional[str]) -> Optional[str]:
+    """Finish or undo the directory change of one journaled package, returning its stage
+
+    An "extracted" package is moved into place and becomes "swapped". Earlier
+    stages are rolled back, restoring the old directory from its backup.
+    """
+    if stage == "extracted":
+        if staging_dir and os.path.isdir(staging_dir):
+            _swap_dirs(staging_dir, package_dir, backup_dir)
+            stage = "swapped"
+        elif os.path.isdir(package_dir):
+            # The swap finished before the journal was updated
+            stage = "swapped"
+    if stage in ("swapped", "done"):
+        if backup_dir and os.path.isdir(backup_dir):
+            shutil.rmtree(backup_dir)
+        return stage
+    if staging_dir and os.path.isdir(staging_dir):
+        shutil.rmtree(staging_dir)
+    if backup_dir and os.path.isdir(backup_dir) and not os.path.exists(package_dir):
+        os.replace(backup_dir, package_dir)
+    return stage
+
+
+def _make_staging_dir(modules_dir: str, package_name: str) -> str:
+    """Create a uniquely named staging directory for a package
+
+    Unlike tempfile.mkdtemp(), which creates it 0700, the directory gets the
+    usual umask permissions, which it keeps once swapped into place.
+    """
+    while True:
+        staging_dir = os.path.join(modules_dir, f".{package_name}-{os.getpid()}-{os.urandom(4).hex()}")
+        try:
+            os.mkdir(staging_dir)
+            return staging_dir
+        except FileExistsError:
+            continue
+
+
+def _swap_dirs(staging_dir: str, package_dir: str, backup_dir: Optional[str]) -> None:
+    """Replace the package directory with a staging directory on the same filesystem
+
+    The old directory is renamed to backup_dir first and only deleted once
+    the new one is in place, so a crash never leaves the package missing.
+    """
+    if os.path.exists(package_dir):
+        if backup_dir:
+            if os.path.exists(backup_dir):
+                shutil.rmtree(backup_dir)
+            os.replace(package_dir, backup_dir)
+        else:
+            shutil.rmtree(package_dir)
+    os.replace(staging_dir, package_dir)
+    if backup_dir and os.path.exists(backup_dir):
+        shutil.rmtree(backup_dir)
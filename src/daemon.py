@@ -0,0 +1,193 @@
+import contextlib
+import io
+import json
+import os
+import secrets
+import socketserver
+import sys
+import threading
+from typing import Dict, Any, Optional
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import registry
+        import cache
+        import daemon_client
+        return registry, cache, daemon_client
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import registry
+        import cache
+        import daemon_client
+        return registry, cache, daemon_client
+
+# Import modules
+try:
+    registry, cache, daemon_client = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Seconds between background refreshes of the in-memory registry data
+REFRESH_INTERVAL = 300
+
+# The client side lives in daemon_client, which the entry points use without importing the registry
+FORWARDED_COMMANDS = daemon_client.FORWARDED_COMMANDS
+CONNECT_TIMEOUT = daemon_client.CONNECT_TIMEOUT
+state_file_path = daemon_client.state_file_path
+send_request = daemon_client.send_request
+forward = daemon_client.forward
+
+
+class WarmRegistry(registry.Registry):
+    """Registry that keeps every fetched metadata file in memory
+
+    Entries are refreshed by calling refresh(), which the daemon does
+    periodically from a background thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._memory: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._memory_lock = threading.Lock()
+
+    def _fetch_remote_json(self, url: str, optional: bool = False) -> Optional[Dict[str, Any]]:
+        with self._memory_lock:
+            if url in self._memory:
+                return self._memory[url]
+        data = super()._fetch_remote_json(url, optional)
+        # Missing optional files are remembered too, so they are not refetched every call
+        if data is not None or optional:
+            with self._memory_lock:
+                self._memory[url] = data
+        return data
+
+    def refresh(self) -> None:
+        """Refetch every cached URL, keeping the old data when a fetch fails"""
+        with self._memory_lock:
+            urls = list(self._memory.keys())
+        for url in urls:
+            data = registry.Registry._fetch_remote_json(self, url, optional=True)
+            with self._memory_lock:
+                if data is not None or self._memory.get(url) is None:
+                    self._memory[url] = data
+
+    def warm(self) -> None:
+        """Load the index, search index and every package file into memory"""
+        self._fetch_remote_json(f"{self.remote_base_url}/search-index.json", optional=True)
+        for package_name in self.list_all_package_names():
+            self.get_package_model(package_name)
+        try:
+            self.save_snapshot()
+        except OSError:
+            pass
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+        except ValueError:
+            return
+        if not secrets.compare_digest(str(request.get("token", "")), self.server.daemon.token):
+            return
+        response = self.server.daemon.handle(request)
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Daemon:
+    """Local server keeping registry state warm for CLI invocations
+
+    Listens on a random localhost port advertised, together with an access
+    token and the registry it serves, in state_file_path(). Commands run
+    against a shared WarmRegistry, one at a time because their output is
+    captured from stdout.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, refresh_interval: float = REFRESH_INTERVAL):
+        self.registry = WarmRegistry(cache=cache.Cache(), base_url=base_url)
+        # Clients using another registry run their commands themselves
+        self.base_url = self.registry.remote_base_url
+        self.refresh_interval = refresh_interval
+        self.token = secrets.token_hex(16)
+        self._server: Optional[_Server] = None
+        self._stop = threading.Event()
+        self._command_lock = threading.Lock()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute one client request"""
+        if request.get("command") == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"exit_code": 0, "stdout": "Daemon stopping\n"}
+        if request.get("command") == "ping":
+            return {"exit_code": 0, "stdout": "", "pid": os.getpid()}
+
+        args = request.get("args", [])
+        # Imported lazily because cli imports this module
+        import cli
+        output = io.StringIO()
+        with self._command_lock, contextlib.redirect_stdout(output):
+            try:
+                cli_instance = cli.RainmeasCLI(package_registry=self.registry, skin_root=request.get("cwd"))
+                exit_code = cli_instance.run(args)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print(f"Error: {e}")
+                exit_code = 1
+        return {"exit_code": exit_code, "stdout": output.getvalue()}
+
+    def _refresh_loop(self) -> None:
+        try:
+            self.registry.warm()
+        except Exception as e:
+            print(f"Error warming registry data: {e}")
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.registry.refresh()
+            except Exception as e:
+                print(f"Error refreshing registry data: {e}")
+
+    def serve_forever(self) -> None:
+        """Start listening and block until shutdown() is called"""
+        self._server = _Server(("127.0.0.1", 0), _RequestHandler)
+        self._server.daemon = self
+        port = self._server.server_address[1]
+
+        path = state_file_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"port": port, "pid": os.getpid(), "token": self.token, "registry": self.base_url}, f)
+
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        print(f"rainmeas daemon listening on 127.0.0.1:{port} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            daemon_client.remove_state_file(self.token)
+
+    def shutdown(self) -> None:
+        """Stop serving requests and the refresh thread"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
@@ -0,0 +1,126 @@
+import json
+import os
+import socket
+import sys
+from typing import Dict, Any, Optional, List
+
+# This module is imported by the entry points before the CLI, to hand commands
+# to a running daemon, so it only imports stdlib modules that load instantly.
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Read-only commands that are answered by a running daemon
+FORWARDED_COMMANDS = ("search", "info", "list")
+# Seconds the client waits for the daemon before running in-process
+CONNECT_TIMEOUT = 0.5
+# Same as registry.DEFAULT_REGISTRY_URL
+DEFAULT_REGISTRY_URL = "https://raw.githubusercontent.com/Rainmeas/rainmeas-registry/main"
+# Global options taking a value, which forward_argv skips over to find the command
+VALUE_OPTIONS = ("--registry", "--progress")
+
+
+def default_cache_dir() -> str:
+    """Same location as cache.default_cache_dir(), without importing the cache module"""
+    override = os.environ.get("RAINMEAS_CACHE_DIR")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "rainmeas", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "rainmeas")
+
+
+def state_file_path() -> str:
+    """Get the path of the file advertising a running daemon"""
+    return os.path.join(default_cache_dir(), "daemon.json")
+
+
+def remove_state_file(token: Optional[str] = None) -> None:
+    """Remove the state file, if it still belongs to the daemon with this token"""
+    path = state_file_path()
+    try:
+        if token is not None:
+            with open(path, 'r') as f:
+                if json.load(f).get("token") != token:
+                    return
+        os.unlink(path)
+    except (OSError, ValueError):
+        pass
+
+
+def send_request(request: Dict[str, Any], timeout: float = CONNECT_TIMEOUT,
+                 base_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Send a request to the running daemon, or return None if there is none
+
+    With base_url, None is also returned when the daemon serves another registry.
+    """
+    try:
+        with open(state_file_path(), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if base_url is not None and state.get("registry") != base_url.rstrip("/"):
+        return None
+
+    request = dict(request, token=state.get("token"))
+    try:
+        with socket.create_connection(("127.0.0.1", state["port"]), timeout=timeout) as sock:
+            # Commands may take longer than connecting, e.g. a search on a cold daemon
+            sock.settimeout(None)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            data = b""
+            while not data.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data.decode("utf-8")) if data else None
+    except ConnectionRefusedError:
+        # The daemon died without cleaning up
+        remove_state_file(state.get("token"))
+        return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def forward(args: List[str], cwd: str, base_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Run a CLI command in the daemon serving base_url, returning None to fall back to in-process"""
+    return send_request({"args": args, "cwd": cwd}, base_url=base_url)
+
+
+def forward_argv(args: List[str], cwd: str) -> Optional[Dict[str, Any]]:
+    """Forward a raw command line to the daemon before the CLI is imported
+
+    Only the global options are looked at, to find the command and the
+    registry it would use. None means the CLI has to run the command, e.g.
+    for --offline, options this parser does not know or no daemon.
+    """
+    if os.environ.get("RAINMEAS_NO_DAEMON") == "1" or os.environ.get("RAINMEAS_OFFLINE") == "1":
+        return None
+    base_url = os.environ.get("RAINMEAS_REGISTRY") or DEFAULT_REGISTRY_URL
+    index = 0
+    while index < len(args) and args[index].startswith("-"):
+        option, has_value, value = args[index].partition("=")
+        if option not in VALUE_OPTIONS:
+            return None
+        if not has_value:
+            index += 1
+            if index >= len(args):
+                return None
+            value = args[index]
+        if option == "--registry":
+            base_url = value
+        index += 1
+    if index >= len(args) or args[index] not in FORWARDED_COMMANDS:
+        return None
+    return forward(args, cwd, base_url)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Any, List, Tuple
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Hash index kept in the modules directory, maps files to (size, mtime, sha256)
+INDEX_FILE = ".rainmeas-dedupe.json"
+# Files skins commonly rewrite in place at runtime (WriteKeyValue, settings, logs).
+# They are never linked, since a write would show up in every module sharing the file.
+EXCLUDED_SUFFIXES = (".ini", ".inc", ".txt", ".json", ".log", ".cfg")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class DedupeResult:
+    """Outcome of a deduplication run"""
+
+    def __init__(self):
+        self.files = 0
+        self.hashed = 0
+        self.linked: List[str] = []
+        self.bytes_saved = 0
+
+
+def _hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _load_index(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(path: str, index: Dict[str, Any]) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _iter_module_files(modules_dir: str):
+    """Yield (relative path, absolute path) of every dedupable module file"""
+    for entry in sorted(os.listdir(modules_dir)):
+        module_dir = os.path.join(modules_dir, entry)
+        # Staging directories of installs in progress start with a dot
+        if entry.startswith(".") or not os.path.isdir(module_dir) or os.path.islink(module_dir):
+            continue
+        for dirpath, dirnames, filenames in os.walk(module_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(EXCLUDED_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, filename)
+                if os.path.islink(path):
+                    continue
+                yield os.path.relpath(path, modules_dir).replace(os.sep, "/"), path
+
+
+def _link_over(source: str, target: str) -> bool:
+    """Atomically replace target with a hardlink to source"""
+    tmp_path = f"{target}.rainmeas-link"
+    try:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        os.link(source, tmp_path)
+        os.replace(tmp_path, target)
+        return True
+    except OSError:
+        # Filesystems without hardlinks (FAT, some network shares) keep their copies
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+
+def dedupe_modules(modules_dir: str) -> DedupeResult:
+    """Hardlink files with identical content across the installed modules
+
+    Hashes are cached in INDEX_FILE keyed on size and mtime, so re-runs only
+    hash new or changed files. Linking is safe with installs, updates and
+    removals because they never write into an existing file: a package is
+    always replaced by a freshly extracted directory, which leaves the other
+    links untouched (copy-on-modify through the staged install).
+    """
+    result = DedupeResult()
+    if not os.path.isdir(modules_dir):
+        return result
+
+    index_path = os.path.join(modules_dir, INDEX_FILE)
+    old_index = _load_index(index_path)
+    new_index: Dict[str, List[Any]] = {}
+    # (size, sha256) -> (path, device, inode) of the first file with that content
+    canonical: Dict[Tuple[int, str], Tuple[str, int, int]] = {}
+
+    for relpath, path in _iter_module_files(modules_dir):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if stat.st_size == 0:
+            continue
+        result.files += 1
+
+        cached = old_index.get(relpath)
+        if isinstance(cached, list) and len(cached) == 3 and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = cached[2]
+        else:
+            try:
+                digest = _hash_file(path)
+            except OSError:
+                continue
+            result.hashed += 1
+
+        key = (stat.st_size, digest)
+        first = canonical.get(key)
+        if first is None:
+            canonical[key] = (path, stat.st_dev, stat.st_ino)
+        elif (stat.st_dev, stat.st_ino) != first[1:] and first[1] == stat.st_dev and _link_over(first[0], path):
+            result.linked.append(relpath)
+            result.bytes_saved += stat.st_size
+            stat = os.stat(path)
+        new_index[relpath] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    # Entries of removed or updated modules are dropped by rebuilding the index
+    _save_index(index_path, new_index)
+    return result
@@ -1,10 +1,8 @@
+import asyncio
 import os
 import json
 import shutil
 import sys
-import urllib.request
-import zipfile
-import tempfile
 from typing import Dict, Any, Optional, Set
 
 # Handle PyInstaller environment
@@ -24,138 +22,61 @@ def import_modules():
     try:
         import registry
         import utils
-        return registry, utils
+        import core
+        import locks
+        return registry, utils, core, locks
     except ImportError:
         # Try alternative import paths for PyInstaller
         sys.path.append(resource_path('src'))
         import registry
         import utils
-        return registry, utils
+        import core
+        import locks
+        return registry, utils, core, locks
 
 # Import modules
 try:
-    registry, utils = import_modules()
+    registry, utils, core, locks = import_modules()
 except Exception as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
 
+def print_event(event: core.ProgressEvent) -> None:
+    """Render a core progress event on stdout the way the CLI always has"""
+    if event.message is not None:
+        print(event.message)
+
 class Installer:
-    def __init__(self, skin_root: str, registry: registry.Registry):
+    """Synchronous wrapper over core.AsyncInstaller used by the CLI"""
+
+    def __init__(self, skin_root: str, registry: registry.Registry,
+                 listener: Optional[core.EventListener] = None):
         self.skin_root = skin_root
         self.registry = registry
-        self.modules_dir = os.path.join(skin_root, "@Resources", "@rainmeas-modules")
+        self.core = core.AsyncInstaller(skin_root, registry, listener=listener or print_event)
+        self.modules_dir = self.core.modules_dir
         # Track installed packages to avoid circular dependencies
-        self._installed_packages: Set[str] = set()
+        self._installed_packages: Set[str] = self.core._installed_packages
         # Track explicitly requested packages (not dependencies)
-        self._explicitly_requested_packages: Set[str] = set()
+        self._explicitly_requested_packages: Set[str] = self.core._explicitly_requested_packages
     
     def install_package(self, package_name: str, version: str = "latest", is_dependency: bool = False) -> bool:
         """Install a package and its dependencies"""
-        # Check for circular dependency
-        if package_name in self._installed_packages:
-            print(f"Skipping {package_name} (already installed in this session)")
-            return True
-            
-        # Get package info from registry
-        package_info = self.registry.get_package_info(package_name)
-        if not package_info:
-            print(f"Package '{package_name}' not found in registry")
-            return False
-        
-        # Resolve version
-        if version == "latest":
-            version = self.registry.get_latest_version(package_name)
-            if not version:
-                print(f"Could not determine latest version for package '{package_name}'")
-                return False
-        
-        # Check if version exists
-        available_versions = self.registry.get_available_versions(package_name)
-        if version not in available_versions:
-            print(f"Version '{version}' not found for package '{package_name}'")
-            print(f"Available versions: {', '.join(available_versions)}")
-            return False
-        
-        # Get download URL
-        download_url = self.registry.get_version_download_url(package_name, version)
-        if not download_url:
-            print(f"No download URL found for {package_name}@{version}")
-            return False
-        
-        # Check for dependencies and install them first
-        dependencies = self._get_package_dependencies(package_info, version)
-        if dependencies:
-            print(f"Found dependencies for {package_name}@{version}:")
-            for dep_name, dep_version in dependencies.items():
-                print(f"  Installing dependency: {dep_name}@{dep_version}")
-                if not self.install_package(dep_name, dep_version, is_dependency=True):
-                    print(f"Failed to install dependency {dep_name}@{dep_version}")
-                    return False
-        
-        # Mark as being installed to prevent circular dependencies
-        self._installed_packages.add(package_name)
-        
-        # Add to explicitly requested packages if not a dependency
-        if not is_dependency:
-            self._explicitly_requested_packages.add(package_name)
-        
-        # Create modules directory if it doesn't exist
-        os.makedirs(self.modules_dir, exist_ok=True)
-        
-        # Download and extract package
-        print(f"Installing {package_name}@{version}...")
-        print(f"Download URL: {download_url}")
-        
-        # Create a temporary file for the downloaded ZIP
-        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as tmp_file:
-            tmp_filename = tmp_file.name
-        
+        began = self.core.begin_batch("install-package", {package_name: version})
         try:
-            # Download the ZIP file
-            print("Downloading package...")
-            urllib.request.urlretrieve(download_url, tmp_filename)
-            
-            # Extract the ZIP file to the package directory
-            print("Extracting package...")
-            package_dir = os.path.join(self.modules_dir, package_name)
-            
-            # Remove existing package directory if it exists
-            if os.path.exists(package_dir):
-                shutil.rmtree(package_dir)
-            
-            # Extract ZIP file
-            with zipfile.ZipFile(tmp_filename, 'r') as zip_ref:
-                zip_ref.extractall(package_dir)
-            
-            # Clean up temporary file
-            os.unlink(tmp_filename)
-            
-            print("Package downloaded and extracted successfully")
-            
-        except Exception as e:
-            # Clean up temporary file if it exists
-            if 'tmp_filename' in locals() and os.path.exists(tmp_filename):
-                os.unlink(tmp_filename)
-            
-            print(f"Error downloading or extracting package: {e}")
-            return False
-        
-        # Update rainmeas config only for explicitly requested packages, not dependencies
-        if not is_dependency:
-            self._update_config(package_name, version)
-        
-        print(f"Successfully installed {package_name}@{version}")
-        return True
+            result = asyncio.run(self.core.install_package(package_name, version, is_dependency))
+        except Exception:
+            # Failures such as rate limiting or a lock timeout leave the batch to recover() and --resume
+            if began:
+                self.core.abort_batch()
+            raise
+        if began:
+            self.core.end_batch()
+        return result.success
     
     def _get_package_dependencies(self, package_info: Dict[str, Any], version: str) -> Dict[str, str]:
         """Get dependencies for a specific package version"""
-        versions = package_info.get("versions", {})
-        
-        # Check if dependencies are defined at the version level
-        if version in versions and isinstance(versions[version], dict):
-            return versions[version].get("dependencies", {})
-            
-        return {}
+        return core.get_package_dependencies(package_info, version)
     
     def remove_package(self, package_name: str) -> bool:
         """Remove a package"""
@@ -167,8 +88,7 @@ class Installer:
         
         # Remove package directory
         package_dir = os.path.join(self.modules_dir, package_name)
-        if os.path.exists(package_dir):
-            shutil.rmtree(package_dir)
+        if self.remove_module(package_name):
             print(f"Removed package directory: {package_dir}")
         
         # Update rainmeas config
@@ -177,6 +97,17 @@ class Installer:
         print(f"Successfully removed {package_name}")
         return True
     
+    def remove_module(self, package_name: str) -> bool:
+        """Remove the directory of a module and drop it from the install state, returns False if it was not there"""
+        package_dir = os.path.join(self.modules_dir, package_name)
+        removed = False
+        with locks.package_lock(self.modules_dir, package_name):
+            if os.path.exists(package_dir):
+                shutil.rmtree(package_dir)
+                removed = True
+        self.core.forget_installed(package_name)
+        return removed
+    
     def _get_installed_packages(self) -> Dict[str, str]:
         """Get installed packages from config"""
         config = utils.load_rainmeas_config(self.skin_root)
@@ -184,23 +115,17 @@ class Installer:
     
     def _update_config(self, package_name: str, version: str) -> None:
         """Update rainmeas config with installed package"""
-        config = utils.load_rainmeas_config(self.skin_root)
-        
-        if "packages" not in config:
-            config["packages"] = {}
-        
-        config["packages"][package_name] = version
-        
-        utils.save_rainmeas_config(self.skin_root, config)
+        self.core._update_config(package_name, version)
     
     def _remove_from_config(self, package_name: str) -> None:
         """Remove package from rainmeas config"""
-        config = utils.load_rainmeas_config(self.skin_root)
-        
-        if "packages" in config and package_name in config["packages"]:
-            del config["packages"][package_name]
-        
-        utils.save_rainmeas_config(self.skin_root, config)
+        with locks.config_lock(self.modules_dir):
+            config = utils.load_rainmeas_config(self.skin_root)
+            
+            if "packages" in config and package_name in config["packages"]:
+                del config["packages"][package_name]
+            
+            utils.save_rainmeas_config(self.skin_root, config)
     
     def list_installed_packages(self) -> Dict[str, str]:
         """List all installed packages"""
@@ -218,40 +143,43 @@ class Installer:
         try:
             for item in os.listdir(self.modules_dir):
                 item_path = os.path.join(self.modules_dir, item)
-                # Check if it's a directory
-                if os.path.isdir(item_path):
+                # Check if it's a directory, skipping staging directories of installs in progress
+                if os.path.isdir(item_path) and not item.startswith("."):
                     installed_packages.add(item)
         except Exception as e:
             print(f"Error scanning modules directory: {e}")
         
         return installed_packages
     
-    def install_all_packages(self, packages: Dict[str, str]) -> bool:
+    def install_all_packages(self, packages: Dict[str, str], prune: bool = True, command: str = "install") -> bool:
         """Install all packages with dependency handling"""
-        success_count = 0
-        fail_count = 0
-        
-        print("Installing packages with dependency resolution...")
-        
-        # Reset the installed packages tracker for this session
-        self._installed_packages.clear()
-        self._explicitly_requested_packages.clear()
-        
-        # Add all packages to explicitly requested packages
-        for package_name in packages.keys():
-            self._explicitly_requested_packages.add(package_name)
-        
-        for package_name, version in packages.items():
-            # Handle @latest version specifier
-            if version == "@latest":
-                result = self.install_package(package_name, "latest")
-            else:
-                result = self.install_package(package_name, version)
-            
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-        
-        print(f"\nInstallation summary: {success_count} succeeded, {fail_count} failed")
-        return fail_count == 0
+        began = self.core.begin_batch(command, packages)
+        try:
+            results = asyncio.run(self.core.install_all(packages, prune))
+        except Exception:
+            if began:
+                self.core.abort_batch()
+            raise
+        if began:
+            self.core.end_batch()
+        return all(result.success for result in results)
+    
+    def begin_batch(self, command: str, packages: Dict[str, str]) -> bool:
+        """Journal several installs as one batch, see core.AsyncInstaller.begin_batch"""
+        return self.core.begin_batch(command, packages)
+    
+    def end_batch(self) -> None:
+        """Finish a batch started with begin_batch"""
+        self.core.end_batch()
+    
+    def abort_batch(self) -> None:
+        """Stop a batch that failed part way, keeping its journal for recover()"""
+        self.core.abort_batch()
+    
+    def recover(self) -> Optional["core.RecoveryResult"]:
+        """Finish or undo the packages of an interrupted batch"""
+        return self.core.recover()
+    
+    def verify_packages(self) -> Dict[str, bool]:
+        """Verify that every configured package exists on disk"""
+        return asyncio.run(self.core.verify())
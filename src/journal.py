@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import locks
+        return locks
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import locks
+        return locks
+
+# Import modules
+try:
+    locks = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Journals of batches in progress are kept in the modules directory as
+# <JOURNAL_PREFIX>-<id>.json, one per batch so separate processes can install at once
+JOURNAL_PREFIX = ".rainmeas-journal"
+
+# Stages of a package, in order. "extracting" and "extracted" record the
+# staging directory, "extracted" also the backup the old directory moves to.
+STAGES = ("planned", "downloaded", "extracting", "extracted", "swapped", "done")
+
+
+class Journal:
+    """Write-ahead journal of a batch of package installs
+
+    Every stage change is written to disk before the next filesystem change,
+    so an interrupted batch can be finished or rolled back package by package
+    instead of being redone. The file is removed when the batch completes.
+
+    The process running the batch holds the journal's lock, so load() only
+    picks up journals whose process is gone.
+    """
+
+    def __init__(self, modules_dir: str, command: str, packages: Dict[str, str],
+                 steps: Optional[Dict[str, Dict[str, Any]]] = None, started: Optional[str] = None,
+                 path: Optional[str] = None, pid: Optional[int] = None):
+        self.modules_dir = modules_dir
+        self.path = path or os.path.join(modules_dir, f"{JOURNAL_PREFIX}-{uuid.uuid4().hex[:12]}.json")
+        self.command = command
+        # The manifest of the batch, so it can be resumed
+        self.packages = packages
+        self.steps: Dict[str, Dict[str, Any]] = steps or {}
+        self.started = started or time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        # Process that ran the batch, its staging directories carry this pid
+        self.pid = pid if pid is not None else os.getpid()
+        self.lock = locks.FileLock(os.path.join(modules_dir, locks.LOCKS_DIR,
+                                                f"journal-{os.path.basename(self.path)}.lock"))
+        # Packages of one batch are extracted from several threads
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, modules_dir: str) -> Optional["Journal"]:
+        """Load and lock the journal of an interrupted batch, if there is one
+
+        Journals locked by a running process are skipped.
+        """
+        try:
+            names = sorted(name for name in os.listdir(modules_dir)
+                           if name.startswith(JOURNAL_PREFIX) and name.endswith(".json"))
+        except OSError:
+            return None
+        for name in names:
+            interrupted = cls(modules_dir, "install", {}, path=os.path.join(modules_dir, name), pid=-1)
+            interrupted.lock.timeout = 0
+            try:
+                interrupted.lock.acquire()
+            except locks.LockTimeout:
+                continue
+            try:
+                with open(interrupted.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if not isinstance(data, dict):
+                interrupted.lock.release()
+                continue
+            interrupted.command = data.get("command", "install")
+            interrupted.packages = data.get("packages", {})
+            interrupted.steps = data.get("steps", {})
+            interrupted.started = data.get("started") or interrupted.started
+            interrupted.pid = data.get("pid")
+            return interrupted
+        return None
+
+    def acquire(self) -> None:
+        """Take ownership of the journal for the running batch"""
+        self.lock.acquire()
+
+    def update(self, package_name: str, stage: str, **fields: Any) -> None:
+        """Record that a package reached a stage"""
+        with self._write_lock:
+            step = self.steps.setdefault(package_name, {})
+            step.update(fields)
+            step["stage"] = stage
+            self._save()
+
+    def save(self) -> None:
+        """Durably write the journal"""
+        with self._write_lock:
+            self._save()
+
+    def _save(self) -> None:
+        os.makedirs(self.modules_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"command": self.command, "packages": self.packages, "started": self.started,
+                       "pid": self.pid, "steps": self.steps}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def release(self) -> None:
+        """Give up the journal of a failed batch, keeping it for recovery by a later run"""
+        self.lock.release()
+
+    def close(self) -> None:
+        """Remove the journal after the batch completed"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.lock.release()
+        try:
+            os.unlink(self.lock.path)
+        except OSError:
+            pass
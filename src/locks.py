@@ -0,0 +1,173 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional
+try:
+    import msvcrt
+except ImportError:
+    # Not Windows
+    msvcrt = None
+    import fcntl
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Directory holding the lock files of a modules directory
+LOCKS_DIR = ".rainmeas-locks"
+
+# Seconds to wait for a lock held by another process, can be overridden with RAINMEAS_LOCK_TIMEOUT
+DEFAULT_TIMEOUT = 600.0
+
+# Seconds between attempts to take a lock held by another process
+POLL_INTERVAL = 0.05
+
+# In-process guards by lock path. The OS lock alone does not make threads of
+# one process wait for each other on every platform.
+_guards: Dict[str, threading.Lock] = {}
+_guards_lock = threading.Lock()
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a lock is still held by someone else after the timeout"""
+
+
+def default_timeout() -> float:
+    """Get the lock timeout, from RAINMEAS_LOCK_TIMEOUT or DEFAULT_TIMEOUT"""
+    try:
+        return float(os.environ.get("RAINMEAS_LOCK_TIMEOUT", DEFAULT_TIMEOUT))
+    except ValueError:
+        return DEFAULT_TIMEOUT
+
+
+def _try_lock(f: Any) -> bool:
+    try:
+        if msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f: Any) -> None:
+    if msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Exclusive lock shared between processes, backed by a lock file
+
+    The lock is an OS file lock (flock, or msvcrt.locking on Windows), which
+    the OS drops when the holding process dies, so a crashed holder never
+    blocks anyone. The holder writes its pid into the file and clears it on
+    release: an owner still recorded when the lock is taken means the last
+    holder died with it, and acquire() sets stale. Locks are not reentrant.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = default_timeout() if timeout is None else timeout
+        # Owner recorded by a holder that died without releasing, see acquire
+        self.stale: Optional[Dict[str, Any]] = None
+        self._file = None
+        self._guard: Optional[threading.Lock] = None
+
+    def acquire(self) -> "FileLock":
+        """Take the lock, raising LockTimeout if it is not free within the timeout"""
+        deadline = time.monotonic() + self.timeout
+        with _guards_lock:
+            guard = _guards.setdefault(os.path.abspath(self.path), threading.Lock())
+        if not guard.acquire(timeout=max(self.timeout, 0)):
+            raise LockTimeout(f"Timed out waiting for {self.path}, it is held by this process")
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            f = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT), 'r+')
+            while not _try_lock(f):
+                if time.monotonic() >= deadline:
+                    owner = self.owner()
+                    f.close()
+                    holder = f"pid {owner.get('pid')} on {owner.get('host')}" if owner else "another process"
+                    raise LockTimeout(f"Timed out after {self.timeout:g}s waiting for {self.path}, held by {holder}")
+                time.sleep(POLL_INTERVAL)
+        except BaseException:
+            guard.release()
+            raise
+
+        self.stale = self._read_owner(f)
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps({"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()}))
+        f.flush()
+        self._file = f
+        self._guard = guard
+        return self
+
+    def release(self) -> None:
+        """Release the lock, clearing the recorded owner"""
+        if self._file is None:
+            return
+        f, guard = self._file, self._guard
+        self._file = self._guard = None
+        try:
+            f.seek(0)
+            f.truncate()
+            f.flush()
+            _unlock(f)
+        finally:
+            f.close()
+            guard.release()
+
+    def owner(self) -> Optional[Dict[str, Any]]:
+        """Get the pid, host and time recorded by the current holder, if readable"""
+        try:
+            with open(self.path, 'r') as f:
+                return self._read_owner(f)
+        except OSError:
+            # Windows does not let other processes read the locked byte
+            return None
+
+    @staticmethod
+    def _read_owner(f: Any) -> Optional[Dict[str, Any]]:
+        try:
+            f.seek(0)
+            owner = json.loads(f.read() or "null")
+        except (OSError, ValueError):
+            return None
+        return owner if isinstance(owner, dict) else None
+
+    def __enter__(self) -> "FileLock":
+        return self.acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+def package_lock(modules_dir: str, package_name: str, timeout: Optional[float] = None) -> FileLock:
+    """Lock guarding the directory of one installed package"""
+    return FileLock(os.path.join(modules_dir, LOCKS_DIR, f"package-{package_name}.lock"), timeout)
+
+
+def state_lock(modules_dir: str, timeout: Optional[float] = None) -> FileLock:
+    """Lock guarding the install state file of a modules directory"""
+    return FileLock(os.path.join(modules_dir, LOCKS_DIR, "state.lock"), timeout)
+
+
+def config_lock(modules_dir: str, timeout: Optional[float] = None) -> FileLock:
+    """Lock guarding the rainmeas-package.json of the skin owning a modules directory"""
+    return FileLock(os.path.join(modules_dir, LOCKS_DIR, "config.lock"), timeout)
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import os
+import pathlib
+import posixpath
+import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Any, Optional, List, Tuple
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import semver
+        import throttle
+        import shards
+        return semver, throttle, shards
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import semver
+        import throttle
+        import shards
+        return semver, throttle, shards
+
+# Import modules
+try:
+    semver, throttle, shards = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Name of the file in the mirror root recording ETags and hashes of synced entries
+SYNC_STATE_FILE = ".rainmeas-sync.json"
+
+
+def build_search_index(packages: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the search-index.json content from package metadata"""
+    index = {}
+    for name, info in sorted(packages.items()):
+        versions = info.get("versions", {})
+        version_keys = [k for k in versions.keys() if k != "latest"]
+        # An explicit "latest" pointer wins over the highest version, as in model.Package
+        latest = versions.get("latest")
+        if not isinstance(latest, str) or not latest:
+            latest = max(version_keys, key=semver.version_key) if version_keys else None
+        index[name] = {
+            "description": info.get("description", ""),
+            "author": info.get("author", ""),
+            "latest": latest,
+            "versions": version_keys,
+        }
+    return index
+
+
+class SyncResult:
+    """Counters describing what a mirror sync did"""
+
+    def __init__(self):
+        self.updated: List[str] = []
+        self.unchanged: List[str] = []
+        self.removed: List[str] = []
+        self.archives_downloaded: List[str] = []
+        self.failed: List[str] = []
+
+    @property
+    def success(self) -> bool:
+        return not self.failed
+
+
+class RegistryMirror:
+    """Incrementally mirror a registry into a directory
+
+    The mirror has the same layout as the source (index.json and
+    packages/<name>.json) plus search-index.json and a sharded copy of the
+    index (see shards.py), so it can be served by any
+    static file server or used directly with a file:// URL. Unchanged entries
+    are skipped using ETags when the server sends them and content hashes
+    otherwise.
+    """
+
+    def __init__(self, source_base_url: str, dest: str, include_archives: bool = False,
+                 archive_base_url: Optional[str] = None, workers: int = 8):
+        self.source_base_url = source_base_url.rstrip("/")
+        self.dest = os.path.abspath(dest)
+        self.include_archives = include_archives
+        # Download URLs in mirrored package files are rewritten to this base
+        self.archive_base_url = (archive_base_url or pathlib.Path(self.dest).as_uri()).rstrip("/")
+        self.workers = workers
+        self._state: Dict[str, Dict[str, str]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _load_state(self) -> None:
+        path = os.path.join(self.dest, SYNC_STATE_FILE)
+        try:
+            with open(path, 'r') as f:
+                self._state = json.load(f)
+        except (OSError, ValueError):
+            self._state = {}
+
+    def _save_state(self) -> None:
+        self._write_file(os.path.join(self.dest, SYNC_STATE_FILE),
+                         json.dumps(self._state, indent=2, sort_keys=True).encode("utf-8"))
+
+    def _write_file(self, path: str, data: bytes) -> None:
+        """Write a file atomically so a server never hands out partial content"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _conditional_get(self, url: str, mode: str = "") -> Tuple[Optional[bytes], Optional[str]]:
+        """GET a URL, returning (None, etag) when the server reports it unchanged"""
+        state = self._state.get(url, {})
+        etag = state.get("etag") if state.get("mode", "") == mode else None
+        request = urllib.request.Request(url)
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with throttle.get_scheduler().open(request) as response:
+                return response.read(), response.headers.get("ETag")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None, etag
+            raise
+
+    async def _sync_file(self, url: str, path: str, transform=None, mode: str = "") -> Tuple[bool, Optional[bytes]]:
+        """Mirror one URL to a local path
+
+        Returns whether the local file changed and the source content, which is
+        None when the server answered 304 Not Modified. The mode string names
+        the transform applied, so changing it forces a rewrite.
+        """
+        if not os.path.exists(path):
+            self._state.pop(url, None)
+        async with self._semaphore:
+            data, etag = await asyncio.to_thread(self._conditional_get, url, mode)
+        if data is None:
+            return False, None
+
+        previous = self._state.get(url, {})
+        digest = hashlib.sha256(data).hexdigest()
+        changed = previous.get("sha256") != digest or previous.get("mode", "") != mode
+        if changed:
+            content = transform(data) if transform is not None else data
+            await asyncio.to_thread(self._write_file, path, content)
+        # Recorded only once the file is written, so a failed write is retried by the next sync
+        self._state[url] = {"sha256": digest, "mode": mode}
+        if etag:
+            self._state[url]["etag"] = etag
+        return changed, data
+
+    def _archive_relpath(self, package_name: str, version: str, url: str) -> str:
+        """Get the mirror-relative path of a package archive"""
+        filename = posixpath.basename(urllib.parse.urlparse(url).path) or "package.zip"
+        for part in (version, filename):
+            if not _is_safe_name(part):
+                raise ValueError(f"Invalid archive path component '{part}'")
+        return posixpath.join("archives", package_name, version, filename)
+
+    def _rewrite_downloads(self, package_name: str, data: bytes) -> bytes:
+        """Point the download URLs of a package file at the mirrored archives"""
+        info = json.loads(data.decode("utf-8"))
+        for version, entry in info.get("versions", {}).items():
+            if isinstance(entry, dict) and entry.get("download"):
+                relpath = self._archive_relpath(package_name, version, entry["download"])
+                entry["download"] = f"{self.archive_base_url}/{relpath}"
+        return json.dumps(info, indent=2).encode("utf-8")
+
+    async def _sync_package(self, package_name: str, result: SyncResult) -> bool:
+        """Mirror the file of one package, returns False if it failed"""
+        if not _is_safe_name(package_name):
+            # Names are joined into local paths, so they must not leave the mirror
+            result.failed.append(f"{package_name}: invalid package name")
+            return False
+        url = f"{self.source_base_url}/packages/{package_name}.json"
+        path = os.path.join(self.dest, "packages", f"{package_name}.json")
+        transform = None
+        mode = ""
+        if self.include_archives:
+            transform = lambda data: self._rewrite_downloads(package_name, data)
+            mode = f"archives:{self.archive_base_url}"
+        try:
+            changed, source = await self._sync_file(url, path, transform, mode)
+        except Exception as e:
+            result.failed.append(f"{package_name}: {e}")
+            return False
+
+        if source is not None:
+            # Remember the original archive URLs, the mirrored copy may be rewritten
+            info = json.loads(source.decode("utf-8"))
+            self._state[url]["downloads"] = {
+                version: entry["download"] for version, entry in info.get("versions", {}).items()
+                if isinstance(entry, dict) and entry.get("download")
+            }
+        (result.updated if changed else result.unchanged).append(package_name)
+        return True
+
+    async def _sync_archive(self, package_name: str, version: str, url: str, result: SyncResult) -> None:
+        try:
+            path = os.path.join(self.dest, *self._archive_relpath(package_name, version, url).split("/"))
+            # Published archives are immutable, so an existing copy is never refetched
+            if os.path.exists(path):
+                return
+            async with self._semaphore:
+                data = await asyncio.to_thread(_read_url, url)
+            await asyncio.to_thread(self._write_file, path, data)
+        except Exception as e:
+            result.failed.append(f"{package_name}@{version}: {e}")
+            return
+        result.archives_downloaded.append(f"{package_name}@{version}")
+
+    def _load_mirrored_packages(self, package_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read the mirrored package files back from disk"""
+        packages = {}
+        for package_name in package_names:
+            path = os.path.join(self.dest, "packages", f"{package_name}.json")
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    packages[package_name] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return packages
+
+    async def sync(self) -> SyncResult:
+        """Run an incremental sync of the whole registry"""
+        result = SyncResult()
+        self._semaphore = asyncio.Semaphore(self.workers)
+        os.makedirs(self.dest, exist_ok=True)
+        self._load_state()
+
+        index_url = f"{self.source_base_url}/index.json"
+        index_path = os.path.join(self.dest, "index.json")
+        if not os.path.exists(index_path):
+            self._state.pop(index_url, None)
+        async with self._semaphore:
+            index_data, index_etag = await asyncio.to_thread(self._conditional_get, index_url)
+        if index_data is None:
+            with open(index_path, 'rb') as f:
+                index_data = f.read()
+        index = json.loads(index_data.decode("utf-8"))
+
+        synced = await asyncio.gather(*(self._sync_package(name, result) for name in index.keys()))
+        # Names whose package file could not be mirrored are left out, unless an older copy is there.
+        # The source index is then not recorded, so the next sync fetches it again.
+        missing = [name for name, ok in zip(list(index.keys()), synced)
+                   if not ok and not (_is_safe_name(name)
+                                      and os.path.exists(os.path.join(self.dest, "packages", f"{name}.json")))]
+        if missing:
+            index = {name: entry for name, entry in index.items() if name not in missing}
+            index_data = json.dumps(index, indent=2).encode("utf-8")
+            index_etag = None
+
+        # Drop package files that are no longer listed in the index
+        packages_dir = os.path.join(self.dest, "packages")
+        for filename in sorted(os.listdir(packages_dir)) if os.path.isdir(packages_dir) else []:
+            name, ext = os.path.splitext(filename)
+            if ext == ".json" and name not in index:
+                os.unlink(os.path.join(packages_dir, filename))
+                self._state.pop(f"{self.source_base_url}/packages/{filename}", None)
+                result.removed.append(name)
+
+        if self.include_archives:
+            jobs = []
+            for package_name in index.keys():
+                state = self._state.get(f"{self.source_base_url}/packages/{package_name}.json", {})
+                for version, url in state.get("downloads", {}).items():
+                    jobs.append(self._sync_archive(package_name, version, url, result))
+            await asyncio.gather(*jobs)
+
+        packages = self._load_mirrored_packages(list(index.keys()))
+        self._write_file(os.path.join(self.dest, "search-index.json"),
+                         json.dumps(build_search_index(packages), indent=2).encode("utf-8"))
+        await asyncio.to_thread(shards.build_shards, index, self.dest)
+        # The index is written last so readers never see entries without package files
+        self._write_file(index_path, index_data)
+        if missing:
+            self._state.pop(index_url, None)
+        else:
+            self._state[index_url] = {"sha256": hashlib.sha256(index_data).hexdigest()}
+            if index_etag:
+                self._state[index_url]["etag"] = index_etag
+        self._save_state()
+        return result
+
+
+def _is_safe_name(name: Any) -> bool:
+    """Check that a package name or version from the source can be used as one path component"""
+    return (isinstance(name, str) and bool(name) and ".." not in name
+            and "/" not in name and "\\" not in name and os.sep not in name)
+
+
+def _read_url(url: str) -> bytes:
+    """Read the full body of a URL"""
+    return throttle.get_scheduler().fetch(url)
@@ -0,0 +1,169 @@
+import marshal
+import os
+import sys
+import tempfile
+from typing import Dict, Any, Optional, Tuple
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import semver
+        return semver
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import semver
+        return semver
+
+# Import modules
+try:
+    semver = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Snapshots are marshal data, which is only readable by the Python version that wrote it
+SNAPSHOT_MAGIC = b"RMSNAP1" + bytes(sys.version_info[:2])
+
+
+# Sort key for package versions, see semver.version_key
+version_key = semver.version_key
+
+
+class Dependency:
+    """A dependency of a package version, pinned to an exact version"""
+    __slots__ = ("name", "version")
+
+    def __init__(self, name: str, version: str):
+        self.name = name
+        self.version = version
+
+    def __repr__(self) -> str:
+        return f"Dependency({self.name}@{self.version})"
+
+
+class VersionEntry:
+    """One published version of a package"""
+    __slots__ = ("version", "download_url", "archive_format", "dependencies")
+
+    def __init__(self, version: str, download_url: Optional[str], archive_format: Optional[str] = None,
+                 dependencies: Tuple[Dependency, ...] = ()):
+        self.version = version
+        self.download_url = download_url
+        self.archive_format = archive_format
+        self.dependencies = dependencies
+
+    def dependency_map(self) -> Dict[str, str]:
+        return {dependency.name: dependency.version for dependency in self.dependencies}
+
+
+class Package:
+    """Registry metadata of a package, with versions sorted once on construction"""
+    __slots__ = ("name", "description", "author", "license", "homepage", "versions",
+                 "sorted_versions", "latest", "_name_lower", "_description_lower", "_author_lower")
+
+    def __init__(self, name: str, description: str = "", author: str = "", license: str = "",
+                 homepage: str = "", versions: Optional[Dict[str, VersionEntry]] = None,
+                 latest: Optional[str] = None, sorted_versions: Optional[Tuple[str, ...]] = None):
+        self.name = name
+        self.description = description
+        self.author = author
+        self.license = license
+        self.homepage = homepage
+        self.versions = versions or {}
+        if sorted_versions is None:
+            sorted_versions = tuple(sorted(self.versions, key=version_key))
+        self.sorted_versions: Tuple[str, ...] = sorted_versions
+        # An explicit "latest" pointer wins over the highest version
+        self.latest = latest or (self.sorted_versions[-1] if self.sorted_versions else None)
+        self._name_lower = name.lower()
+        self._description_lower = description.lower()
+        self._author_lower = author.lower()
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "Package":
+        """Build a package from the JSON of its registry file"""
+        versions = {}
+        latest = None
+        for version, entry in data.get("versions", {}).items():
+            if version == "latest":
+                latest = entry if isinstance(entry, str) else None
+                continue
+            if not isinstance(entry, dict):
+                entry = {}
+            dependencies = tuple(Dependency(dep_name, dep_version)
+                                 for dep_name, dep_version in (entry.get("dependencies") or {}).items())
+            versions[version] = VersionEntry(version, entry.get("download"), entry.get("format"), dependencies)
+        return cls(name, data.get("description") or "", data.get("author") or "", data.get("license") or "",
+                   data.get("homepage") or "", versions, latest)
+
+    def matches(self, query: str) -> bool:
+        """Check whether a lowercase query matches the name, description or author"""
+        return query in self._name_lower or query in self._description_lower or query in self._author_lower
+
+    def to_tuple(self) -> Tuple[Any, ...]:
+        """Flatten into plain tuples for a snapshot"""
+        return (self.name, self.description, self.author, self.license, self.homepage,
+                self.latest,
+                tuple((entry.version, entry.download_url, entry.archive_format,
+                       tuple((dependency.name, dependency.version) for dependency in entry.dependencies))
+                      for entry in (self.versions[version] for version in self.sorted_versions)))
+
+    @classmethod
+    def from_tuple(cls, data: Tuple[Any, ...]) -> "Package":
+        """Rebuild a package flattened by to_tuple, whose versions are already sorted"""
+        name, description, author, license, homepage, latest, versions = data
+        return cls(name, description, author, license, homepage,
+                   {version: VersionEntry(version, url, archive_format,
+                                          tuple(Dependency(*dependency) for dependency in dependencies))
+                    for version, url, archive_format, dependencies in versions},
+                   latest, tuple(version[0] for version in versions))
+
+
+def save_snapshot(path: str, entries: Dict[str, Tuple[Any, Any]]) -> None:
+    """Write a snapshot of {name: (source fingerprint, Package or its to_tuple())} atomically"""
+    payload = [(name, fingerprint, package.to_tuple() if isinstance(package, Package) else package)
+               for name, (fingerprint, package) in sorted(entries.items())]
+    data = SNAPSHOT_MAGIC + marshal.dumps(payload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path: str) -> Dict[str, Tuple[Any, Any]]:
+    """Load a snapshot written by save_snapshot, empty if missing or unreadable
+
+    Packages are returned flattened, so only the ones actually looked up pay
+    for building objects (Package.from_tuple).
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return {}
+    try:
+        payload = marshal.loads(data[len(SNAPSHOT_MAGIC):])
+        return {name: (fingerprint, package) for name, fingerprint, package in payload}
+    except (ValueError, TypeError, EOFError):
+        return {}
@@ -0,0 +1,278 @@
+import collections
+import concurrent.futures
+import os
+import struct
+import sys
+import time
+import zipfile
+import zlib
+from typing import Dict, Any, Optional, List, Tuple
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import utils
+        return utils
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import utils
+        return utils
+
+# Import modules
+try:
+    utils = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Compression level, fixed so identical inputs give identical bundles
+COMPRESS_LEVEL = 6
+# Files queued for compression per worker, bounds memory use on large skins
+QUEUE_DEPTH = 4
+# Bookkeeping files that never belong in a bundle
+EXCLUDED_NAMES = (".rainmeas-dedupe.json", ".rainmeas-state.json")
+# Journals of installs in progress, named <prefix>-<id>.json
+JOURNAL_PREFIX = ".rainmeas-journal"
+MODULES_PATH = ("@Resources", "@rainmeas-modules")
+# .rmskin bundles end with this footer after the zip data: size, flags, key
+RMSKIN_FOOTER = struct.Struct("<qB7s")
+RMSKIN_KEY = b"RMSKIN\x00"
+ZIP_LIMIT = 0xFFFFFFFF
+
+
+class PackError(Exception):
+    """Raised when a skin cannot be packed"""
+
+
+class PackResult:
+    """Outcome of packing a skin"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.files = 0
+        self.bytes = 0
+        self.compressed_bytes = 0
+        self.reused = 0
+
+
+def _dos_timestamp() -> Tuple[int, int]:
+    """Get the (time, date) stored for every entry, from SOURCE_DATE_EPOCH or 1980-01-01"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch or not epoch.isdigit():
+        return 0, (1 << 5) | 1
+    t = time.gmtime(max(int(epoch), 315532800))
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def collect_files(skin_root: str, prefix: str = "", exclude: Tuple[str, ...] = ()) -> List[Tuple[str, str]]:
+    """List (archive name, path) of every file in a skin, sorted by archive name"""
+    exclude = tuple(os.path.abspath(path) for path in exclude)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(skin_root):
+        rel_dir = os.path.relpath(dirpath, skin_root)
+        if rel_dir.split(os.sep)[-2:] == list(MODULES_PATH):
+            # Staging directories of installs in progress
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if (filename in EXCLUDED_NAMES or filename.startswith(JOURNAL_PREFIX)
+                    or os.path.abspath(path) in exclude):
+                continue
+            arcname = os.path.relpath(path, skin_root).replace(os.sep, "/")
+            files.append((prefix + arcname, path))
+    files.sort()
+    return files
+
+
+class _ArchiveIndex:
+    """Compressed members of cached module archives, looked up by module and member name
+
+    Unchanged module files are copied from the registry archive they were
+    extracted from instead of being compressed again. Only archives of the
+    version recorded in the install state are used, whatever else is cached.
+    """
+
+    def __init__(self, archives_dir: Optional[str], versions: Dict[str, str]):
+        self.archives_dir = archives_dir
+        self.versions = versions
+        self._modules: Dict[str, Dict[str, Tuple[str, zipfile.ZipInfo]]] = {}
+
+    def lookup(self, module: str, member: str) -> Optional[Tuple[str, zipfile.ZipInfo]]:
+        if module not in self._modules:
+            self._modules[module] = self._load(module)
+        return self._modules[module].get(member)
+
+    def _load(self, module: str) -> Dict[str, Tuple[str, zipfile.ZipInfo]]:
+        members: Dict[str, Tuple[str, zipfile.ZipInfo]] = {}
+        module_dir = os.path.join(self.archives_dir, module) if self.archives_dir else None
+        version = self.versions.get(module)
+        if not module_dir or not version or not os.path.isdir(module_dir):
+            return members
+        # Cached archives are named <version>-<url key>
+        paths = [os.path.join(module_dir, name) for name in sorted(os.listdir(module_dir))
+                 if name.startswith(f"{version}-")]
+        for path in paths:
+            if not zipfile.is_zipfile(path):
+                continue
+            try:
+                with zipfile.ZipFile(path) as zf:
+                    for info in zf.infolist():
+                        if (not info.is_dir() and info.compress_type == zipfile.ZIP_DEFLATED
+                                and not info.flag_bits & 0x1 and info.filename not in members):
+                            members[info.filename] = (path, info)
+            except (OSError, zipfile.BadZipFile):
+                continue
+        return members
+
+
+def _read_raw_member(archive_path: str, info: zipfile.ZipInfo) -> bytes:
+    """Read the compressed bytes of a zip member without inflating them"""
+    with open(archive_path, 'rb') as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        if header[:4] != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        return f.read(info.compress_size)
+
+
+def _prepare_entry(path: str, candidate: Optional[Tuple[str, zipfile.ZipInfo]]) -> Tuple[int, int, int, bytes, bool]:
+    """Compress a file, returning (method, crc, size, data, reused)"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    crc = zlib.crc32(content)
+    if candidate is not None:
+        archive_path, info = candidate
+        if info.file_size == len(content) and info.CRC == crc:
+            try:
+                return zipfile.ZIP_DEFLATED, crc, len(content), _read_raw_member(archive_path, info), True
+            except (OSError, zipfile.BadZipFile):
+                pass
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    data = compressor.compress(content) + compressor.flush()
+    if len(data) >= len(content):
+        return zipfile.ZIP_STORED, crc, len(content), content, False
+    return zipfile.ZIP_DEFLATED, crc, len(content), data, False
+
+
+class _ZipWriter:
+    """Minimal zip writer for entries that are already compressed"""
+
+    def __init__(self, f: Any):
+        self.f = f
+        self.central: List[bytes] = []
+        self.dos_time, self.dos_date = _dos_timestamp()
+
+    def add(self, arcname: str, method: int, crc: int, size: int, data: bytes) -> None:
+        name = arcname.encode("utf-8")
+        offset = self.f.tell()
+        if max(offset, size, len(data)) >= ZIP_LIMIT or len(self.central) >= 0xFFFF:
+            raise PackError("Bundle exceeds the zip format limits (4 GB or 65535 files)")
+        # Bit 11 marks UTF-8 names
+        flags = 0x800 if not arcname.isascii() else 0
+        fields = (20, flags, method, self.dos_time, self.dos_date, crc, len(data), size, len(name))
+        self.f.write(struct.pack("<IHHHHHIIIHH", 0x04034b50, *fields, 0) + name)
+        self.f.write(data)
+        self.central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, 20, *fields,
+                                        0, 0, 0, 0, 0, offset) + name)
+
+    def finish(self) -> None:
+        offset = self.f.tell()
+        for record in self.central:
+            self.f.write(record)
+        size = self.f.tell() - offset
+        self.f.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, len(self.central), len(self.central),
+                                 size, offset, 0))
+
+
+def rmskin_ini(name: str, author: str = "", version: str = "") -> bytes:
+    """Build the RMSKIN.ini describing a bundle"""
+    lines = ["[rmskin]", f"Name={name}", f"Author={author}", f"Version={version}"]
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+
+def pack_skin(skin_root: str, output: str, bundle_format: str = "rmskin", jobs: Optional[int] = None,
+              archives_dir: Optional[str] = None, metadata: Optional[Dict[str, str]] = None) -> PackResult:
+    """Pack a skin into a zip or .rmskin bundle
+
+    Files are compressed in parallel and written in sorted order with fixed
+    timestamps, so identical inputs give byte-identical bundles. When
+    archives_dir (the archive cache) is given, module files that still match
+    the cached archive of their installed version reuse its compressed data,
+    which makes the bundle depend on what is cached too.
+    """
+    skin_root = os.path.abspath(skin_root)
+    if not os.path.isdir(skin_root):
+        raise PackError(f"{skin_root} is not a directory")
+    skin_name = os.path.basename(skin_root)
+    metadata = metadata or {}
+
+    # .rmskin bundles install the skin folder under Skins\
+    prefix = f"Skins/{skin_name}/" if bundle_format == "rmskin" else ""
+    tmp_path = output + ".tmp"
+    files = collect_files(skin_root, prefix, exclude=(output, tmp_path))
+    installed = utils.load_install_state(os.path.join(skin_root, *MODULES_PATH))
+    versions = {name: entry.get("version") for name, entry in installed.items() if isinstance(entry, dict)}
+    index = _ArchiveIndex(archives_dir, versions)
+    modules_prefix = prefix + "/".join(MODULES_PATH) + "/"
+
+    def candidate(arcname: str) -> Optional[Tuple[str, zipfile.ZipInfo]]:
+        if not arcname.startswith(modules_prefix):
+            return None
+        module, _, member = arcname[len(modules_prefix):].partition("/")
+        return index.lookup(module, member) if member else None
+
+    result = PackResult(output)
+    workers = jobs or os.cpu_count() or 1
+    try:
+        with open(tmp_path, 'wb') as f, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            writer = _ZipWriter(f)
+            if bundle_format == "rmskin":
+                ini = rmskin_ini(metadata.get("name") or skin_name, metadata.get("author", ""),
+                                 metadata.get("version", ""))
+                writer.add("RMSKIN.ini", zipfile.ZIP_STORED, zlib.crc32(ini), len(ini), ini)
+
+            # Entries are written in order while later files are still compressing
+            pending: "collections.deque" = collections.deque()
+            queue = iter(files)
+            while True:
+                while len(pending) < workers * QUEUE_DEPTH:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    arcname, path = item
+                    pending.append((arcname, executor.submit(_prepare_entry, path, candidate(arcname))))
+                if not pending:
+                    break
+                arcname, future = pending.popleft()
+                method, crc, size, data, reused = future.result()
+                writer.add(arcname, method, crc, size, data)
+                result.files += 1
+                result.bytes += size
+                result.compressed_bytes += len(data)
+                result.reused += reused
+            writer.finish()
+
+            if bundle_format == "rmskin":
+                f.write(RMSKIN_FOOTER.pack(f.tell(), 0, RMSKIN_KEY))
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return result
@@ -0,0 +1,232 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional, Callable, TextIO
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Minimum seconds between two renders of the live display / NDJSON snapshots
+TTY_INTERVAL = 0.1
+NDJSON_INTERVAL = 1.0
+
+
+def format_bytes(count: float) -> str:
+    """Format a byte count for humans"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GB"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """Format a remaining time estimate"""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class Transfer:
+    """Download and extract progress of one package"""
+
+    __slots__ = ("key", "stage", "started", "bytes_done", "bytes_total",
+                 "files_done", "files_total", "finished")
+
+    def __init__(self, key: str, now: float):
+        self.key = key
+        self.stage = "download"
+        self.started = now
+        self.bytes_done = 0
+        self.bytes_total: Optional[int] = None
+        self.files_done = 0
+        self.files_total: Optional[int] = None
+        self.finished: Optional[float] = None
+
+    def rate(self, now: float) -> float:
+        """Average download speed in bytes per second"""
+        elapsed = (self.finished or now) - self.started
+        return self.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self, now: float) -> Optional[float]:
+        """Seconds until the download completes, if it can be estimated"""
+        rate = self.rate(now)
+        if self.bytes_total is None or rate <= 0:
+            return None
+        return max(0.0, (self.bytes_total - self.bytes_done) / rate)
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "package": self.key,
+            "stage": self.stage,
+            "bytes": self.bytes_done,
+            "total_bytes": self.bytes_total,
+            "bytes_per_second": round(self.rate(now)),
+            "eta_seconds": None if self.eta(now) is None else round(self.eta(now), 1),
+            "files_extracted": self.files_done,
+            "total_files": self.files_total,
+        }
+
+
+class ProgressReporter:
+    """Event listener that tracks transfers and renders throttled progress
+
+    In "tty" mode a multi-line live display is redrawn on the stream, in
+    "ndjson" mode one JSON snapshot per line is written periodically and in
+    "none" mode only the messages are printed. Events may arrive from worker
+    threads. Rendering happens at most once per interval, so per-chunk events
+    only cost a dictionary update.
+    """
+
+    def __init__(self, mode: str = "auto", stream: Optional[TextIO] = None,
+                 message_printer: Optional[Callable[[Any], None]] = None,
+                 interval: Optional[float] = None):
+        self.stream = stream or sys.stderr
+        if mode == "auto":
+            mode = "tty" if self.stream.isatty() else "ndjson"
+        self.mode = mode
+        self.interval = interval if interval is not None else (TTY_INTERVAL if mode == "tty" else NDJSON_INTERVAL)
+        self.message_printer = message_printer or _print_message
+        self.transfers: Dict[str, Transfer] = {}
+        self._lock = threading.Lock()
+        self._last_render = float("-inf")
+        self._drawn_lines = 0
+        self._started = time.monotonic()
+
+    def __call__(self, event) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._track(event, now)
+            if event.message is not None:
+                self._clear()
+                self.message_printer(event)
+                self._render(now, force=True)
+            else:
+                self._render(now)
+
+    def _track(self, event, now: float) -> None:
+        if event.package is None:
+            return
+        key = f"{event.package}@{event.version}"
+        transfer = self.transfers.get(key)
+        if event.kind in ("download", "cached"):
+            transfer = self.transfers[key] = Transfer(key, now)
+            if event.kind == "cached":
+                transfer.stage = "cached"
+        if transfer is None:
+            return
+        if event.kind == "download_progress":
+            transfer.bytes_done = event.data.get("bytes", 0)
+            transfer.bytes_total = event.data.get("total")
+        elif event.kind == "extract":
+            transfer.stage = "extract"
+            if transfer.finished is None:
+                transfer.finished = now
+        elif event.kind == "extract_progress":
+            transfer.files_done = event.data.get("files", 0)
+            transfer.files_total = event.data.get("total")
+        elif event.kind in ("extracted", "error", "fetched"):
+            transfer.stage = "done" if event.kind != "error" else "failed"
+            if transfer.finished is None:
+                transfer.finished = now
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Get per-package and aggregate progress"""
+        now = now if now is not None else time.monotonic()
+        active = [t for t in self.transfers.values() if t.stage in ("download", "extract")]
+        downloading = [t for t in active if t.stage == "download"]
+        rate = sum(t.rate(now) for t in downloading)
+        remaining = sum((t.bytes_total or 0) - t.bytes_done for t in downloading)
+        known = all(t.bytes_total is not None for t in downloading)
+        return {
+            "event": "progress",
+            "elapsed_seconds": round(now - self._started, 1),
+            "bytes": sum(t.bytes_done for t in self.transfers.values()),
+            "bytes_per_second": round(rate),
+            "eta_seconds": round(remaining / rate, 1) if downloading and known and rate > 0 else None,
+            "files_extracted": sum(t.files_done for t in self.transfers.values()),
+            "packages": [t.to_dict(now) for t in active],
+        }
+
+    def _render(self, now: float, force: bool = False) -> None:
+        if self.mode == "none":
+            return
+        if not force and now - self._last_render < self.interval:
+            return
+        if self.mode == "ndjson":
+            # Snapshots are only useful while something is in flight
+            if force or not any(t.stage in ("download", "extract") for t in self.transfers.values()):
+                return
+            self._last_render = now
+            self.stream.write(json.dumps(self.snapshot(now)) + "\n")
+            self.stream.flush()
+            return
+
+        self._last_render = now
+        lines = self._tty_lines(now)
+        self._clear()
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        self._drawn_lines = len(lines)
+
+    def _tty_lines(self, now: float) -> list:
+        lines = []
+        for transfer in self.transfers.values():
+            if transfer.stage == "download":
+                if transfer.bytes_total:
+                    fraction = min(1.0, transfer.bytes_done / transfer.bytes_total)
+                    bar = "#" * int(fraction * 20)
+                    progress = (f"[{bar:<20}] {fraction * 100:3.0f}% "
+                                f"{format_bytes(transfer.bytes_done)}/{format_bytes(transfer.bytes_total)}")
+                else:
+                    progress = format_bytes(transfer.bytes_done)
+                lines.append(f"  {transfer.key:<32} {progress}  {format_bytes(transfer.rate(now))}/s  "
+                             f"ETA {format_eta(transfer.eta(now))}")
+            elif transfer.stage == "extract":
+                total = transfer.files_total if transfer.files_total is not None else "?"
+                lines.append(f"  {transfer.key:<32} extracting {transfer.files_done}/{total} files")
+        if lines:
+            snapshot = self.snapshot(now)
+            lines.append(f"  Total: {len(snapshot['packages'])} active, {format_bytes(snapshot['bytes'])}, "
+                         f"{format_bytes(snapshot['bytes_per_second'])}/s, ETA {format_eta(snapshot['eta_seconds'])}")
+        return lines
+
+    def _clear(self) -> None:
+        """Erase the live display so messages can be printed above it"""
+        if self.mode == "tty" and self._drawn_lines:
+            self.stream.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+            self.stream.flush()
+            self._drawn_lines = 0
+
+    def close(self) -> None:
+        """Remove the live display and write a final NDJSON summary"""
+        with self._lock:
+            self._clear()
+            if self.mode == "ndjson" and self.transfers:
+                now = time.monotonic()
+                summary = self.snapshot(now)
+                summary["event"] = "progress_done"
+                downloaded = [t for t in self.transfers.values() if t.stage != "cached"]
+                if downloaded:
+                    span = max(t.finished or now for t in downloaded) - min(t.started for t in downloaded)
+                    summary["bytes_per_second"] = round(summary["bytes"] / span) if span > 0 else 0
+                self.stream.write(json.dumps(summary) + "\n")
+                self.stream.flush()
+
+
+def _print_message(event) -> None:
+    print(event.message, flush=True)
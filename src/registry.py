@@ -1,6 +1,9 @@
+import concurrent.futures
 import json
 import os
 import sys
+import threading
+import time
 from typing import Dict, Any, Optional, List
 try:
     import urllib.request
@@ -22,118 +25,396 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-class Registry:
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import cache
+        import throttle
+        import shards
+        import model
+        import completion
+        return cache, throttle, shards, model, completion
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import cache
+        import throttle
+        import shards
+        import model
+        import completion
+        return cache, throttle, shards, model, completion
+
+# Import modules
+try:
+    cache, throttle, shards, model, completion = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Threads used to fetch package files while searching, the request scheduler
+# decides how many of them actually hit the same host at once
+SEARCH_WORKERS = 16
+
+# Seconds a package file that answered 404 is assumed to still be missing
+NEGATIVE_CACHE_TTL = 60
+
+# Seconds the sharded index manifest is reused before it is fetched again
+MANIFEST_TTL = 60
+
+# Default registry location, can be overridden with RAINMEAS_REGISTRY or --registry
+DEFAULT_REGISTRY_URL = "https://raw.githubusercontent.com/Rainmeas/rainmeas-registry/main"
+
+class _Flight:
+    """A fetch in progress that other callers for the same URL wait on"""
+    
     def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+def _is_not_found(error: Exception) -> bool:
+    """Check whether a fetch error means the file does not exist"""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in (404, 410)
+    # file:// registries report missing files as URLError(FileNotFoundError)
+    return isinstance(error, urllib.error.URLError) and isinstance(error.reason, FileNotFoundError)
+
+class Registry:
+    def __init__(self, cache: Optional["cache.Cache"] = None, offline: bool = False,
+                 base_url: Optional[str] = None):
+        """
+        Initialize the Registry for remote access.
+        
+        When a cache is given, fetched metadata is written through to it. In
+        offline mode metadata is read from the cache only and a miss raises
+        cache.CacheMissError.
         """
-        Initialize the Registry for remote access only.
+        base_url = base_url or os.environ.get("RAINMEAS_REGISTRY") or DEFAULT_REGISTRY_URL
+        self.remote_base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.offline = offline
+        # In-flight fetches by URL, so concurrent callers share one request
+        self._flights: Dict[str, "_Flight"] = {}
+        self._flights_lock = threading.Lock()
+        # URLs that answered 404, mapped to when that answer expires
+        self._missing: Dict[str, float] = {}
+        # Sharded index manifests by base URL, with the time they expire
+        self._manifests: Dict[str, tuple] = {}
+        # Content addressed shards never change, so they are kept for the process lifetime
+        self._shards: Dict[str, Dict[str, Any]] = {}
+        # Package models by name, with the metadata dict and ETag each was built from
+        self._models: Dict[str, tuple] = {}
+        # Entries of the on-disk snapshot, loaded on the first offline lookup and built on use
+        self._snapshot: Optional[Dict[str, tuple]] = None
+    
+    def _fetch_remote_json(self, url: str, optional: bool = False) -> Optional[Dict[str, Any]]:
+        """Fetch JSON data from a remote URL.
+        
+        Optional files, which a registry may not provide, are fetched quietly
+        and never raise on a cache miss. Concurrent fetches of the same URL
+        are coalesced into one request and 404 answers are remembered for
+        NEGATIVE_CACHE_TTL seconds.
         """
-        self.remote_base_url = "https://raw.githubusercontent.com/Rainmeas/rainmeas-registry/main"
+        if self.offline:
+            data = self.cache.get_metadata(url) if self.cache is not None else None
+            if self.cache is not None:
+                self.cache.record("metadata_hits" if data is not None else "metadata_misses")
+            if data is None and optional:
+                return None
+            if data is None:
+                raise cache.CacheMissError(f"{url} is not in the local cache (offline mode). "
+                                           f"Run 'rainmeas fetch' while online to populate it.")
+            return data
+        
+        if self._is_known_missing(url):
+            return None
+        
+        with self._flights_lock:
+            flight = self._flights.get(url)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[url] = _Flight()
+        
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = self._fetch_uncoalesced(url, optional)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[url]
+            flight.done.set()
+    
+    def _is_known_missing(self, url: str) -> bool:
+        """Check the in-memory and on-disk negative caches for a URL"""
+        expires = self._missing.get(url)
+        if expires is not None:
+            if time.monotonic() < expires:
+                return True
+            del self._missing[url]
+        if self.cache is not None and self.cache.is_missing(url, NEGATIVE_CACHE_TTL):
+            return True
+        return False
+    
+    def _remember_missing(self, url: str) -> None:
+        """Record a 404 answer in the negative caches"""
+        self._missing[url] = time.monotonic() + NEGATIVE_CACHE_TTL
+        if self.cache is not None:
+            try:
+                self.cache.put_missing(url)
+            except OSError:
+                pass
     
-    def _fetch_remote_json(self, url: str) -> Optional[Dict[str, Any]]:
-        """Fetch JSON data from a remote URL."""
+    def _fetch_uncoalesced(self, url: str, optional: bool) -> Optional[Dict[str, Any]]:
+        """Fetch JSON from the network and write it through to the cache
+        
+        A cached copy with an ETag is revalidated with If-None-Match, so an
+        unchanged file costs a 304 instead of a full download.
+        """
+        etag = self.cache.get_etag(url) if self.cache is not None else None
+        request = urllib.request.Request(url)
+        if etag:
+            request.add_header("If-None-Match", etag)
         try:
-            response = urllib.request.urlopen(url)
-            data = response.read()
-            return json.loads(data.decode('utf-8'))
+            with throttle.get_scheduler().open(request) as response:
+                data = json.loads(response.read().decode('utf-8'))
+                etag = response.headers.get("ETag") if response.headers is not None else None
+        except throttle.ThrottledError:
+            # Rate limiting is not a missing package, let callers report it
+            raise
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and self.cache is not None:
+                cached = self.cache.get_metadata(url)
+                if cached is not None:
+                    self.cache.record("metadata_revalidations")
+                    return cached
+            return self._fetch_failed(url, optional, e)
         except Exception as e:
-            print(f"Error fetching remote data from {url}: {e}")
+            return self._fetch_failed(url, optional, e)
+        
+        if self.cache is not None:
+            self.cache.record("metadata_misses")
+            try:
+                self.cache.put_metadata(url, data, etag)
+            except OSError:
+                # A read-only or full cache must not break online lookups
+                pass
+        return data
+    
+    def _fetch_failed(self, url: str, optional: bool, error: Exception) -> None:
+        """Handle a failed fetch, remembering 404 answers"""
+        if _is_not_found(error):
+            self._remember_missing(url)
+        if not optional:
+            print(f"Error fetching remote data from {url}: {error}")
+        return None
+    
+    def _shard_manifest(self) -> Optional[Dict[str, Any]]:
+        """Get the sharded index manifest, or None for a registry with a flat index"""
+        base_url = self.remote_base_url
+        cached = self._manifests.get(base_url)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+        manifest = self._fetch_remote_json(f"{base_url}/{shards.MANIFEST_PATH}", optional=True)
+        if manifest is not None and manifest.get("format") != shards.SHARD_FORMAT:
+            manifest = None
+        self._manifests[base_url] = (manifest, time.monotonic() + MANIFEST_TTL)
+        return manifest
+    
+    def _fetch_shard(self, relative_path: str) -> Optional[Dict[str, Any]]:
+        """Fetch a content addressed shard, preferring any cached copy
+
+        None means the shard could not be fetched, e.g. because the manifest
+        naming it was replaced and the shard removed since.
+        """
+        url = f"{self.remote_base_url}/{relative_path}"
+        if url in self._shards:
+            return self._shards[url]
+        data = self.cache.get_metadata(url) if self.cache is not None else None
+        if data is not None:
+            self.cache.record("metadata_hits")
+        else:
+            data = self._fetch_remote_json(url, optional=True)
+        if data is None:
+            # Fetch the current manifest on the next lookup
+            self._manifests.pop(self.remote_base_url, None)
+            return None
+        self._shards[url] = data
+        return data
+    
+    def package_exists(self, package_name: str) -> Optional[bool]:
+        """Check a name against the sharded index, None if the registry is not sharded or the shard is unavailable"""
+        manifest = self._shard_manifest()
+        if manifest is None:
             return None
+        relative_path = shards.shard_path(manifest, package_name)
+        if relative_path is None:
+            return False
+        shard = self._fetch_shard(relative_path)
+        return package_name in shard if shard is not None else None
     
     def list_all_package_names(self) -> List[str]:
         """List all package names from the remote index."""
-        # Fetch from remote index.json
+        manifest = self._shard_manifest()
+        # Fetch from remote index.json, which sharded registries keep publishing:
+        # one request instead of one per shard
         index_url = f"{self.remote_base_url}/index.json"
-        index_data = self._fetch_remote_json(index_url)
+        index_data = self._fetch_remote_json(index_url, optional=manifest is not None)
         if index_data:
-            return list(index_data.keys())
-        return []
+            names = list(index_data.keys())
+        elif manifest is not None:
+            # Shards fetched concurrently within the per-host limits
+            with concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+                shard_data = list(executor.map(self._fetch_shard, manifest.get("shards", {}).values()))
+            names = sorted(name for data in shard_data if data is not None for name in data)
+        else:
+            names = []
+        
+        # Shell completion looks names up in this file instead of asking the registry
+        if names and self.cache is not None:
+            try:
+                completion.write_names(self.cache.root, names)
+            except OSError:
+                pass
+        return names
     
     def get_package_info(self, package_name: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific package from remote."""
+        # With a sharded index, unknown names are answered from one small shard
+        if self.package_exists(package_name) is False:
+            return None
+        
         # Fetch from remote package file
-        package_url = f"{self.remote_base_url}/packages/{package_name}.json"
-        return self._fetch_remote_json(package_url)
+        return self._fetch_remote_json(self._package_url(package_name))
+    
+    def _package_url(self, package_name: str) -> str:
+        return f"{self.remote_base_url}/packages/{package_name}.json"
+    
+    def _fingerprint(self, package_name: str) -> Optional[tuple]:
+        """Get (mtime, size) of the cached metadata file of a package"""
+        try:
+            stat = os.stat(self.cache.metadata_path(self._package_url(package_name)))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _snapshot_package(self, package_name: str) -> Optional["model.Package"]:
+        """Get a package from the snapshot, if its cached metadata file did not change since"""
+        if self._snapshot is None:
+            self._snapshot = model.load_snapshot(self.cache.snapshot_path(self.remote_base_url))
+        entry = self._snapshot.get(package_name)
+        if entry is None or entry[0] != self._fingerprint(package_name):
+            return None
+        package = entry[1]
+        if not isinstance(package, model.Package):
+            package = model.Package.from_tuple(package)
+            self._snapshot[package_name] = (entry[0], package)
+        return package
+    
+    def get_package_model(self, package_name: str,
+                          package_info: Optional[Dict[str, Any]] = None) -> Optional["model.Package"]:
+        """Get the parsed model of a package
+        
+        Models are built once per metadata file and reused, so versions are
+        sorted once instead of on every lookup. Fetches return a new dict each
+        time, so a model is reused while the cached file keeps its ETag, or
+        without one while the metadata is equal. Offline, packages whose cached
+        file is unchanged come from the snapshot without parsing any JSON.
+        """
+        if package_info is None and self.offline and self.cache is not None:
+            package = self._snapshot_package(package_name)
+            if package is not None:
+                return package
+        if package_info is None:
+            package_info = self.get_package_info(package_name)
+        if not package_info:
+            return None
+        etag = self.cache.get_etag(self._package_url(package_name)) if self.cache is not None else None
+        cached = self._models.get(package_name)
+        if cached is not None:
+            cached_info, cached_etag, package = cached
+            if cached_info is package_info or (etag is not None and cached_etag == etag):
+                return package
+            if etag is None and cached_info == package_info:
+                return package
+        package = model.Package.from_dict(package_name, package_info)
+        self._models[package_name] = (package_info, etag, package)
+        return package
+    
+    def save_snapshot(self) -> int:
+        """Write every package model seen so far to the cache, returning the package count"""
+        if self.cache is None:
+            return 0
+        if self._snapshot is None:
+            self._snapshot = model.load_snapshot(self.cache.snapshot_path(self.remote_base_url))
+        entries = {}
+        for package_name, (fingerprint, package) in self._snapshot.items():
+            if fingerprint == self._fingerprint(package_name):
+                entries[package_name] = (fingerprint, package)
+        for package_name, (_, _, package) in list(self._models.items()):
+            fingerprint = self._fingerprint(package_name)
+            if fingerprint is not None:
+                entries[package_name] = (fingerprint, package)
+        model.save_snapshot(self.cache.snapshot_path(self.remote_base_url), entries)
+        self._snapshot = entries
+        return len(entries)
     
     def search_packages(self, query: str) -> Dict[str, Any]:
         """Search for packages matching a query."""
         results = {}
+        query = query.lower()
+        
+        # Registries built by 'rainmeas registry sync' ship a prebuilt search index
+        search_index = self._fetch_remote_json(f"{self.remote_base_url}/search-index.json", optional=True)
+        if search_index is not None:
+            for package_name, entry in search_index.items():
+                if (query in package_name.lower() or
+                    query in entry.get("description", "").lower() or
+                    query in entry.get("author", "").lower()):
+                    results[package_name] = {
+                        "latest": entry.get("latest") or "unknown",
+                        "versions": entry.get("versions", [])
+                    }
+            return results
         
         # Get all package names
         package_names = self.list_all_package_names()
         if not package_names:
             return results
         
-        # Scan all package files
-        for package_name in package_names:
-            package_info = self.get_package_info(package_name)
-            if not package_info:
-                continue
-            
-            # Match by package name
-            if query.lower() in package_name.lower():
-                # Create a simplified info object for search results
-                latest_version = self.get_latest_version(package_name, package_info)
-                versions = self.get_available_versions(package_name, package_info)
-                results[package_name] = {
-                    "latest": latest_version or "unknown",
-                    "versions": versions
+        # Scan all packages, fetched concurrently within the per-host limits
+        with concurrent.futures.ThreadPoolExecutor(max_workers=SEARCH_WORKERS) as executor:
+            packages = list(executor.map(self.get_package_model, package_names))
+        
+        for package in packages:
+            if package is not None and package.matches(query):
+                results[package.name] = {
+                    "latest": package.latest or "unknown",
+                    "versions": list(package.sorted_versions)
                 }
-            else:
-                # Match by package details
-                if (query.lower() in package_info.get("description", "").lower() or
-                    query.lower() in package_info.get("author", "").lower()):
-                    # Create a simplified info object for search results
-                    latest_version = self.get_latest_version(package_name, package_info)
-                    versions = self.get_available_versions(package_name, package_info)
-                    results[package_name] = {
-                        "latest": latest_version or "unknown",
-                        "versions": versions
-                    }
         
         return results
     
     def get_latest_version(self, package_name: str, package_info: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """Get the latest version of a package."""
-        if package_info is None:
-            package_info = self.get_package_info(package_name)
-        
-        if not package_info:
-            return None
-        
-        # Get latest version from the package file
-        versions = package_info.get("versions", {})
-        if "latest" in versions:
-            return versions["latest"]
-        
-        # If no explicit "latest" key, return the highest version
-        version_keys = [k for k in versions.keys() if k != "latest"]
-        if version_keys:
-            # Simple version sorting (in a real implementation, you'd want proper semver sorting)
-            return sorted(version_keys)[-1]
-        
-        return None
+        package = self.get_package_model(package_name, package_info)
+        return package.latest if package is not None else None
     
     def get_available_versions(self, package_name: str, package_info: Optional[Dict[str, Any]] = None) -> List[str]:
-        """Get all available versions of a package."""
-        if package_info is None:
-            package_info = self.get_package_info(package_name)
-        
-        if not package_info:
-            return []
-        
-        versions = package_info.get("versions", {})
-        # Return all version keys except "latest"
-        return [k for k in versions.keys() if k != "latest"]
+        """Get all available versions of a package, oldest first."""
+        package = self.get_package_model(package_name, package_info)
+        return list(package.sorted_versions) if package is not None else []
     
     def get_version_download_url(self, package_name: str, version: str) -> Optional[str]:
         """Get the download URL for a specific package version."""
-        package_info = self.get_package_info(package_name)
-        
-        if not package_info:
-            return None
-        
-        versions = package_info.get("versions", {})
-        if version in versions and isinstance(versions[version], dict):
-            return versions[version].get("download")
-        
-        return None
\ No newline at end of file
+        package = self.get_package_model(package_name)
+        entry = package.versions.get(version) if package is not None else None
+        return entry.download_url if entry is not None else None
\ No newline at end of file
@@ -24,6 +24,18 @@ else:
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
+# Shell completion runs on every <Tab>, answer it before importing the CLI and its network stack
+if sys.argv[1:2] == ["__complete"]:
+    import completion
+    sys.exit(completion.main(sys.argv[2:]))
+
+# Read-only commands are answered by a running daemon, also without importing the CLI
+import daemon_client
+response = daemon_client.forward_argv(sys.argv[1:], os.getcwd())
+if response is not None:
+    sys.stdout.write(response.get("stdout", ""))
+    sys.exit(response.get("exit_code", 1))
+
 # Import and run the CLI
 from cli import RainmeasCLI
 
@@ -1,6 +1,6 @@
 import sys
 import os
-from typing import Tuple
+from typing import Any, Tuple
 
 # Handle PyInstaller environment
 def resource_path(relative_path):
@@ -49,6 +49,21 @@ def compare_versions(version1: str, version2: str) -> int:
     else:
         return 0
 
+def _part_key(part: str) -> Tuple[int, int, str]:
+    # Numeric parts sort before alphanumeric ones, so 1.0.0-2 < 1.0.0-beta
+    return (0, int(part), "") if part.isdigit() else (1, 0, part)
+
+def version_key(version: str) -> Tuple[Any, ...]:
+    """Sort key for versions: numeric parts compare as numbers, pre-releases sort first
+    
+    Unlike parse_version() this accepts any string, e.g. '2.0.0-beta' or '1.0.0+build'.
+    """
+    if version.startswith('v'):
+        version = version[1:]
+    main, _, prerelease = version.partition("+")[0].partition("-")
+    return (tuple(_part_key(part) for part in main.split(".")), 0 if prerelease else 1,
+            tuple(_part_key(part) for part in prerelease.split(".")) if prerelease else ())
+
 def is_valid_version(version: str) -> bool:
     """Check if a string is a valid version"""
     try:
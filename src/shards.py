@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Any, Optional
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Registry-relative path of the sharded index root manifest
+MANIFEST_PATH = "index/manifest.json"
+SHARD_FORMAT = "sharded-v1"
+# Hex digits of the name hash used as shard id, 2 gives 256 shards
+DEFAULT_PREFIX_LENGTH = 2
+
+
+def shard_id(package_name: str, prefix_length: int) -> str:
+    """Get the shard a package name belongs to"""
+    return hashlib.sha256(package_name.lower().encode("utf-8")).hexdigest()[:prefix_length]
+
+
+def shard_path(manifest: Dict[str, Any], package_name: str) -> Optional[str]:
+    """Get the registry-relative path of the shard that would list a package"""
+    prefix_length = manifest.get("prefix_length", DEFAULT_PREFIX_LENGTH)
+    return manifest.get("shards", {}).get(shard_id(package_name, prefix_length))
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """Write a file atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def build_shards(index: Dict[str, Any], dest: str, prefix_length: int = DEFAULT_PREFIX_LENGTH) -> Dict[str, Any]:
+    """Write a sharded copy of a flat index.json into a registry directory
+
+    Shard files are content addressed (index/shards/<id>-<hash>.json), so a
+    client may cache them forever and only the small manifest needs to be
+    revalidated. Clients keep using the previous manifest until it expires,
+    so shards are only removed once neither the new nor the previous manifest
+    references them. Returns the manifest.
+    """
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for package_name, entry in index.items():
+        buckets.setdefault(shard_id(package_name, prefix_length), {})[package_name] = entry
+
+    shards_dir = os.path.join(dest, "index", "shards")
+    manifest_path = os.path.join(dest, *MANIFEST_PATH.split("/"))
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get("shards", {})
+    except (OSError, ValueError, AttributeError):
+        previous = {}
+    manifest = {"format": SHARD_FORMAT, "prefix_length": prefix_length,
+                "package_count": len(index), "shards": {}}
+    for bucket_id, entries in sorted(buckets.items()):
+        data = json.dumps(entries, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        filename = f"{bucket_id}-{hashlib.sha256(data).hexdigest()[:16]}.json"
+        path = os.path.join(shards_dir, filename)
+        if not os.path.exists(path):
+            _write_file(path, data)
+        manifest["shards"][bucket_id] = f"index/shards/{filename}"
+
+    _write_file(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+    referenced = {os.path.basename(path) for path in [*manifest["shards"].values(), *previous.values()]}
+    for filename in os.listdir(shards_dir) if os.path.isdir(shards_dir) else []:
+        if filename.endswith(".json") and filename not in referenced:
+            os.unlink(os.path.join(shards_dir, filename))
+    return manifest
+
+
+def shard_registry(root: str, prefix_length: int = DEFAULT_PREFIX_LENGTH) -> Dict[str, Any]:
+    """Convert the flat index.json of a local registry directory into shards"""
+    with open(os.path.join(root, "index.json"), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    return build_shards(index, root, prefix_length)
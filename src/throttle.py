@@ -0,0 +1,210 @@
+import contextlib
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, Any, Optional, Union, Iterator
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Concurrency limits per host, the limit adapts between MIN and MAX
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+# Retries of a throttled request before giving up
+MAX_RETRIES = 4
+# Longest Retry-After we are willing to wait for, in seconds
+MAX_RETRY_DELAY = 60.0
+# Statuses that mean "slow down" rather than "does not exist"
+THROTTLE_STATUSES = (429, 503)
+
+
+class ThrottledError(Exception):
+    """Raised when a host keeps rate limiting a request after all retries"""
+
+    def __init__(self, url: str, status: int, retry_after: Optional[float] = None):
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+        host = urllib.parse.urlsplit(url).netloc
+        message = f"{host} is rate limiting requests (HTTP {status})"
+        if retry_after:
+            message += f", retry after {retry_after:.0f}s"
+        super().__init__(message)
+
+
+def _is_throttled(error: urllib.error.HTTPError) -> bool:
+    """Check whether an HTTP error is a rate limit response"""
+    if error.code in THROTTLE_STATUSES:
+        return True
+    # GitHub signals exhausted quotas with 403 and X-RateLimit-Remaining: 0
+    return error.code == 403 and error.headers is not None and error.headers.get("X-RateLimit-Remaining") == "0"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HostLimiter:
+    """Adaptive concurrency limit for a single host
+
+    Additive increase on success and multiplicative decrease on throttling,
+    with a shared pause after Retry-After so all workers back off together.
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.successes = 0
+        self.throttled = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Block until a request to this host may start"""
+        with self._condition:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(pause)
+                elif self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def release(self, success: bool = True) -> None:
+        """Finish a request, growing the limit if it succeeded"""
+        with self._condition:
+            self.in_flight -= 1
+            if success:
+                self.successes += 1
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def throttle(self, delay: float) -> None:
+        """Finish a throttled request, halving the limit and pausing the host"""
+        with self._condition:
+            self.in_flight -= 1
+            self.throttled += 1
+            self.limit = max(float(self.minimum), self.limit / 2)
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+
+class RequestScheduler:
+    """Runs urllib requests under per-host adaptive concurrency limits
+
+    Throttled responses (429, 503, exhausted GitHub quota) are retried after
+    Retry-After or an exponential backoff. If a request is still throttled
+    after MAX_RETRIES, ThrottledError is raised, which is distinct from the
+    HTTPError of a real miss.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES, max_retry_delay: float = MAX_RETRY_DELAY):
+        self.max_retries = max_retries
+        self.max_retry_delay = max_retry_delay
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> HostLimiter:
+        """Get the limiter for the host of a URL"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = HostLimiter()
+            return self._limiters[host]
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_retry_delay, (2 ** attempt) * 0.5 + random.uniform(0, 0.5))
+
+    @contextlib.contextmanager
+    def open(self, request: Union[str, urllib.request.Request], timeout: Optional[float] = None) -> Iterator[Any]:
+        """Open a URL, holding a slot of its host until the response is closed"""
+        url = request.full_url if isinstance(request, urllib.request.Request) else request
+        if urllib.parse.urlsplit(url).scheme == "file":
+            # Local mirrors are never rate limited
+            with urllib.request.urlopen(request) as response:
+                yield response
+            return
+        limiter = self.limiter(url)
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                if timeout is None:
+                    response = urllib.request.urlopen(request)
+                else:
+                    response = urllib.request.urlopen(request, timeout=timeout)
+            except urllib.error.HTTPError as e:
+                if not _is_throttled(e):
+                    limiter.release(success=False)
+                    raise
+                retry_after = parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                if attempt >= self.max_retries or delay > self.max_retry_delay:
+                    limiter.throttle(min(delay, self.max_retry_delay))
+                    raise ThrottledError(url, e.code, retry_after) from e
+                limiter.throttle(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                limiter.release(success=False)
+                raise
+            break
+
+        try:
+            with response:
+                yield response
+        except BaseException:
+            limiter.release(success=False)
+            raise
+        limiter.release(success=True)
+
+    def fetch(self, request: Union[str, urllib.request.Request], timeout: Optional[float] = None) -> bytes:
+        """Fetch the full body of a URL"""
+        with self.open(request, timeout) as response:
+            return response.read()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the current limit and counters per host"""
+        with self._lock:
+            return {host: {"limit": int(limiter.limit), "in_flight": limiter.in_flight,
+                           "successes": limiter.successes, "throttled": limiter.throttled}
+                    for host, limiter in self._limiters.items()}
+
+
+# Process wide scheduler so every component shares the same per-host limits
+_default_scheduler = RequestScheduler()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Get the process wide request scheduler"""
+    return _default_scheduler
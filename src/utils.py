@@ -1,6 +1,8 @@
+import copy
 import os
 import json
 import sys
+import tempfile
 import time
 from typing import Dict, Any, Optional
 
@@ -40,22 +42,66 @@ def get_app_version():
 # Removed find_rainmeter_skin_root function as per user request
 # Not all modules have @Resources folder, so we don't check for module directories
 
+# Parsed configs keyed by path, validated by modification time and size so
+# long-running processes (the daemon) do not reparse unchanged files
+_config_cache: Dict[str, Any] = {}
+
 def load_rainmeas_config(skin_root: str) -> Dict[str, Any]:
     """Load the rainmeas-package.json configuration file"""
     config_path = os.path.join(skin_root, "rainmeas-package.json")
     
-    if not os.path.exists(config_path):
+    try:
+        stat = os.stat(config_path)
+    except OSError:
         return {"packages": {}}
     
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _config_cache.get(config_path)
+    if cached is not None and cached[0] == key:
+        return copy.deepcopy(cached[1])
+    
     with open(config_path, 'r') as f:
-        return json.load(f)
+        config = json.load(f)
+    _config_cache[config_path] = (key, config)
+    return copy.deepcopy(config)
 
 def save_rainmeas_config(skin_root: str, config: Dict[str, Any]) -> None:
     """Save the rainmeas-package.json configuration file"""
     config_path = os.path.join(skin_root, "rainmeas-package.json")
     
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
+    # Written to a unique temporary file first, so other processes never read a partial config
+    fd, tmp_path = tempfile.mkstemp(dir=skin_root or ".", prefix=".rainmeas-package-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_path, config_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _config_cache.pop(config_path, None)
+
+# Versions and dependencies of the modules actually installed, kept in the modules directory
+INSTALL_STATE_FILE = ".rainmeas-state.json"
+
+def load_install_state(modules_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Load the recorded state of installed modules, by package name"""
+    try:
+        with open(os.path.join(modules_dir, INSTALL_STATE_FILE), 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    packages = state.get("packages", {}) if isinstance(state, dict) else {}
+    return packages if isinstance(packages, dict) else {}
+
+def save_install_state(modules_dir: str, packages: Dict[str, Dict[str, Any]]) -> None:
+    """Save the recorded state of installed modules"""
+    os.makedirs(modules_dir, exist_ok=True)
+    state_path = os.path.join(modules_dir, INSTALL_STATE_FILE)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"packages": packages}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
 
 def get_installed_packages(skin_root: str) -> Dict[str, str]:
     """Get a dictionary of installed packages and their versions"""
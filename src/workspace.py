@@ -0,0 +1,139 @@
+import asyncio
+import glob
+import os
+import sys
+from typing import Dict, List, Optional
+
+# Handle PyInstaller environment
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller"""
+    try:
+        # PyInstaller creates a temp folder and stores path in _MEIPASS
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+# Dynamic imports to handle PyInstaller
+def import_modules():
+    """Dynamically import modules to handle PyInstaller bundling"""
+    try:
+        import registry
+        import utils
+        import core
+        return registry, utils, core
+    except ImportError:
+        # Try alternative import paths for PyInstaller
+        sys.path.append(resource_path('src'))
+        import registry
+        import utils
+        import core
+        return registry, utils, core
+
+# Import modules
+try:
+    registry, utils, core = import_modules()
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+
+def expand_skin_roots(patterns: List[str]) -> List[str]:
+    """Expand paths and glob patterns into skin roots containing rainmeas-package.json"""
+    roots = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            root = os.path.abspath(match)
+            if root in seen:
+                continue
+            if os.path.isfile(os.path.join(root, "rainmeas-package.json")):
+                seen.add(root)
+                roots.append(root)
+    return roots
+
+
+class RootSummary:
+    """What a workspace install changed in a single skin root"""
+
+    def __init__(self, skin_root: str):
+        self.skin_root = skin_root
+        self.added: Dict[str, str] = {}
+        # name -> (old version, new version)
+        self.updated: Dict[str, tuple] = {}
+        self.unchanged: Dict[str, str] = {}
+        self.failed: Dict[str, str] = {}
+
+    @property
+    def success(self) -> bool:
+        return not self.failed
+
+    def describe(self) -> str:
+        """Return a one-line description of the changes"""
+        parts = []
+        if self.added:
+            parts.append("added " + ", ".join(f"{n}@{v}" for n, v in self.added.items()))
+        if self.updated:
+            parts.append("updated " + ", ".join(f"{n} {old} -> {new}" for n, (old, new) in self.updated.items()))
+        if self.unchanged:
+            parts.append(f"{len(self.unchanged)} unchanged")
+        if self.failed:
+            parts.append("failed " + ", ".join(self.failed))
+        return "; ".join(parts) if parts else "nothing to do"
+
+
+class Workspace:
+    """Install the manifests of many skin roots in one run
+
+    Package metadata is fetched once for all roots, each unique package@version
+    archive is downloaded once, and the per-root installs run concurrently.
+    """
+
+    def __init__(self, skin_roots: List[str], registry: registry.Registry,
+                 listener: Optional[core.EventListener] = None):
+        self.skin_roots = skin_roots
+        self.registry = core.AsyncRegistry(registry, memoize=True)
+        self.archive_pool = core.ArchivePool()
+        self.listener = listener
+
+    def _root_listener(self, skin_root: str) -> Optional[core.EventListener]:
+        """Tag events from a root's installer with the root they belong to"""
+        if self.listener is None:
+            return None
+
+        def listener(event: core.ProgressEvent) -> None:
+            event.data["skin_root"] = skin_root
+            self.listener(event)
+        return listener
+
+    async def _install_root(self, skin_root: str) -> RootSummary:
+        """Install every package from one root's manifest"""
+        summary = RootSummary(skin_root)
+        before = utils.get_installed_packages(skin_root)
+        installer = core.AsyncInstaller(skin_root, self.registry,
+                                        listener=self._root_listener(skin_root),
+                                        archive_pool=self.archive_pool)
+        on_disk = {name for name in before if os.path.isdir(os.path.join(installer.modules_dir, name))}
+        results = await installer.install_all(dict(before))
+        after = utils.get_installed_packages(skin_root)
+
+        for result in results:
+            name = result.package
+            if not result.success:
+                summary.failed[name] = result.error or "unknown error"
+            elif name not in on_disk:
+                summary.added[name] = after.get(name, result.version)
+            elif before[name] != after.get(name):
+                summary.updated[name] = (before[name], after.get(name))
+            else:
+                summary.unchanged[name] = before[name]
+        return summary
+
+    async def install(self) -> List[RootSummary]:
+        """Install all roots concurrently and return a summary per root"""
+        try:
+            return list(await asyncio.gather(*(self._install_root(root) for root in self.skin_roots)))
+        finally:
+            self.archive_pool.cleanup()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the local cache, `rainmeas fetch` and offline mode
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import cache
+import cli
+from test_core import make_local_registry
+
+def make_cli(registry_url, cache_dir, skin_root):
+    """Create a CLI bound to a local registry, cache directory and skin root"""
+    with mock.patch.dict(os.environ, {"RAINMEAS_CACHE_DIR": cache_dir}):
+        cli_instance = cli.RainmeasCLI()
+    cli_instance.registry.remote_base_url = registry_url
+    cli_instance.skin_root = skin_root
+    cli_instance.installer = cli.installer.Installer(skin_root, cli_instance.registry)
+    return cli_instance
+
+def test_fetch_then_install_offline():
+    """Test that a fetched manifest can be installed without the registry"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_dir = os.path.join(tmp, "registry")
+        registry_url = make_local_registry(registry_dir).remote_base_url
+        cache_dir = os.path.join(tmp, "cache")
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+        manifest = os.path.join(skin_root, "rainmeas-package.json")
+        with open(manifest, "w") as f:
+            json.dump({"packages": {"alpha": "@latest"}}, f)
+
+        assert make_cli(registry_url, cache_dir, skin_root).run(["fetch", manifest]) == 0
+
+        # Remove the registry so any network access would fail
+        shutil.rmtree(registry_dir)
+        offline_cli = make_cli(registry_url, cache_dir, skin_root)
+        assert offline_cli.run(["--offline", "info", "alpha"]) == 0
+        assert offline_cli.run(["--offline", "install", "alpha"]) == 0
+        assert os.path.exists(os.path.join(skin_root, "@Resources", "@rainmeas-modules", "beta", "beta.lua"))
+
+        # A cache miss fails with an error instead of looking like "not found"
+        assert offline_cli.run(["--offline", "info", "gamma"]) == 1
+    return True
+
+def test_stats_and_lru_prune():
+    """Test that hits are persisted and prune evicts the least recently used archive"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_url = make_local_registry(os.path.join(tmp, "registry")).remote_base_url
+        cache_dir = os.path.join(tmp, "cache")
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+
+        assert make_cli(registry_url, cache_dir, skin_root).run(["install", "alpha"]) == 0
+        shutil.rmtree(os.path.join(skin_root, "@Resources"))
+        os.unlink(os.path.join(skin_root, "rainmeas-package.json"))
+        with mock.patch.dict(os.environ, {"RAINMEAS_CACHE_MAX_SIZE": "1G"}):
+            assert make_cli(registry_url, cache_dir, skin_root).run(["install", "beta"]) == 0
+
+        stats = cache.Cache(cache_dir).load_stats()
+        assert stats["archive_misses"] == 2
+        assert stats["archive_hits"] == 1
+        assert stats["download_bytes"] > 0
+
+        # beta was used last, so alpha goes first
+        package_cache = cache.Cache(cache_dir)
+        alpha_path = package_cache.archive_path("alpha", "1.0.0", f"{registry_url}/archives/alpha-1.0.0.zip")
+        beta_path = package_cache.archive_path("beta", "2.0.0", f"{registry_url}/archives/beta-2.0.0.zip")
+        evicted = package_cache.prune(os.path.getsize(beta_path))
+        assert evicted == [os.path.relpath(alpha_path, cache_dir).replace(os.sep, "/")]
+        assert not os.path.exists(alpha_path) and os.path.exists(beta_path)
+
+        assert make_cli(registry_url, cache_dir, skin_root).run(["cache", "clear"]) == 0
+        assert not os.path.exists(beta_path)
+        assert cache.Cache(cache_dir).load_stats()["archive_hits"] == 1
+    return True
+
+if __name__ == "__main__":
+    print("Running cache tests...")
+    try:
+        test_fetch_then_install_offline()
+        test_stats_and_lru_prune()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for shell completion and its package name index
+"""
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import cache
+import cli
+import completion
+from test_cache import make_cli
+from test_core import make_local_registry
+
+def complete(cache_dir, cwd, *args):
+    """Run 'rainmeas __complete' the way the shell scripts do and return the candidates"""
+    env = dict(os.environ, RAINMEAS_CACHE_DIR=cache_dir, RAINMEAS_OFFLINE="1")
+    result = subprocess.run([sys.executable, os.path.join(os.path.abspath(src_path), "run_cli.py"),
+                             completion.COMPLETE_COMMAND, *args],
+                            cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+def test_name_index_lookup():
+    """Test prefix lookups in the sorted name index against a linear scan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = completion.names_path(tmp)
+        assert completion.lookup(path, "a") == []
+
+        names = [f"{word}{i}" for word in ("clock", "cpu", "weather", "c") for i in range(300)]
+        completion.write_names(tmp, names + ["clock1", "bad name", ""])
+        for prefix in ("", "c", "cl", "clock1", "clock29", "cpu0", "w", "weather299", "x", "0", "~"):
+            expected = sorted(name for name in set(names) if name.startswith(prefix))
+            assert completion.lookup(path, prefix, limit=len(names)) == expected, prefix
+        assert len(completion.lookup(path, "")) == completion.MAX_CANDIDATES
+
+        # The index sits next to the rest of the cache
+        with mock.patch.dict(os.environ, {"RAINMEAS_CACHE_DIR": ""}):
+            assert completion.default_cache_dir() == cache.default_cache_dir()
+    return True
+
+def test_registry_writes_name_index():
+    """Test that listing the registry refreshes the index, and completion reads it without the network stack"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        cache_dir = os.path.join(tmp, "cache")
+        reg.cache = cache.Cache(cache_dir)
+        assert sorted(reg.list_all_package_names()) == ["alpha", "beta"]
+        assert completion.lookup(completion.names_path(cache_dir), "") == ["alpha", "beta"]
+
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(os.path.join(skin_root, "@Resources", "@rainmeas-modules", "local"))
+        os.makedirs(os.path.join(skin_root, "@Resources", "@rainmeas-modules", ".local-staging"))
+        assert complete(cache_dir, skin_root, "packages", "") == ["alpha", "beta", "local"]
+        assert complete(cache_dir, skin_root, "packages", "al") == ["alpha"]
+        assert complete(cache_dir, skin_root, "installed", "") == ["local"]
+        assert complete(cache_dir, skin_root, "packages", "alpha@") == []
+
+        code = ("import sys, completion\n"
+                "completion.main(['packages', 'a'])\n"
+                "loaded = {'urllib.request', 'registry', 'cache', 'asyncio'} & set(sys.modules)\n"
+                "assert not loaded, loaded\n")
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(src_path), RAINMEAS_CACHE_DIR=cache_dir,
+                   RAINMEAS_OFFLINE="1")
+        result = subprocess.run([sys.executable, "-c", code], cwd=skin_root, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0, result.stderr
+    return True
+
+def test_failed_refresh_is_retried():
+    """Test that a refresh which wrote nothing is retried soon, not a day later"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = completion.names_path(tmp)
+        marker = os.path.join(tmp, completion.REFRESH_MARKER)
+        with mock.patch.dict(os.environ, {"RAINMEAS_OFFLINE": ""}), mock.patch("subprocess.Popen") as popen:
+            # Starting a refresh leaves the index alone, and throttles the next keystrokes
+            assert completion.refresh_in_background(path)
+            assert not os.path.exists(path) and os.path.exists(marker)
+            assert not completion.refresh_in_background(path)
+
+            # Once the retry interval passed, a missing or empty index is refreshed again
+            past = os.stat(marker).st_mtime - completion.REFRESH_RETRY_INTERVAL - 1
+            os.utime(marker, (past, past))
+            assert completion.refresh_in_background(path)
+            os.utime(marker, (past, past))
+            completion.write_names(tmp, [])
+            assert completion.refresh_in_background(path)
+
+            # A fresh index with names is left alone
+            os.utime(marker, (past, past))
+            completion.write_names(tmp, ["alpha"])
+            assert not completion.refresh_in_background(path)
+            assert popen.call_count == 3
+    return True
+
+def test_generated_scripts():
+    """Test the generated scripts cover the command tree, and drive the bash one through bash"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, "cache")
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(os.path.join(skin_root, "@Resources", "@rainmeas-modules", "local"))
+        completion.write_names(cache_dir, ["alpha", "beta"])
+        cli_instance = make_cli(pathlib.Path(tmp).as_uri(), cache_dir, skin_root)
+        parser = cli_instance.build_parser()
+
+        scripts = {shell: completion.generate(parser, shell, cli.PACKAGE_COMPLETIONS)
+                   for shell in completion.GENERATORS}
+        for shell, script in scripts.items():
+            for word in ("install", "registry", "sync", "offline", "ndjson", completion.COMPLETE_COMMAND):
+                assert word in script, (shell, word)
+        assert "bashcompinit" in scripts["zsh"]
+        assert "__fish_seen_subcommand_from registry; and __fish_seen_subcommand_from sync" in scripts["fish"]
+
+        bash = shutil.which("bash")
+        if bash is None:
+            return True
+        script_path = os.path.join(tmp, "rainmeas.bash")
+        with open(script_path, "w") as f:
+            f.write(scripts["bash"])
+        driver = (f"source {script_path}\n"
+                  f"rainmeas() {{ {sys.executable} {os.path.join(os.path.abspath(src_path), 'run_cli.py')} \"$@\"; }}\n"
+                  "run() { COMP_WORDS=(\"$@\"); COMP_CWORD=$(($# - 1)); _rainmeas; echo \"${COMPREPLY[*]}\"; }\n"
+                  "run rainmeas ins\n"
+                  "run rainmeas install ''\n"
+                  "run rainmeas --progress n\n"
+                  "run rainmeas --registry http://x r\n"
+                  "run rainmeas registry s\n"
+                  "run rainmeas registry sync --ar\n"
+                  "run rainmeas cache p\n"
+                  "run rainmeas remove ''\n"
+                  "run rainmeas completion ''\n")
+        env = dict(os.environ, RAINMEAS_CACHE_DIR=cache_dir, RAINMEAS_OFFLINE="1")
+        result = subprocess.run([bash, "--norc", "-c", driver], cwd=skin_root, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.splitlines() == [
+            "install",
+            "alpha beta local",
+            "ndjson none",
+            "remove registry",
+            "sync shard",
+            "--archives --archive-base-url",
+            "prune",
+            "local",
+            "bash fish zsh",
+        ], result.stdout
+    return True
+
+if __name__ == "__main__":
+    print("Running completion tests...")
+    try:
+        test_name_index_lookup()
+        test_registry_writes_name_index()
+        test_failed_refresh_is_retried()
+        test_generated_scripts()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
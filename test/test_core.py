@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio core API using a registry served from the local filesystem
+"""
+import asyncio
+import http.server
+import io
+import json
+import os
+import pathlib
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+
+import cli
+import core
+import journal
+import locks
+import registry
+
+def make_local_registry(root):
+    """Create a small file:// registry with two packages, 'alpha' depends on 'beta'"""
+    packages_dir = os.path.join(root, "packages")
+    archives_dir = os.path.join(root, "archives")
+    os.makedirs(packages_dir)
+    os.makedirs(archives_dir)
+
+    def archive(name, version):
+        path = os.path.join(archives_dir, f"{name}-{version}.zip")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{name}.lua", f"-- {name} {version}\n")
+        return pathlib.Path(path).as_uri()
+
+    packages = {
+        "alpha": {"description": "Alpha module", "author": "tester",
+                  "versions": {"latest": "1.0.0",
+                               "1.0.0": {"download": archive("alpha", "1.0.0"),
+                                         "dependencies": {"beta": "2.0.0"}}}},
+        "beta": {"description": "Beta module", "author": "tester",
+                 "versions": {"latest": "2.0.0",
+                              "2.0.0": {"download": archive("beta", "2.0.0")}}},
+    }
+    for name, info in packages.items():
+        with open(os.path.join(packages_dir, f"{name}.json"), "w") as f:
+            json.dump(info, f)
+    with open(os.path.join(root, "index.json"), "w") as f:
+        json.dump({name: {} for name in packages}, f)
+
+    reg = registry.Registry()
+    reg.remote_base_url = pathlib.Path(root).as_uri()
+    return reg
+
+def assert_default_mode(path):
+    """Assert that a directory has the permissions os.mkdir() gives it under the current umask"""
+    if os.name != "posix":
+        return
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(path).st_mode & 0o777 == 0o777 & ~umask, oct(os.stat(path).st_mode)
+
+def test_async_install_with_dependencies():
+    """Test that the async installer resolves, downloads and extracts dependencies"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+
+        events = []
+        installer = core.AsyncInstaller(skin_root, reg, listener=events.append)
+        result = asyncio.run(installer.install_package("alpha"))
+
+        assert result.success
+        assert result.installed == ["beta@2.0.0", "alpha@1.0.0"]
+        assert os.path.exists(os.path.join(installer.modules_dir, "alpha", "alpha.lua"))
+        assert os.path.exists(os.path.join(installer.modules_dir, "beta", "beta.lua"))
+        assert_default_mode(os.path.join(installer.modules_dir, "alpha"))
+        assert "installed" in [event.kind for event in events]
+
+        with open(os.path.join(skin_root, "rainmeas-package.json")) as f:
+            assert json.load(f) == {"packages": {"alpha": "1.0.0"}}
+
+        assert asyncio.run(installer.verify()) == {"alpha": True}
+    return True
+
+def test_async_resolve_missing_package():
+    """Test that resolution errors are returned as structured results"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        installer = core.AsyncInstaller(tmp, reg)
+        result = asyncio.run(installer.install_package("alpha", "9.9.9"))
+        assert not result.success
+        assert "Version '9.9.9' not found" in result.error
+    return True
+
+def test_pipelined_download_starts_during_resolution():
+    """Test that a package archive is fetched before its dependencies are resolved"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        downloads = []
+
+        def listener(event):
+            if event.kind == "download":
+                downloads.append(event.package)
+
+        installer = core.AsyncInstaller(os.path.join(tmp, "skin"), reg, listener=listener)
+        assert asyncio.run(installer.install_package("alpha")).success
+        # Without pipelining the dependency would always be downloaded first
+        assert downloads == ["alpha", "beta"]
+
+        # A failed resolution discards the speculative downloads
+        os.unlink(os.path.join(tmp, "registry", "packages", "beta.json"))
+        installer = core.AsyncInstaller(os.path.join(tmp, "skin2"), reg)
+        assert not asyncio.run(installer.install_package("alpha")).success
+        assert installer._speculative == {}
+        assert not os.path.exists(installer.modules_dir)
+    return True
+
+class SlowArchiveHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the server's archive in small chunks, slowly"""
+
+    def do_GET(self):
+        data = self.server.archive
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            for start in range(0, len(data), 4096):
+                self.wfile.write(data[start:start + 4096])
+                self.wfile.flush()
+                time.sleep(0.01)
+        except OSError:
+            # The client stopped reading
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def test_cancelled_download_leaves_nothing_behind():
+    """Test that a speculative streamed download is stopped before its staging directory is removed"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for i in range(40):
+            data = os.urandom(4096)
+            member = tarfile.TarInfo(f"lib/file{i}.bin")
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowArchiveHandler)
+    server.archive = buffer.getvalue()
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "registry")
+            reg = make_local_registry(root)
+            with open(os.path.join(root, "packages", "alpha.json"), "w") as f:
+                json.dump({"versions": {"latest": "1.0.0", "1.0.0": {
+                    "download": f"http://127.0.0.1:{server.server_address[1]}/alpha.tar.gz",
+                    "format": "tar.gz", "dependencies": {"ghost": "1.0.0"}}}}, f)
+
+            installer = core.AsyncInstaller(os.path.join(tmp, "skin"), reg)
+            result = asyncio.run(installer.install_package("alpha"))
+            assert not result.success and "ghost" in result.error
+            # The download thread has stopped, nothing appears after the cleanup either
+            time.sleep(0.3)
+            assert [name for name in os.listdir(installer.modules_dir) if name != locks.LOCKS_DIR] == []
+    finally:
+        server.shutdown()
+    return True
+
+def add_tar_package(root, name, version, mode, filename, archive_format):
+    """Add a tar package to a local registry, declared with the given format"""
+    source = os.path.join(root, "src", name)
+    os.makedirs(os.path.join(source, "lib"))
+    with open(os.path.join(source, "lib", f"{name}.lua"), "w") as f:
+        f.write(f"-- {name} {version}\n")
+    path = os.path.join(root, "archives", filename)
+    with tarfile.open(path, mode) as tar:
+        tar.add(os.path.join(source, "lib"), arcname="lib")
+    info = {"versions": {"latest": version,
+                         version: {"download": pathlib.Path(path).as_uri(), "format": archive_format}}}
+    with open(os.path.join(root, "packages", f"{name}.json"), "w") as f:
+        json.dump(info, f)
+
+def test_streamed_tar_packages():
+    """Test that tar packages are extracted while streaming, detected by content not URL"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "registry")
+        reg = make_local_registry(root)
+        add_tar_package(root, "gamma", "1.0.0", "w:gz", "gamma-1.0.0.tar.gz", "tar.gz")
+        # The suffix is misleading on purpose, the format comes from the magic bytes
+        add_tar_package(root, "delta", "1.0.0", "w:xz", "delta-1.0.0.zip", "tar.xz")
+
+        installer = core.AsyncInstaller(os.path.join(tmp, "skin"), reg)
+        for name in ("gamma", "delta"):
+            assert asyncio.run(installer.install_package(name)).success
+            assert os.path.exists(os.path.join(installer.modules_dir, name, "lib", f"{name}.lua"))
+            # Installed modules are readable by others, like any directory the user creates
+            assert_default_mode(os.path.join(installer.modules_dir, name))
+        # Staging directories are renamed into place
+        assert sorted(name for name in os.listdir(installer.modules_dir)
+                      if os.path.isdir(os.path.join(installer.modules_dir, name))
+                      and name != locks.LOCKS_DIR) == ["delta", "gamma"]
+
+        with open(os.path.join(root, "archives", "delta-1.0.0.zip"), "rb") as f:
+            assert core.detect_archive_format(f.read(core.MAGIC_SIZE)) == "tar.xz"
+    return True
+
+def test_plan_sizes_archives_without_writing():
+    """Test that a dry-run plan sizes every archive and leaves the skin root untouched"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "registry")
+        reg = make_local_registry(root)
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+
+        installer = core.AsyncInstaller(skin_root, reg)
+        plan = asyncio.run(installer.plan({"alpha": "@latest"}))
+        assert [f"{p.name}@{p.version}" for p in plan.packages] == ["beta@2.0.0", "alpha@1.0.0"]
+        expected = sum(os.path.getsize(os.path.join(root, "archives", name))
+                       for name in ("alpha-1.0.0.zip", "beta-2.0.0.zip"))
+        assert plan.total_bytes == expected and plan.unknown_sizes == 0
+        assert plan.estimate_seconds(expected / 2.0) == 2.0
+        assert plan.estimate_seconds(None) is None
+        assert os.listdir(skin_root) == []
+    return True
+
+def test_incremental_install_all():
+    """Test that an up-to-date manifest is satisfied without touching the registry"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "registry")
+        reg = make_local_registry(root)
+        skin_root = os.path.join(tmp, "skin")
+
+        installer = core.AsyncInstaller(skin_root, reg)
+        assert all(r.success for r in asyncio.run(installer.install_all({"alpha": "@latest"})))
+        beta_file = os.path.join(installer.modules_dir, "beta", "beta.lua")
+        mtime = os.stat(beta_file).st_mtime_ns
+
+        # Without the registry any download or lookup would fail
+        shutil.move(root, root + ".offline")
+        installer = core.AsyncInstaller(skin_root, reg)
+        results = asyncio.run(installer.install_all({"alpha": "1.0.0"}))
+        assert [r.skipped for r in results] == [True]
+        assert os.stat(beta_file).st_mtime_ns == mtime
+        # A dry run plans the same nothing
+        assert asyncio.run(installer.plan({"alpha": "1.0.0"}, incremental=True)).packages == []
+
+        # A missing module directory is reinstalled, its installed dependency is kept
+        shutil.move(root + ".offline", root)
+        shutil.rmtree(os.path.join(installer.modules_dir, "alpha"))
+        install_plan = asyncio.run(installer.plan({"alpha": "1.0.0"}, incremental=True))
+        assert [package.name for package in install_plan.packages] == ["alpha"]
+        events = []
+        installer = core.AsyncInstaller(skin_root, reg, listener=events.append)
+        assert all(r.success for r in asyncio.run(installer.install_all({"alpha": "1.0.0"})))
+        assert [e.package for e in events if e.kind == "download"] == ["alpha"]
+        assert os.stat(beta_file).st_mtime_ns == mtime
+
+        # Modules the manifest no longer needs are removed
+        installer = core.AsyncInstaller(skin_root, reg)
+        asyncio.run(installer.install_all({}))
+        assert not os.path.exists(os.path.join(installer.modules_dir, "alpha"))
+        assert not os.path.exists(os.path.join(installer.modules_dir, "beta"))
+    return True
+
+def test_recover_interrupted_batch():
+    """Test that an interrupted batch is finished or rolled back package by package"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        skin_root = os.path.join(tmp, "skin")
+        installer = core.AsyncInstaller(skin_root, reg)
+        modules_dir = installer.modules_dir
+
+        # Simulate a crash: beta was fully extracted but not moved into place, alpha was still extracting
+        beta_staging = os.path.join(modules_dir, ".beta-staged")
+        alpha_staging = os.path.join(modules_dir, ".alpha-staged")
+        os.makedirs(beta_staging)
+        os.makedirs(alpha_staging)
+        with open(os.path.join(beta_staging, "beta.lua"), "w") as f:
+            f.write("-- beta 2.0.0\n")
+        interrupted = journal.Journal(modules_dir, "install", {"alpha": "1.0.0"})
+        interrupted.update("beta", "extracted", version="2.0.0", dependencies={}, dependency=True,
+                           staging=beta_staging, backup=os.path.join(modules_dir, ".beta-old"))
+        interrupted.update("alpha", "extracting", version="1.0.0", dependencies={"beta": "2.0.0"},
+                           dependency=False, staging=alpha_staging)
+
+        result = installer.recover()
+        assert result.completed == ["beta"] and result.rolled_back == ["alpha"]
+        assert os.path.exists(os.path.join(modules_dir, "beta", "beta.lua"))
+        assert os.path.exists(interrupted.path)
+        assert [name for name in sorted(os.listdir(modules_dir)) if not name.startswith(".rainmeas-")] == ["beta"]
+
+        # Resuming only installs what is still outstanding
+        downloads = []
+        installer = core.AsyncInstaller(skin_root, reg,
+                                        listener=lambda e: downloads.append(e.package) if e.kind == "download" else None)
+        assert installer.begin_batch(result.command, result.packages)
+        assert all(r.success for r in asyncio.run(installer.install_all(result.packages)))
+        installer.end_batch()
+        assert downloads == ["alpha"]
+        assert journal.Journal.load(modules_dir) is None
+        assert installer.recover() is None
+
+    return True
+
+def test_failed_update_can_be_resumed():
+    """Test that an update failing part way keeps its journal, so --resume can finish it"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "registry")
+        reg = make_local_registry(root)
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+        cli_instance = cli.RainmeasCLI(package_registry=reg, skin_root=skin_root)
+        assert cli_instance.installer.install_package("beta", "2.0.0")
+
+        # Publish a newer beta so the update has something to do
+        beta_file = os.path.join(root, "packages", "beta.json")
+        with open(beta_file) as f:
+            beta = json.load(f)
+        beta["versions"]["2.1.0"] = beta["versions"]["2.0.0"]
+        beta["versions"]["latest"] = "2.1.0"
+        with open(beta_file, "w") as f:
+            json.dump(beta, f)
+
+        def fail(package_name, version):
+            raise locks.LockTimeout("beta is locked by another process")
+        cli_instance.installer.install_package = fail
+        try:
+            cli_instance.update_all()
+            assert False, "update_all should re-raise the error"
+        except locks.LockTimeout:
+            pass
+        assert cli_instance.installer.core.journal is None
+
+        # The journal was released, not removed, so a later run resumes the update
+        resumed = cli.RainmeasCLI(package_registry=reg, skin_root=skin_root)
+        interrupted = journal.Journal.load(resumed.installer.modules_dir)
+        assert interrupted.command == "update" and interrupted.packages == {"beta": "2.1.0"}
+        interrupted.lock.release()
+        assert resumed.resume() == 0
+        assert resumed.installer.list_installed_packages() == {"beta": "2.1.0"}
+        assert journal.Journal.load(resumed.installer.modules_dir) is None
+    return True
+
+def test_clean_keeps_hidden_entries():
+    """Test that clean removes unused modules but not locks or the directories of installs in progress"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+        cli_instance = cli.RainmeasCLI(package_registry=reg, skin_root=skin_root)
+        assert cli_instance.installer.install_package("beta", "2.0.0")
+        modules_dir = cli_instance.installer.modules_dir
+        os.makedirs(os.path.join(modules_dir, ".gamma-123-staged"))
+        cli_instance.installer._remove_from_config("beta")
+
+        assert cli_instance.clean() == 0
+        assert not os.path.exists(os.path.join(modules_dir, "beta"))
+        assert os.path.isdir(os.path.join(modules_dir, locks.LOCKS_DIR))
+        assert os.path.isdir(os.path.join(modules_dir, ".gamma-123-staged"))
+        assert "beta" not in cli_instance.installer.core.install_state()
+    return True
+
+if __name__ == "__main__":
+    print("Running core API tests...")
+    try:
+        test_async_install_with_dependencies()
+        test_async_resolve_missing_package()
+        test_pipelined_download_starts_during_resolution()
+        test_cancelled_download_leaves_nothing_behind()
+        test_streamed_tar_packages()
+        test_plan_sizes_archives_without_writing()
+        test_incremental_install_all()
+        test_recover_interrupted_batch()
+        test_failed_update_can_be_resumed()
+        test_clean_keeps_hidden_entries()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
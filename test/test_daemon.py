@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for forwarding CLI commands to the background daemon
+"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import cache
+import cli
+import daemon
+import daemon_client
+import registry
+from test_core import make_local_registry
+
+def test_search_is_forwarded_to_daemon():
+    """Test that search is answered by a running daemon and falls back without one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_url = make_local_registry(os.path.join(tmp, "registry")).remote_base_url
+        env = {"RAINMEAS_CACHE_DIR": os.path.join(tmp, "cache"), "RAINMEAS_REGISTRY": registry_url}
+        with mock.patch.dict(os.environ, env):
+            server = daemon.Daemon()
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                thread.start()
+                for _ in range(100):
+                    if daemon.send_request({"command": "ping"}) is not None:
+                        break
+                    time.sleep(0.05)
+
+            response = daemon.forward(["info", "beta"], tmp)
+            assert response["exit_code"] == 0 and "Package: beta" in response["stdout"]
+
+            # The entry point forwards before importing the CLI
+            code = ("import sys, daemon_client\n"
+                    "response = daemon_client.forward_argv(sys.argv[1:], '.')\n"
+                    "sys.stdout.write(response['stdout'])\n"
+                    "loaded = {'cli', 'registry', 'cache', 'urllib.request', 'asyncio'} & set(sys.modules)\n"
+                    "assert not loaded, loaded\n")
+            result = subprocess.run([sys.executable, "-c", code, "--progress", "none", "info", "beta"],
+                                    env=dict(os.environ, PYTHONPATH=os.path.abspath(src_path)),
+                                    capture_output=True, text=True, timeout=60)
+            assert result.returncode == 0 and "Package: beta" in result.stdout, result.stderr
+            assert daemon_client.forward_argv(["--registry=" + registry_url, "search", "alpha"], tmp) is not None
+            for args in (["--offline", "info", "beta"], ["install", "beta"], ["--registry"], []):
+                assert daemon_client.forward_argv(args, tmp) is None, args
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                assert cli.RainmeasCLI().run(["search", "alpha"]) == 0
+            assert output.getvalue() == "Packages matching 'alpha':\n  alpha (latest: 1.0.0)\n"
+
+            # A client using another registry is not answered from the daemon's data
+            other_url = make_local_registry(os.path.join(tmp, "other")).remote_base_url
+            alpha_path = os.path.join(tmp, "other", "packages", "alpha.json")
+            with open(alpha_path) as f:
+                alpha = json.load(f)
+            alpha["description"] = "Alpha from the other registry"
+            with open(alpha_path, "w") as f:
+                json.dump(alpha, f)
+            assert daemon.forward(["info", "alpha"], tmp, other_url) is None
+            for args, environ in ((["--registry", other_url, "info", "alpha"], {}),
+                                  (["info", "alpha"], {"RAINMEAS_REGISTRY": other_url})):
+                with mock.patch.dict(os.environ, environ):
+                    assert daemon_client.forward_argv(args, tmp) is None, args
+                    # The CLI itself never probes the daemon, the entry points did already
+                    output = io.StringIO()
+                    with mock.patch.object(daemon_client, "send_request", side_effect=AssertionError("forwarded")), \
+                            contextlib.redirect_stdout(output):
+                        assert cli.RainmeasCLI().run(args) == 0
+                assert "Alpha from the other registry" in output.getvalue()
+
+            server.shutdown()
+            thread.join(5)
+            assert daemon.send_request({"command": "ping"}) is None
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert cli.RainmeasCLI().run(["search", "alpha"]) == 0
+    return True
+
+def test_client_matches_cli_defaults():
+    """Test that the client finds the daemon and registry the CLI would use"""
+    with mock.patch.dict(os.environ, {"RAINMEAS_CACHE_DIR": ""}):
+        assert daemon_client.default_cache_dir() == cache.default_cache_dir()
+    assert daemon_client.DEFAULT_REGISTRY_URL == registry.DEFAULT_REGISTRY_URL
+    assert daemon_client.FORWARDED_COMMANDS == daemon.FORWARDED_COMMANDS
+    return True
+
+if __name__ == "__main__":
+    print("Running daemon tests...")
+    try:
+        test_search_is_forwarded_to_daemon()
+        test_client_matches_cli_defaults()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
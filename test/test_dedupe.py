@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for hardlinking identical files across installed modules
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+
+import dedupe
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+def test_dedupe_links_identical_files():
+    """Test that identical files are linked once and re-runs only hash new files"""
+    with tempfile.TemporaryDirectory() as modules_dir:
+        for name in ("alpha", "beta"):
+            write_file(os.path.join(modules_dir, name, "fonts", "icons.ttf"), "shared font")
+            write_file(os.path.join(modules_dir, name, "settings.ini"), "[Variables]\n")
+        write_file(os.path.join(modules_dir, "beta", "beta.lua"), "-- beta\n")
+
+        result = dedupe.dedupe_modules(modules_dir)
+        assert result.linked == ["beta/fonts/icons.ttf"]
+        assert result.hashed == 3
+        alpha_font = os.path.join(modules_dir, "alpha", "fonts", "icons.ttf")
+        beta_font = os.path.join(modules_dir, "beta", "fonts", "icons.ttf")
+        assert os.path.samefile(alpha_font, beta_font)
+        # Settings files may be rewritten by skins, so they keep separate copies
+        assert not os.path.samefile(os.path.join(modules_dir, "alpha", "settings.ini"),
+                                    os.path.join(modules_dir, "beta", "settings.ini"))
+
+        # Nothing changed, so nothing is hashed again
+        result = dedupe.dedupe_modules(modules_dir)
+        assert result.linked == [] and result.hashed == 0
+
+        # Updating a module replaces its directory and leaves the other copy intact
+        shutil.rmtree(os.path.join(modules_dir, "beta"))
+        write_file(beta_font, "new font")
+        with open(alpha_font) as f:
+            assert f.read() == "shared font"
+        result = dedupe.dedupe_modules(modules_dir)
+        assert result.linked == [] and result.hashed == 1
+    return True
+
+if __name__ == "__main__":
+    print("Running dedupe tests...")
+    try:
+        test_dedupe_links_identical_files()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
@@ -47,6 +47,111 @@ def test_imports():
         print(f"✗ Failed to import semver module: {e}")
         return False
     
+    try:
+        import core
+        print("✓ core module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import core module: {e}")
+        return False
+    
+    try:
+        import workspace
+        print("✓ workspace module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import workspace module: {e}")
+        return False
+    
+    try:
+        import cache
+        print("✓ cache module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import cache module: {e}")
+        return False
+    
+    try:
+        import mirror
+        print("✓ mirror module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import mirror module: {e}")
+        return False
+    
+    try:
+        import progress
+        print("✓ progress module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import progress module: {e}")
+        return False
+    
+    try:
+        import daemon
+        print("✓ daemon module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import daemon module: {e}")
+        return False
+    
+    try:
+        import throttle
+        print("✓ throttle module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import throttle module: {e}")
+        return False
+    
+    try:
+        import shards
+        print("✓ shards module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import shards module: {e}")
+        return False
+    
+    try:
+        import dedupe
+        print("✓ dedupe module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import dedupe module: {e}")
+        return False
+    
+    try:
+        import pack
+        print("✓ pack module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import pack module: {e}")
+        return False
+    
+    try:
+        import journal
+        print("✓ journal module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import journal module: {e}")
+        return False
+    
+    try:
+        import model
+        print("✓ model module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import model module: {e}")
+        return False
+    
+    try:
+        import locks
+        print("✓ locks module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import locks module: {e}")
+        return False
+    
+    try:
+        import completion
+        print("✓ completion module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import completion module: {e}")
+        return False
+    
+    try:
+        import daemon_client
+        print("✓ daemon_client module imported successfully")
+    except Exception as e:
+        print(f"✗ Failed to import daemon_client module: {e}")
+        return False
+    
     return True
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for cross-process locks, with several rainmeas processes sharing one skin root and cache
+"""
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+
+import locks
+import utils
+
+# Processes started at once by the stress tests
+PROCESSES = 8
+
+def run_parallel(code, args_list):
+    """Run a Python snippet in one process per argument list, all at once"""
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(src_path))
+    processes = [subprocess.Popen([sys.executable, "-c", code, *args], env=env,
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                 for args in args_list]
+    outputs = [process.communicate(timeout=120)[0].decode("utf-8", "replace") for process in processes]
+    for process, output in zip(processes, outputs):
+        assert process.returncode == 0, output
+    return outputs
+
+def test_stale_lock_is_taken_over():
+    """Test that a lock whose holder died is free and reported as stale"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "locks", "held.lock")
+        code = "import locks, os, sys; locks.FileLock(sys.argv[1]).acquire(); os._exit(0)"
+        run_parallel(code, [[path]])
+
+        lock = locks.FileLock(path, timeout=1)
+        with lock:
+            assert lock.stale is not None and lock.stale["pid"] != os.getpid()
+        # A clean release leaves nothing to report
+        with lock:
+            assert lock.stale is None
+
+        # A live holder makes others time out
+        with locks.FileLock(path):
+            try:
+                locks.FileLock(path, timeout=0.1).acquire()
+                assert False, "lock acquired twice"
+            except locks.LockTimeout:
+                pass
+    return True
+
+def test_lock_excludes_processes():
+    """Test that read-modify-write cycles under a lock never lose an update"""
+    with tempfile.TemporaryDirectory() as tmp:
+        counter = os.path.join(tmp, "counter")
+        with open(counter, "w") as f:
+            f.write("0")
+        code = (
+            "import locks, os, sys\n"
+            "for _ in range(50):\n"
+            "    with locks.FileLock(sys.argv[1] + '.lock'):\n"
+            "        value = int(open(sys.argv[1]).read())\n"
+            "        with open(sys.argv[1], 'w') as f:\n"
+            "            f.write(str(value + 1))\n"
+        )
+        run_parallel(code, [[counter]] * PROCESSES)
+        with open(counter) as f:
+            assert int(f.read()) == 50 * PROCESSES
+    return True
+
+def test_parallel_installs_into_one_skin():
+    """Test that processes installing overlapping packages into one skin and cache stay consistent"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_dir = os.path.join(tmp, "registry")
+        os.makedirs(os.path.join(registry_dir, "packages"))
+        os.makedirs(os.path.join(registry_dir, "archives"))
+        names = [f"module{i}" for i in range(PROCESSES * 2)]
+        for name in names:
+            archive = os.path.join(registry_dir, "archives", f"{name}.zip")
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for j in range(20):
+                    zf.writestr(f"{name}/file{j}.lua", f"-- {name} {j}\n" * 200)
+            with open(os.path.join(registry_dir, "packages", f"{name}.json"), "w") as f:
+                json.dump({"versions": {"latest": "1.0.0",
+                                        "1.0.0": {"download": pathlib.Path(archive).as_uri()}}}, f)
+        with open(os.path.join(registry_dir, "index.json"), "w") as f:
+            json.dump({name: {} for name in names}, f)
+
+        skin_root = os.path.join(tmp, "skin")
+        os.makedirs(skin_root)
+        code = (
+            "import sys, cache, installer, registry\n"
+            "reg = registry.Registry(cache=cache.Cache(sys.argv[3]), base_url=sys.argv[2])\n"
+            "inst = installer.Installer(sys.argv[1], reg, listener=lambda event: None)\n"
+            "for name in sys.argv[4:]:\n"
+            "    assert inst.install_package(name), name\n"
+            "reg.cache.flush_stats()\n"
+        )
+        registry_url = pathlib.Path(registry_dir).as_uri()
+        cache_dir = os.path.join(tmp, "cache")
+        # Every process installs two packages of its own and one another process installs too
+        run_parallel(code, [[skin_root, registry_url, cache_dir, names[2 * i], names[2 * i + 1],
+                             names[(2 * i + 2) % len(names)]] for i in range(PROCESSES)])
+
+        assert utils.get_installed_packages(skin_root) == {name: "1.0.0" for name in names}
+        modules_dir = os.path.join(skin_root, "@Resources", "@rainmeas-modules")
+        assert sorted(utils.load_install_state(modules_dir)) == sorted(names)
+        # No staging directories, backups or journals are left behind
+        assert sorted(name for name in os.listdir(modules_dir) if name != locks.LOCKS_DIR) == sorted(
+            names + [utils.INSTALL_STATE_FILE])
+        for name in names:
+            assert len(os.listdir(os.path.join(modules_dir, name, name))) == 20
+        with open(os.path.join(cache_dir, "stats.json")) as f:
+            stats = json.load(f)
+        # Each archive was downloaded once, the overlapping installs hit the cache
+        assert stats["archive_misses"] == len(names)
+        assert stats["archive_hits"] == PROCESSES * 3 - len(names)
+    return True
+
+if __name__ == "__main__":
+    print("Running lock tests...")
+    try:
+        test_stale_lock_is_taken_over()
+        test_lock_excludes_processes()
+        test_parallel_installs_into_one_skin()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
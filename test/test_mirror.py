@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for mirroring a registry into a local static snapshot
+"""
+import asyncio
+import json
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import core
+import mirror
+import registry
+from test_core import make_local_registry
+
+def test_sync_is_incremental_and_self_contained():
+    """Test that a mirror with archives works without its source and resyncs incrementally"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "registry")
+        source_url = make_local_registry(source_dir).remote_base_url
+        dest = os.path.join(tmp, "mirror")
+
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest, include_archives=True).sync())
+        assert result.success
+        assert sorted(result.updated) == ["alpha", "beta"]
+        assert sorted(result.archives_downloaded) == ["alpha@1.0.0", "beta@2.0.0"]
+
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest, include_archives=True).sync())
+        assert result.updated == [] and result.archives_downloaded == []
+        assert sorted(result.unchanged) == ["alpha", "beta"]
+
+        assert os.path.exists(os.path.join(dest, "index", "manifest.json"))
+
+        shutil.rmtree(source_dir)
+        reg = registry.Registry(base_url=pathlib.Path(dest).as_uri())
+        assert reg.search_packages("beta module") == {"beta": {"latest": "2.0.0", "versions": ["2.0.0"]}}
+
+        skin_root = os.path.join(tmp, "skin")
+        result = asyncio.run(core.AsyncInstaller(skin_root, reg).install_package("alpha"))
+        assert result.success
+    return True
+
+def test_search_index_orders_versions():
+    """Test that the search index picks the latest version by version order, not string order"""
+    index = mirror.build_search_index({
+        "clock": {"versions": {"1.9.0": {}, "1.10.0": {}}},
+        "pinned": {"versions": {"latest": "1.9.0", "1.9.0": {}, "1.10.0": {}}},
+        "beta": {"versions": {"2.0.0-rc.1": {}, "2.0.0": {}}},
+        "empty": {"versions": {}},
+    })
+    assert index["clock"]["latest"] == "1.10.0"
+    assert index["pinned"]["latest"] == "1.9.0"
+    assert index["beta"]["latest"] == "2.0.0"
+    assert index["empty"]["latest"] is None
+    return True
+
+def test_failed_entries_are_retried_and_unlisted():
+    """Test that failed writes are retried, and names without a package file or with unsafe paths are not listed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "registry")
+        source_url = make_local_registry(source_dir).remote_base_url
+        dest = os.path.join(tmp, "mirror")
+        assert asyncio.run(mirror.RegistryMirror(source_url, dest).sync()).success
+
+        # A failed write of a changed package file is not recorded as synced
+        beta_file = os.path.join(source_dir, "packages", "beta.json")
+        with open(beta_file) as f:
+            beta = json.load(f)
+        beta["description"] = "Beta module, updated"
+        with open(beta_file, "w") as f:
+            json.dump(beta, f)
+        write_file = mirror.RegistryMirror._write_file
+        def failing_write(self, path, data):
+            if path.endswith("beta.json"):
+                raise OSError("disk full")
+            write_file(self, path, data)
+        with mock.patch.object(mirror.RegistryMirror, "_write_file", failing_write):
+            assert not asyncio.run(mirror.RegistryMirror(source_url, dest).sync()).success
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest).sync())
+        assert result.updated == ["beta"]
+        with open(os.path.join(dest, "packages", "beta.json")) as f:
+            assert json.load(f)["description"] == "Beta module, updated"
+
+        # New names whose package file failed, or that would leave the mirror, are not listed
+        with open(os.path.join(source_dir, "index.json"), "w") as f:
+            json.dump({"alpha": {}, "beta": {}, "gamma": {}, "../../evil": {}}, f)
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest).sync())
+        assert sorted(entry.split(":")[0] for entry in result.failed) == ["../../evil", "gamma"]
+        with open(os.path.join(dest, "index.json")) as f:
+            assert sorted(json.load(f)) == ["alpha", "beta"]
+        assert not os.path.exists(os.path.join(tmp, "evil.json"))
+
+        # Once the package file is published, the next sync lists it
+        with open(os.path.join(source_dir, "packages", "gamma.json"), "w") as f:
+            json.dump({"description": "Gamma module", "versions": {"../1.0.0": {"download": "file:///x.zip"}}}, f)
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest).sync())
+        with open(os.path.join(dest, "index.json")) as f:
+            assert sorted(json.load(f)) == ["alpha", "beta", "gamma"]
+
+        # Versions are path components of the mirrored archives too
+        result = asyncio.run(mirror.RegistryMirror(source_url, dest, include_archives=True).sync())
+        assert any(entry.startswith("gamma:") for entry in result.failed), result.failed
+        assert not os.path.exists(os.path.join(dest, "archives", "1.0.0"))
+    return True
+
+if __name__ == "__main__":
+    print("Running mirror tests...")
+    try:
+        test_sync_is_incremental_and_self_contained()
+        test_search_index_orders_versions()
+        test_failed_entries_are_retried_and_unlisted()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
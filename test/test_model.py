@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the package metadata model and its snapshot
+"""
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import cache
+import model
+import registry
+import semver
+from test_core import make_local_registry
+
+def test_package_versions_sorted_once():
+    """Test version ordering, the latest pointer and dependencies of a parsed package"""
+    package = model.Package.from_dict("clock", {
+        "description": "Clock", "author": "Tester",
+        "versions": {"1.10.0": {"download": "https://example.com/1.10.0.zip",
+                                "dependencies": {"base": "1.0.0"}},
+                     "1.9.0": {"download": "https://example.com/1.9.0.zip"},
+                     "2.0.0-beta": {"download": "https://example.com/2.0.0-beta.zip", "format": "tar.gz"}}})
+    assert package.sorted_versions == ("1.9.0", "1.10.0", "2.0.0-beta")
+    assert package.latest == "2.0.0-beta"
+    assert package.versions["1.10.0"].dependency_map() == {"base": "1.0.0"}
+    assert package.versions["2.0.0-beta"].archive_format == "tar.gz"
+    assert package.matches("tester") and not package.matches("weather")
+    assert model.version_key("2.0.0-beta") < model.version_key("2.0.0")
+    assert model.version_key is semver.version_key
+    assert semver.version_key("v1.10.0") > semver.version_key("1.9.0+build")
+
+    # An explicit pointer wins over the highest version
+    pinned = model.Package.from_dict("clock", {"versions": {"latest": "1.9.0", "1.9.0": {}, "1.10.0": {}}})
+    assert pinned.latest == "1.9.0"
+    assert not hasattr(pinned, "__dict__")
+    return True
+
+def test_online_lookups_reuse_model():
+    """Test that repeated lookups build a package model once, and again only when its file changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_url = make_local_registry(os.path.join(tmp, "registry")).remote_base_url
+        for local_cache in (cache.Cache(os.path.join(tmp, "cache")), None):
+            online = registry.Registry(cache=local_cache, base_url=registry_url)
+            with mock.patch.object(model.Package, "from_dict", side_effect=model.Package.from_dict) as from_dict:
+                assert online.get_latest_version("beta") == "2.0.0"
+                assert online.get_latest_version("beta") == "2.0.0"
+                assert online.get_available_versions("beta") == ["2.0.0"]
+                assert from_dict.call_count == 1
+
+        # A changed file builds a new model
+        with open(os.path.join(tmp, "registry", "packages", "beta.json"), "w") as f:
+            f.write('{"versions": {"2.0.0": {}, "2.1.0": {}}}')
+        assert online.get_latest_version("beta") == "2.1.0"
+
+        # With an ETag the metadata is not even compared, a new ETag builds a new model
+        local_cache = cache.Cache(os.path.join(tmp, "etag-cache"))
+        online = registry.Registry(cache=local_cache, base_url=registry_url)
+        with mock.patch.object(local_cache, "get_etag", return_value='"v1"'):
+            assert online.get_package_model("beta", {"versions": {"2.0.0": {}}}).latest == "2.0.0"
+            assert online.get_package_model("beta", {"versions": {"9.0.0": {}}}).latest == "2.0.0"
+        with mock.patch.object(local_cache, "get_etag", return_value='"v2"'):
+            assert online.get_package_model("beta", {"versions": {"2.1.0": {}}}).latest == "2.1.0"
+    return True
+
+def test_offline_lookups_use_snapshot():
+    """Test that fetch --all writes a snapshot which offline lookups use until a file changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_dir = os.path.join(tmp, "registry")
+        registry_url = make_local_registry(registry_dir).remote_base_url
+        local_cache = cache.Cache(os.path.join(tmp, "cache"))
+        online = registry.Registry(cache=local_cache, base_url=registry_url)
+        for name in online.list_all_package_names():
+            online.get_package_model(name)
+        assert online.save_snapshot() == 2
+        shutil.rmtree(registry_dir)
+
+        offline = registry.Registry(cache=local_cache, offline=True, base_url=registry_url)
+        with mock.patch.object(model.Package, "from_dict", side_effect=AssertionError("parsed JSON")):
+            # Served from the snapshot, nothing is parsed
+            assert offline.get_latest_version("alpha") == "1.0.0"
+            assert offline.get_available_versions("beta") == ["2.0.0"]
+            assert list(offline.search_packages("alpha module")) == ["alpha"]
+
+        # A changed cache file is read again instead of trusting the snapshot
+        local_cache.put_metadata(f"{registry_url}/packages/beta.json",
+                                 {"versions": {"2.0.0": {}, "2.1.0": {}}})
+        assert offline.get_latest_version("beta") == "2.1.0"
+    return True
+
+if __name__ == "__main__":
+    print("Running model tests...")
+    try:
+        test_package_versions_sorted_once()
+        test_online_lookups_reuse_model()
+        test_offline_lookups_use_snapshot()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests for packing skins into reproducible .rmskin and zip bundles
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import zipfile
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import pack
+from test_cache import make_cli
+from test_core import make_local_registry
+
+def test_pack_is_reproducible_and_reuses_archives():
+    """Test that packing twice gives identical bundles and reuses cached module data"""
+    with tempfile.TemporaryDirectory() as tmp:
+        registry_url = make_local_registry(os.path.join(tmp, "registry")).remote_base_url
+        cache_dir = os.path.join(tmp, "cache")
+        skin_root = os.path.join(tmp, "MySkin")
+        os.makedirs(os.path.join(skin_root, "@Resources"))
+        with open(os.path.join(skin_root, "MySkin.ini"), "w") as f:
+            f.write("[Rainmeter]\nUpdate=1000\n" * 50)
+
+        cli_instance = make_cli(registry_url, cache_dir, skin_root)
+        assert cli_instance.run(["install", "alpha"]) == 0
+
+        archives_dir = cli_instance.registry.cache.archives_dir
+        first = os.path.join(tmp, "first.rmskin")
+        result = pack.pack_skin(skin_root, first, "rmskin", jobs=4, archives_dir=archives_dir,
+                                metadata={"author": "tester"})
+        assert result.files == 4 and result.reused == 2
+
+        second = os.path.join(tmp, "second.rmskin")
+        pack.pack_skin(skin_root, second, "rmskin", jobs=1, archives_dir=archives_dir,
+                       metadata={"author": "tester"})
+        with open(first, "rb") as f1, open(second, "rb") as f2:
+            data = f1.read()
+            assert data == f2.read()
+        assert data.endswith(b"RMSKIN\x00")
+
+        # Another cached version of a module is never reused, however recent
+        stray = os.path.join(archives_dir, "beta", "9.9.9-0000000000000000")
+        with zipfile.ZipFile(stray, "w", zipfile.ZIP_DEFLATED, compresslevel=0) as zf:
+            zf.write(os.path.join(skin_root, "@Resources", "@rainmeas-modules", "beta", "beta.lua"), "beta.lua")
+        third = os.path.join(tmp, "third.rmskin")
+        pack.pack_skin(skin_root, third, "rmskin", jobs=2, archives_dir=archives_dir,
+                       metadata={"author": "tester"})
+        with open(third, "rb") as f:
+            assert f.read() == data
+
+        with zipfile.ZipFile(first) as zf:
+            assert zf.testzip() is None
+            names = zf.namelist()
+            assert names[0] == "RMSKIN.ini"
+            assert "Skins/MySkin/@Resources/@rainmeas-modules/beta/beta.lua" in names
+            assert zf.read("Skins/MySkin/MySkin.ini").startswith(b"[Rainmeter]")
+            assert b"Author=tester" in zf.read("RMSKIN.ini")
+
+        # A bundle written into the skin root does not include itself, nothing is reused without --reuse
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assert cli_instance.run(["pack", os.path.join(skin_root, "MySkin.zip")]) == 0
+        assert "(0 reused" in output.getvalue()
+        with zipfile.ZipFile(os.path.join(skin_root, "MySkin.zip")) as zf:
+            assert "MySkin.zip" not in zf.namelist() and "MySkin.ini" in zf.namelist()
+    return True
+
+if __name__ == "__main__":
+    print("Running pack tests...")
+    try:
+        test_pack_is_reproducible_and_reuses_archives()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
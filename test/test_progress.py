@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for download progress reporting
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import core
+import progress
+from test_core import make_local_registry
+
+def test_ndjson_progress_from_install():
+    """Test that download and extract stages feed NDJSON progress events"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        stream = io.StringIO()
+        messages = []
+        reporter = progress.ProgressReporter("ndjson", stream=stream, interval=0,
+                                             message_printer=messages.append)
+        result = asyncio.run(core.AsyncInstaller(os.path.join(tmp, "skin"), reg, listener=reporter).install_package("alpha"))
+        reporter.close()
+
+        assert result.success
+        assert "Successfully installed alpha@1.0.0" in [event.message for event in messages]
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert events[-1]["event"] == "progress_done"
+        assert events[-1]["files_extracted"] == 2
+        assert events[-1]["bytes"] == sum(os.path.getsize(os.path.join(tmp, "registry", "archives", name))
+                                          for name in ("alpha-1.0.0.zip", "beta-2.0.0.zip"))
+    return True
+
+def test_tty_display_is_throttled():
+    """Test that per-chunk events do not redraw the live display every time"""
+    stream = io.StringIO()
+    reporter = progress.ProgressReporter("tty", stream=stream, interval=60)
+    reporter(core.ProgressEvent("download", "alpha", "1.0.0"))
+    for done in range(0, 100000, 1000):
+        reporter(core.ProgressEvent("download_progress", "alpha", "1.0.0", bytes=done, total=100000))
+    assert stream.getvalue().count("Total:") == 1
+    return True
+
+if __name__ == "__main__":
+    print("Running progress tests...")
+    try:
+        test_ndjson_progress_from_install()
+        test_tty_display_is_throttled()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
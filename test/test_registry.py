@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for request coalescing and negative caching in the registry
+"""
+import concurrent.futures
+import http.server
+import os
+import sys
+import threading
+import time
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+
+import registry
+
+class CountingHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a slow package file for 'alpha' and 404 for everything else"""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+        if self.path != "/packages/alpha.json":
+            self.send_response(404)
+            self.end_headers()
+            return
+        time.sleep(0.2)
+        body = b'{"versions": {"latest": "1.0.0", "1.0.0": {}}}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def test_concurrent_lookups_share_one_request():
+    """Test that concurrent and repeated lookups do not multiply requests"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        reg = registry.Registry(base_url=f"http://127.0.0.1:{server.server_address[1]}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(reg.get_package_info, ["alpha"] * 8))
+        assert all(result == results[0] for result in results)
+        assert results[0]["versions"]["latest"] == "1.0.0"
+        assert server.requests.count("/packages/alpha.json") == 1
+
+        for _ in range(3):
+            assert reg.get_package_info("alpah") is None
+        assert server.requests.count("/packages/alpah.json") == 1
+    finally:
+        server.shutdown()
+    return True
+
+if __name__ == "__main__":
+    print("Running registry tests...")
+    try:
+        test_concurrent_lookups_share_one_request()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
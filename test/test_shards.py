@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded registry index
+"""
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import shards
+from test_core import make_local_registry
+
+def test_sharded_lookups():
+    """Test that a sharded registry answers lookups from single shards"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "registry")
+        reg = make_local_registry(root)
+        manifest = shards.shard_registry(root, prefix_length=1)
+        assert manifest["package_count"] == 2
+
+        assert reg.list_all_package_names() == ["alpha", "beta"]
+        assert reg.package_exists("alpha") is True
+        assert reg.get_package_info("alpha")["description"] == "Alpha module"
+        # Unknown names never reach packages/<name>.json
+        assert reg.get_package_info("alpah") is None
+        assert not any(url.endswith("/packages/alpah.json") for url in reg._missing)
+
+        # Listing every name takes the flat index.json, not one request per shard
+        fetched = []
+        fetch = reg._fetch_remote_json
+        with mock.patch.object(reg, "_fetch_remote_json",
+                               side_effect=lambda url, optional=False: fetched.append(url) or fetch(url, optional)):
+            reg._shards.clear()
+            assert reg.list_all_package_names() == ["alpha", "beta"]
+        assert not any("/index/shards/" in url for url in fetched)
+        # Without it, the shards are listed
+        os.rename(os.path.join(root, "index.json"), os.path.join(tmp, "index.json"))
+        reg._shards.clear()
+        assert reg.list_all_package_names() == ["alpha", "beta"]
+        os.rename(os.path.join(tmp, "index.json"), os.path.join(root, "index.json"))
+
+        # Resharding after a change keeps the shards of the previous manifest, which clients may still hold
+        previous = manifest
+        with open(os.path.join(root, "index.json"), "w") as f:
+            json.dump({"alpha": {}, "gamma": {}}, f)
+        manifest = shards.shard_registry(root, prefix_length=1)
+        shard_files = os.listdir(os.path.join(root, "index", "shards"))
+        referenced = {os.path.basename(p) for p in [*manifest["shards"].values(), *previous["shards"].values()]}
+        assert sorted(shard_files) == sorted(referenced)
+        assert set(shard_files) != {os.path.basename(p) for p in manifest["shards"].values()}
+        # The next build removes them
+        manifest = shards.shard_registry(root, prefix_length=1)
+        shard_files = os.listdir(os.path.join(root, "index", "shards"))
+        assert sorted(shard_files) == sorted(os.path.basename(p) for p in manifest["shards"].values())
+
+        # A shard missing behind a stale manifest is not taken for an unknown package
+        reg._shards.clear()
+        reg._missing.clear()
+        for name in shard_files:
+            os.unlink(os.path.join(root, "index", "shards", name))
+        assert reg.package_exists("alpha") is None
+        assert reg.get_package_info("alpha")["description"] == "Alpha module"
+    return True
+
+if __name__ == "__main__":
+    print("Running shard tests...")
+    try:
+        test_sharded_lookups()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
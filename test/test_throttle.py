@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive per-host request scheduler
+"""
+import asyncio
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import core
+import registry
+import throttle
+from test_core import make_local_registry
+
+class ThrottlingHandler(http.server.BaseHTTPRequestHandler):
+    """Answers 429 until the server's 'throttle_count' is used up, 404 for /missing"""
+
+    def do_GET(self):
+        if self.path.startswith("/always-throttled"):
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        with self.server.lock:
+            throttled = self.server.throttle_count > 0
+            self.server.throttle_count -= 1
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(throttle_count):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    server.lock = threading.Lock()
+    server.throttle_count = throttle_count
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_retry_and_backoff():
+    """Test that throttled requests are retried and shrink the host limit"""
+    server, base_url = start_server(throttle_count=2)
+    try:
+        scheduler = throttle.RequestScheduler()
+        assert scheduler.fetch(f"{base_url}/index.json") == b'{"ok": true}'
+        stats = scheduler.stats()[base_url[len("http://"):]]
+        assert stats["throttled"] == 2
+        assert stats["limit"] < throttle.INITIAL_CONCURRENCY
+        assert stats["in_flight"] == 0
+    finally:
+        server.shutdown()
+    return True
+
+def test_throttling_is_not_a_miss():
+    """Test that the registry reports throttling instead of 'not found'"""
+    server, base_url = start_server(throttle_count=0)
+    try:
+        reg = registry.Registry(base_url=f"{base_url}/always-throttled")
+        try:
+            reg.get_package_info("alpha")
+            assert False, "expected ThrottledError"
+        except throttle.ThrottledError as e:
+            assert e.status == 429
+
+        reg = registry.Registry(base_url=f"{base_url}/missing")
+        assert reg.get_package_info("alpha") is None
+    finally:
+        server.shutdown()
+    return True
+
+def test_throttled_download_is_reported():
+    """Test that a throttled archive download surfaces as ThrottledError, not a download error"""
+    server, base_url = start_server(throttle_count=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, "registry")
+            reg = make_local_registry(root)
+            with open(os.path.join(root, "packages", "beta.json"), "w") as f:
+                json.dump({"versions": {"latest": "2.0.0",
+                                        "2.0.0": {"download": f"{base_url}/always-throttled/beta.zip"}}}, f)
+            installer = core.AsyncInstaller(os.path.join(tmp, "skin"), reg)
+            try:
+                asyncio.run(installer.install_package("beta"))
+                assert False, "expected ThrottledError"
+            except throttle.ThrottledError as e:
+                assert e.status == 429 and e.url.endswith("/beta.zip")
+    finally:
+        server.shutdown()
+    return True
+
+if __name__ == "__main__":
+    print("Running throttle tests...")
+    try:
+        test_retry_and_backoff()
+        test_throttling_is_not_a_miss()
+        test_throttled_download_is_reported()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for workspace mode using a registry served from the local filesystem
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the src directory to the path (adjusting for new location in test folder)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(script_dir, '..', 'src')
+sys.path.insert(0, src_path)
+sys.path.insert(0, script_dir)
+
+import core
+import workspace
+from test_core import make_local_registry
+
+def test_workspace_downloads_once():
+    """Test that every root is installed while each archive is downloaded once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        reg = make_local_registry(os.path.join(tmp, "registry"))
+        roots = []
+        for i in range(3):
+            root = os.path.join(tmp, f"skin{i}")
+            os.makedirs(root)
+            with open(os.path.join(root, "rainmeas-package.json"), "w") as f:
+                json.dump({"packages": {"alpha": "@latest"}}, f)
+            roots.append(root)
+
+        assert workspace.expand_skin_roots([os.path.join(tmp, "skin*")]) == roots
+
+        downloads = []
+        original = core.AsyncInstaller.download
+
+        async def counting_download(self, package, emit=None):
+            downloads.append(f"{package.name}@{package.version}")
+            return await original(self, package, emit)
+
+        events = []
+        with mock.patch.object(core.AsyncInstaller, "download", counting_download):
+            summaries = asyncio.run(workspace.Workspace(roots, reg, listener=events.append).install())
+
+        assert sorted(downloads) == ["alpha@1.0.0", "beta@2.0.0"]
+        # Every root hears about the shared downloads, not just the one that started them
+        for root in roots:
+            fetched = {event.package for event in events
+                       if event.kind in ("download", "cached") and event.data["skin_root"] == root}
+            assert fetched == {"alpha", "beta"}, (root, fetched)
+        for summary in summaries:
+            assert summary.success
+            assert summary.added == {"alpha": "1.0.0"}
+            assert os.path.exists(os.path.join(summary.skin_root, "@Resources", "@rainmeas-modules", "beta", "beta.lua"))
+    return True
+
+if __name__ == "__main__":
+    print("Running workspace tests...")
+    try:
+        test_workspace_downloads_once()
+        print("All tests passed!")
+    except Exception as e:
+        print(f"Test failed with error: {e}")
+        sys.exit(1)